@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class BcapConfig(AppConfig):
     name = "bcap"
     is_arches_application = True
+
+    def ready(self):
+        from bcap import signals  # noqa: F401
@@ -3,12 +3,20 @@ import re
 
 from datetime import datetime
 
+from django.utils.functional import SimpleLazyObject
+
 from arches.app.datatypes.datatypes import NonLocalizedStringDataType
 from arches.app.models import models
 
 from bcap.models.borden_number import BordenNumberCounter
+from bcap.util.aliases.archaeological_site import ArchaeologicalSiteAliases
+from bcap.util.borden_number_blocks import get_active_blocks
+from bcap.util.graph import GraphRegistry
 
-borden_number_widget = models.Widget.objects.get(name="borden-number-widget")
+# Only needed when the datatype is registered, so don't query it on import
+borden_number_widget = SimpleLazyObject(
+    lambda: models.Widget.objects.get(name="borden-number-widget")
+)
 
 details = {
     "datatype": "borden-number-datatype",
@@ -29,21 +37,32 @@ logger = logging.getLogger(__name__)
 
 class BordenNumberDataType(NonLocalizedStringDataType):
     def _get_issuance_date_nodeid(self, tile) -> str | None:
-        node = models.Node.objects.filter(
-            alias="borden_number_issuance_date", nodegroup_id=tile.nodegroup_id
-        ).first()
+        node = GraphRegistry.get_nodegroup_node(
+            tile.nodegroup_id, ArchaeologicalSiteAliases.BORDEN_NUMBER_ISSUANCE_DATE
+        )
         if node:
             return str(node.nodeid)
         return None
 
+    @staticmethod
+    def _is_new_tile(tile) -> bool:
+        # The tileid is already set before save so we can't use that to check
+        # if we're adding a tile. Tiles loaded from the database know they
+        # exist, and tiles saved in a BordenNumberBlocks import of new sites
+        # are new. Tiles built from request data always look new, so those
+        # still have to be checked.
+        if not tile._state.adding:
+            return False
+        blocks = get_active_blocks()
+        if blocks and blocks.new_tiles:
+            return True
+        return not models.Tile.objects.filter(pk=tile.pk).exists()
+
     def pre_tile_save(self, tile, nodeid):
         logger.debug("Tile: %s" % tile.data)
-        # The tileid is already set before save so we can't use that to check
-        # if we're adding a tile.
-        exists = models.Tile.objects.filter(pk=tile.pk).exists()
         # We've already set the borden number so don't do it again.
         value = tile.data[nodeid]
-        if exists and value is not None and not value == "":
+        if value is not None and not value == "" and not self._is_new_tile(tile):
             logger.debug("Borden number already set. Skipping.")
             return
 
@@ -53,7 +72,12 @@ class BordenNumberDataType(NonLocalizedStringDataType):
             "Trying to reserve borden number %s for %s"
             % (value, tile.resourceinstance_id)
         )
-        allocated_value = BordenNumberCounter.allocate_next_borden_number(borden_grid)
+        blocks = get_active_blocks()
+        allocated_value = blocks.take(borden_grid) if blocks else None
+        if allocated_value is None:
+            allocated_value = BordenNumberCounter.allocate_next_borden_number(
+                borden_grid
+            )
         if allocated_value != value:
             logger.debug(
                 "Reserved borden number %s does not match %s -- setting value in tile"
@@ -2,7 +2,16 @@ from arches.app.functions.primary_descriptors import AbstractPrimaryDescriptorsF
 from arches.app.models import models
 from arches.app.datatypes.datatypes import DataTypeFactory
 from bcap.util.aliases.archaeological_site import ArchaeologicalSiteAliases as aliases
-from bcap.util.controlled_list import get_hierarchy_for_list_item
+from bcap.util.descriptor_dependencies import DescriptorDependencyMixin
+from bcap.util.controlled_list import (
+    ControlledListCache,
+    get_hierarchy_for_list_item,
+)
+from bcap.util.bulk_descriptors import (
+    BulkDescriptorsMixin,
+    get_bundle_tiles,
+    get_tile_bundles,
+)
 
 details = {
     "functionid": "60000000-0000-0000-0000-000000001002",
@@ -42,8 +51,12 @@ details = {
 }
 
 
-class BCAPSiteDescriptors(AbstractPrimaryDescriptorsFunction):
+class BCAPSiteDescriptors(
+    BulkDescriptorsMixin, DescriptorDependencyMixin, AbstractPrimaryDescriptorsFunction
+):
     _datatype_factory = DataTypeFactory()
+    function_id = details["functionid"]
+    default_descriptor_configs = details["defaultconfig"]["descriptor_types"]
     # For Name part of descriptor
     graph_slug = "archaeological_site"
 
@@ -66,6 +79,12 @@ class BCAPSiteDescriptors(AbstractPrimaryDescriptorsFunction):
         [aliases.CITY, "postal_code"],
     ]
 
+    _descriptor_nodes = {
+        "name": _name_nodes,
+        "description": _card_nodes,
+        "map_popup": _popup_nodes,
+    }
+
     # Initializes the static nodes and datatypes data
     def initialize(self):
         for alias in (
@@ -88,18 +107,91 @@ class BCAPSiteDescriptors(AbstractPrimaryDescriptorsFunction):
 
         BCAPSiteDescriptors._initialized = True
 
+    def get_descriptor_nodegroup_ids(self, descriptor) -> set[str] | None:
+        if not BCAPSiteDescriptors._initialized:
+            self.initialize()
+
+        if descriptor not in BCAPSiteDescriptors._descriptor_nodes:
+            return None
+
+        node_aliases = []
+        for alias in BCAPSiteDescriptors._descriptor_nodes[descriptor]:
+            if alias == "typologies":
+                node_aliases.append(aliases.TYPOLOGY_CLASS)
+            elif alias == "address":
+                node_aliases += sum(BCAPSiteDescriptors._address_nodes, [])
+            else:
+                node_aliases.append(alias)
+
+        return self._nodegroup_ids_for_nodes(
+            [BCAPSiteDescriptors._nodes.get(alias) for alias in node_aliases]
+        )
+
+    @staticmethod
+    def _get_tile_bundles(resourceinstanceids) -> dict[str, dict[str, list]]:
+        return get_tile_bundles(
+            resourceinstanceids,
+            {node.nodegroup_id for node in BCAPSiteDescriptors._nodes.values()},
+        )
+
+    @staticmethod
+    def _get_bundle_tiles(bundle, node_alias) -> list:
+        return get_bundle_tiles(bundle, BCAPSiteDescriptors._nodes.get(node_alias))
+
+    def get_primary_descriptors_for_resources(
+        self, resourceinstanceids, descriptor_configs=None
+    ) -> dict[str, dict]:
+        """
+        Calculates the descriptors for a chunk of sites at once.
+
+        Keyword Arguments
+
+        resourceinstanceids -- ids of the archaeological sites in the chunk
+        descriptor_configs -- descriptor type configs, defaults to those saved for the graph
+
+        Returns a dict of resourceinstanceid -> {descriptor type -> value}
+        """
+        if not BCAPSiteDescriptors._initialized:
+            self.initialize()
+
+        if descriptor_configs is None:
+            descriptor_configs = self.get_descriptor_configs()
+
+        return {
+            resourceinstanceid: {
+                descriptor: self._get_descriptor(resourceinstanceid, config, bundle)
+                for descriptor, config in descriptor_configs.items()
+            }
+            for resourceinstanceid, bundle in BCAPSiteDescriptors._get_tile_bundles(
+                resourceinstanceids
+            ).items()
+        }
+
     def get_primary_descriptor_from_nodes(
         self, resource, config, context=None, descriptor=None
     ):
         if not BCAPSiteDescriptors._initialized:
             self.initialize()
 
+        stored_descriptor = self.get_reusable_descriptor(
+            resource, config, context, descriptor
+        )
+        if stored_descriptor is not None:
+            return stored_descriptor
+
+        resourceinstanceid = str(resource.resourceinstanceid)
+        bundle = BCAPSiteDescriptors._get_tile_bundles([resourceinstanceid])[
+            resourceinstanceid
+        ]
+        return self._get_descriptor(resourceinstanceid, config, bundle)
+
+    def _get_descriptor(self, resourceinstanceid, config, bundle):
         return_value = ""
         display_values = {}
 
         try:
             if config["type"] == "name":
-                return self._get_site_name(resource)
+                return self._get_site_name(bundle)
 
             _description_order = (
                 self._popup_nodes if config["type"] == "map_popup" else self._card_nodes
@@ -108,7 +200,9 @@ class BCAPSiteDescriptors(AbstractPrimaryDescriptorsFunction):
             nodes = BCAPSiteDescriptors._nodes
 
             for node_alias in _description_order:
-                value = BCAPSiteDescriptors._get_value_from_node(node_alias, resource)
+                value = BCAPSiteDescriptors._get_value_from_node(
+                    node_alias, resourceinstanceid, tiles=bundle
+                )
                 if value:
                     if config["first_only"]:
                         return BCAPSiteDescriptors._format_value(
@@ -119,11 +213,13 @@ class BCAPSiteDescriptors(AbstractPrimaryDescriptorsFunction):
             for alias in _description_order:
                 if alias == "address":
                     return_value += BCAPSiteDescriptors._format_value(
-                        "Address", BCAPSiteDescriptors._get_address(resource), config
+                        "Address", BCAPSiteDescriptors._get_address(bundle), config
                     )
                 elif alias == "typologies":
                     typology_classes, typology_values = (
-                        BCAPSiteDescriptors._get_typologies(resource.resourceinstanceid)
+                        BCAPSiteDescriptors._get_typologies(
+                            resourceinstanceid, tiles=bundle
+                        )
                     )
                     return_value += BCAPSiteDescriptors._format_value(
                         "Site Class", typology_classes, config
@@ -146,12 +242,23 @@ class BCAPSiteDescriptors(AbstractPrimaryDescriptorsFunction):
             print(e, "invalid nodegroupid participating in descriptor function.")
 
     @staticmethod
-    def _get_typologies(resourceinstanceid):
+    def _get_typology_hierarchy(list_item_id):
+        list_id = BCAPSiteDescriptors._nodes[aliases.TYPOLOGY_CLASS].config.get(
+            "controlledList"
+        )
+        if list_id:
+            return ControlledListCache.get_hierarchy(list_id, list_item_id)
+        return get_hierarchy_for_list_item(list_item_id)
+
+    @staticmethod
+    def _get_typologies(resourceinstanceid, tiles=None):
         datatype = BCAPSiteDescriptors._datatypes[aliases.TYPOLOGY_CLASS]
         typology_values = []
         typology_classes = set()
-        tiles = (
-            models.TileModel.objects.filter(
+        typology_tiles = (
+            BCAPSiteDescriptors._get_bundle_tiles(tiles, aliases.TYPOLOGY_CLASS)
+            if tiles is not None
+            else models.TileModel.objects.filter(
                 nodegroup_id=BCAPSiteDescriptors._nodes[
                     aliases.TYPOLOGY_CLASS
                 ].nodegroup_id
@@ -160,7 +267,7 @@ class BCAPSiteDescriptors(AbstractPrimaryDescriptorsFunction):
             .all()
         )
 
-        for tile in tiles:
+        for tile in typology_tiles:
             if tile:
                 ref_value = datatype.to_python(
                     tile.data[
@@ -172,7 +279,7 @@ class BCAPSiteDescriptors(AbstractPrimaryDescriptorsFunction):
                         tile, BCAPSiteDescriptors._nodes[aliases.TYPOLOGY_CLASS]
                     )
                 )
-                typology_class = get_hierarchy_for_list_item(
+                typology_class = BCAPSiteDescriptors._get_typology_hierarchy(
                     ref_value[0].labels[0].list_item_id
                 )
                 typology_classes.add(
@@ -182,7 +289,9 @@ class BCAPSiteDescriptors(AbstractPrimaryDescriptorsFunction):
         return list(typology_classes), typology_values
 
     @staticmethod
-    def _get_value_from_node(node_alias, resourceinstanceid=None, data_tile=None):
+    def _get_value_from_node(
+        node_alias, resourceinstanceid=None, data_tile=None, tiles=None
+    ):
         """
         get the display value from the resource tile(s) for the node with the given name
 
@@ -191,6 +300,7 @@ class BCAPSiteDescriptors(AbstractPrimaryDescriptorsFunction):
         node_alias -- node alias of the data to extract
         resourceinstanceid -- id of resource instance used to fetch the tile(s) if data_tile not specified
         data_tile -- if specified, the tile to extract the value from
+        tiles -- if specified, the prefetched tile bundle of the resource to extract the value from
         """
         if node_alias not in BCAPSiteDescriptors._nodes:
             return None
@@ -198,17 +308,20 @@ class BCAPSiteDescriptors(AbstractPrimaryDescriptorsFunction):
         display_values = []
         datatype = BCAPSiteDescriptors._datatypes[node_alias]
 
-        tiles = (
-            [data_tile]
-            if data_tile
-            else models.TileModel.objects.filter(
-                nodegroup_id=BCAPSiteDescriptors._nodes[node_alias].nodegroup_id
+        if data_tile:
+            node_tiles = [data_tile]
+        elif tiles is not None:
+            node_tiles = BCAPSiteDescriptors._get_bundle_tiles(tiles, node_alias)
+        else:
+            node_tiles = (
+                models.TileModel.objects.filter(
+                    nodegroup_id=BCAPSiteDescriptors._nodes[node_alias].nodegroup_id
+                )
+                .filter(resourceinstance_id=resourceinstanceid)
+                .all()
             )
-            .filter(resourceinstance_id=resourceinstanceid)
-            .all()
-        )
 
-        for tile in tiles:
+        for tile in node_tiles:
             if tile:
                 display_values.append(
                     datatype.get_display_value(
@@ -240,26 +353,22 @@ class BCAPSiteDescriptors(AbstractPrimaryDescriptorsFunction):
         return value
 
     @staticmethod
-    def _get_address(resource):
+    def _get_address(bundle):
         address = ""
-        nodes = BCAPSiteDescriptors._nodes
 
         for address_line_nodes in BCAPSiteDescriptors._address_nodes:
             if address:
                 address += "<br>"
             line = ""
             for address_node_alias in address_line_nodes:
-                tile = (
-                    models.TileModel.objects.filter(
-                        nodegroup_id=nodes[address_node_alias].nodegroup_id
-                    )
-                    .filter(resourceinstance_id=resource.resourceinstanceid)
-                    .first()
+                address_tiles = BCAPSiteDescriptors._get_bundle_tiles(
+                    bundle, address_node_alias
                 )
                 if line:
                     line += " "
                 display_value = BCAPSiteDescriptors._get_value_from_node(
-                    node_alias=address_node_alias, data_tile=tile
+                    node_alias=address_node_alias,
+                    data_tile=address_tiles[0] if address_tiles else None,
                 )
                 display_value = (
                     display_value[0] if type(display_value) is list else display_value
@@ -269,44 +378,18 @@ class BCAPSiteDescriptors(AbstractPrimaryDescriptorsFunction):
                 address += line
         return address if address else None
 
-    def _get_site_name(self, resource):
-        # name_datatype = BCAPSiteDescriptors._datatypes[aliases.NAME]
-        # name_type_datatype = BCAPSiteDescriptors._datatypes[aliases.NAME_TYPE]
+    def _get_site_name(self, bundle):
         borden_number_datatype = BCAPSiteDescriptors._datatypes[aliases.BORDEN_NUMBER]
         display_value = ""
-        #
-        # for tile in (
-        #     models.TileModel.objects.filter(
-        #         nodegroup_id=BCAPSiteDescriptors._nodes[aliases.NAME].nodegroup_id
-        #     )
-        #     .filter(resourceinstance_id=resource.resourceinstanceid)
-        #     .all()
-        # ):
-        #     if (
-        #         name_type_datatype.get_display_value(
-        #             tile, BCAPSiteDescriptors._nodes[aliases.NAME_TYPE]
-        #         )
-        #         == "Common"
-        #     ):
-        #         name = name_datatype.get_display_value(
-        #             tile, BCAPSiteDescriptors._nodes[aliases.NAME]
-        #         )
-        #         if display_value and name:
-        #             display_value = display_value + ",<br>"
-        #         if name:
-        #             display_value = display_value + name
-        #
-        # if not display_value:
-        #     display_value = self._empty_name_value
-
-        borden_number_tile = models.TileModel.objects.filter(
-            nodegroup_id=BCAPSiteDescriptors._nodes[aliases.BORDEN_NUMBER].nodegroup_id,
-            resourceinstance_id=resource.resourceinstanceid,
-        ).first()
-
-        if borden_number_tile:
+
+        borden_number_tiles = BCAPSiteDescriptors._get_bundle_tiles(
+            bundle, aliases.BORDEN_NUMBER
+        )
+
+        if borden_number_tiles:
             display_value += "%s" % borden_number_datatype.get_display_value(
-                borden_number_tile, BCAPSiteDescriptors._nodes[aliases.BORDEN_NUMBER]
+                borden_number_tiles[0],
+                BCAPSiteDescriptors._nodes[aliases.BORDEN_NUMBER],
             )
 
         return display_value if display_value else self._empty_name_value
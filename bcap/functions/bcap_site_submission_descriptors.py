@@ -1,4 +1,5 @@
 from bcap.util.bcap_aliases import GraphSlugs
+from bcap.util.descriptor_dependencies import DescriptorDependencyMixin
 from bcap.util.aliases.archaeological_site_submission import (
     BCAPSiteSubmissionAliases as aliases,
 )
@@ -27,7 +28,9 @@ details = {
 }
 
 
-class BCAPSiteSubmissionDescriptors(BCPrimaryDescriptorsFunction):
+class BCAPSiteSubmissionDescriptors(
+    DescriptorDependencyMixin, BCPrimaryDescriptorsFunction
+):
     # For Name part of descriptor
     _graph_slug = GraphSlugs.SITE_SUBMISSION
     _graph_lookup = None
@@ -48,9 +51,21 @@ class BCAPSiteSubmissionDescriptors(BCPrimaryDescriptorsFunction):
             + BCAPSiteSubmissionDescriptors._card_nodes,
         )
 
+    def get_descriptor_nodegroup_ids(self, descriptor):
+        node_aliases = self._name_nodes if descriptor == "name" else self._card_nodes
+        return self._nodegroup_ids_for_nodes(
+            [self._graph_lookup.get_node(alias) for alias in node_aliases]
+        )
+
     def get_primary_descriptor_from_nodes(
         self, resource, config, context=None, descriptor=None
     ):
+        stored_descriptor = self.get_reusable_descriptor(
+            resource, config, context, descriptor
+        )
+        if stored_descriptor is not None:
+            return stored_descriptor
+
         return_value = ""
 
         try:
@@ -1,4 +1,7 @@
+from django.contrib.contenttypes.models import ContentType
+from guardian.models import GroupObjectPermission, UserObjectPermission
 from guardian.shortcuts import get_perms, assign_perm, remove_perm
+from arches.app.models import models
 from bcap.functions.admin_only_access import AdminOnlyAccess
 from bcap.util.business_data_proxy import ArchaeologicalSiteDataProxy
 
@@ -15,6 +18,7 @@ details = {
 
 
 class RestrictedSiteAccess(AdminOnlyAccess):
+    site_proxy = None
 
     def __init__(self, config=None, nodegroup_id=None):
         super().__init__(config, nodegroup_id)
@@ -25,8 +29,50 @@ class RestrictedSiteAccess(AdminOnlyAccess):
     def save(self, tile, request, context):
         pass
 
+    def get_site_proxy(self):
+        if RestrictedSiteAccess.site_proxy is None:
+            RestrictedSiteAccess.site_proxy = ArchaeologicalSiteDataProxy()
+        return RestrictedSiteAccess.site_proxy
+
+    def get_restriction_count(self, resourceinstance):
+        """
+        Returns how many of the Guest group and anonymous user have no access
+        to the resource (0 when it's public, 2 when it's restricted)
+        """
+        filters = {
+            "content_type": ContentType.objects.get_for_model(models.ResourceInstance),
+            "object_pk": str(resourceinstance.resourceinstanceid),
+            "permission__codename": "no_access_to_resourceinstance",
+        }
+        return (
+            GroupObjectPermission.objects.filter(
+                group=self.get_guest_group(), **filters
+            ).count()
+            + UserObjectPermission.objects.filter(
+                user=self.get_anonymous_user(), **filters
+            ).count()
+        )
+
     def post_save(self, tile, request, context):
-        if ArchaeologicalSiteDataProxy().is_site_public(tile.resourceinstance):
+        site_proxy = self.get_site_proxy()
+        restriction_count = self.get_restriction_count(tile.resourceinstance)
+        # Only the nodes of the public rule can make a restricted site public.
+        # Unrestricted sites are still checked, as new sites start that way.
+        if (
+            restriction_count == 2
+            and str(tile.nodegroup_id)
+            not in site_proxy.get_public_status_nodegroup_ids()
+        ):
+            return
+
+        resourceinstanceid = str(tile.resourceinstance.resourceinstanceid)
+        is_public = resourceinstanceid in site_proxy.get_public_site_ids(
+            [resourceinstanceid]
+        )
+        if restriction_count == (0 if is_public else 2):
+            return
+
+        if is_public:
             remove_perm(
                 "no_access_to_resourceinstance",
                 self.get_guest_group(),
@@ -1,5 +1,16 @@
+import threading
+from contextlib import contextmanager
+
 from arches.app.models import models
 from bcap.util.aliases.site_visit import SiteVisitAliases as aliases
+from bcap.util.bcap_aliases import GraphSlugs
+from bcap.util.bulk_descriptors import (
+    BulkDescriptorsMixin,
+    get_bundle_tiles,
+    get_shared_tile_bundle,
+    get_tile_bundles,
+)
+from bcap.util.descriptor_dependencies import DescriptorDependencyMixin
 from bcgov_arches_common.functions.abstract_primary_descriptors import (
     AbstractPrimaryDescriptors as AbstractDescriptors,
 )
@@ -41,10 +52,19 @@ details = {
     "component": "views/components/functions/site-visit-descriptors",
 }
 
+# The site visits whose tiles are prefetched in a batch, per thread
+_prefetch = threading.local()
+
 
-class SiteVisitDescriptors(AbstractDescriptors):
+class SiteVisitDescriptors(
+    BulkDescriptorsMixin, DescriptorDependencyMixin, AbstractDescriptors
+):
     NON_PERMITTED_STRING = "Non-permit"
 
+    function_id = details["functionid"]
+    graph_slug = GraphSlugs.SITE_VISIT
+    default_descriptor_configs = details["defaultconfig"]["descriptor_types"]
+
     # For Name part of descriptor
     AbstractDescriptors._graph_slug = "site_visit"
 
@@ -62,16 +82,117 @@ class SiteVisitDescriptors(AbstractDescriptors):
 
     # AbstractDescriptors._popup_node_aliases = AbstractDescriptors._card_node_aliases
 
+    def get_descriptor_nodegroup_ids(self, descriptor):
+        descriptor_aliases = {
+            "name": AbstractDescriptors._name_node_aliases,
+            "description": AbstractDescriptors._card_node_aliases,
+        }
+        if descriptor not in descriptor_aliases:
+            return None
+
+        return self._nodegroup_ids_for_nodes(
+            [
+                AbstractDescriptors._nodes.get(alias)
+                for alias in descriptor_aliases[descriptor]
+            ]
+        )
+
+    def get_primary_descriptor_from_nodes(
+        self, resource, config, context=None, descriptor=None
+    ):
+        stored_descriptor = self.get_reusable_descriptor(
+            resource, config, context, descriptor
+        )
+        if stored_descriptor is not None:
+            return stored_descriptor
+
+        return super().get_primary_descriptor_from_nodes(
+            resource, config, context=context, descriptor=descriptor
+        )
+
+    @classmethod
+    @contextmanager
+    def prefetched_tiles(cls, resourceinstanceids):
+        """
+        Within the block, the tiles of the given site visits are fetched with
+        a single query the first time any of them is needed.
+        """
+        previous = getattr(_prefetch, "batch", None)
+        _prefetch.batch = {
+            "ids": {
+                str(resourceinstanceid) for resourceinstanceid in resourceinstanceids
+            },
+            "bundles": None,
+        }
+        try:
+            yield
+        finally:
+            _prefetch.batch = previous
+
+    @staticmethod
+    def _get_bundle_nodegroup_ids():
+        return {
+            node.nodegroup_id
+            for alias, node in AbstractDescriptors._nodes.items()
+            if alias
+            in AbstractDescriptors._name_node_aliases
+            + AbstractDescriptors._card_node_aliases
+        }
+
+    def _get_tile_bundle(self, resource, config, context, descriptor):
+        resourceinstanceid = str(getattr(resource, "resourceinstanceid", resource))
+
+        batch = getattr(_prefetch, "batch", None)
+        if batch is not None and resourceinstanceid in batch["ids"]:
+            if batch["bundles"] is None:
+                batch["bundles"] = get_tile_bundles(
+                    batch["ids"], self._get_bundle_nodegroup_ids()
+                )
+            return batch["bundles"][resourceinstanceid]
+
+        return get_shared_tile_bundle(
+            resourceinstanceid,
+            self._get_bundle_nodegroup_ids(),
+            (
+                config.get("type", descriptor),
+                context.get("language") if context else None,
+            ),
+        )
+
+    def get_primary_descriptors_for_resources(
+        self, resourceinstanceids, descriptor_configs=None
+    ):
+        """
+        Calculates the descriptors for a chunk of site visits from one tile query.
+
+        Returns a dict of resourceinstanceid -> {descriptor type -> value}
+        """
+        if descriptor_configs is None:
+            descriptor_configs = self.get_descriptor_configs()
+
+        resources = models.ResourceInstance.objects.filter(
+            resourceinstanceid__in=resourceinstanceids
+        )
+
+        with SiteVisitDescriptors.prefetched_tiles(resourceinstanceids):
+            return {
+                str(resource.resourceinstanceid): {
+                    descriptor: self.get_primary_descriptor_from_nodes(
+                        resource, config, descriptor=descriptor
+                    )
+                    for descriptor, config in descriptor_configs.items()
+                }
+                for resource in resources
+            }
+
     def get_name_descriptor(self, resource, config, context):
-        tile = (
-            models.TileModel.objects.filter(
-                nodegroup_id=AbstractDescriptors._nodes[
-                    aliases.ASSOCIATED_PERMIT
-                ].nodegroup_id
-            )
-            .filter(resourceinstance_id=resource)
-            .first()
+        permit_tiles = get_bundle_tiles(
+            self._get_tile_bundle(resource, config, context, "name"),
+            AbstractDescriptors._nodes[aliases.ASSOCIATED_PERMIT],
         )
+        if not permit_tiles:
+            return self.NON_PERMITTED_STRING
+        tile = permit_tiles[0]
 
         permit = AbstractDescriptors._get_value_from_node(
             node_alias=aliases.ASSOCIATED_PERMIT,
@@ -97,12 +218,10 @@ class SiteVisitDescriptors(AbstractDescriptors):
         return " - ".join(name_values)
 
     def get_search_card_descriptor(self, resource, config, context):
-        tiles = models.TileModel.objects.filter(
-            nodegroup_id=AbstractDescriptors._nodes[
-                aliases.SITE_VISIT_TYPE
-            ].nodegroup_id,
-            resourceinstance_id=resource,
-        ).all()
+        tiles = get_bundle_tiles(
+            self._get_tile_bundle(resource, config, context, "description"),
+            AbstractDescriptors._nodes[aliases.SITE_VISIT_TYPE],
+        )
         return super().get_values_in_order(
             aliases=AbstractDescriptors._card_node_aliases,
             resource=resource,
@@ -1,12 +1,104 @@
+import argparse
+import multiprocessing
+import os
+import subprocess
+import sys
+
+from django.core.management.base import CommandError
+
+from arches.app.models import models
+from arches.app.models.system_settings import settings
+from arches.app.utils.index_database import index_resources_by_type
 from bcgov_arches_common.management.commands.bc_reindex_database import (
     Command as BaseCommand,
 )
 
+from bcap.functions.bcap_site_descriptors import BCAPSiteDescriptors
+from bcap.functions.site_visit_descriptors import SiteVisitDescriptors
+from bcap.search.arch_site_es_values import CustomSearchValue
+from bcap.util.bcap_aliases import GraphSlugs
+from bcap.util.blue_green_index import BlueGreenIndexBuild, index_recorded_changes
+from bcap.util.graph import get_current_graph
+from bcap.util.parallel_reindex import (
+    clear_checkpoints,
+    delete_stale_documents,
+    reindex_graph,
+)
+
 
 class Command(BaseCommand):
+    # Graphs left out of get_index_order while the base command reindexes,
+    # because their descriptors were just calculated in bulk
+    deferred_graphs = ()
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument(
+            "--batch-descriptors",
+            action="store_true",
+            dest="batch_descriptors",
+            default=False,
+            help="Recalculate archaeological site and site visit descriptors in bulk before reindexing, instead of per resource while indexing",
+        )
+        parser.add_argument(
+            "--batch-search-values",
+            action="store_true",
+            dest="batch_search_values",
+            default=False,
+            help="Calculate the archaeological site custom search values in batches while reindexing",
+        )
+        parser.add_argument(
+            "--resumable",
+            action="store_true",
+            dest="resumable",
+            default=False,
+            help="Index each graph in shards across a pool of worker processes, checkpointing progress so an interrupted run can be resumed",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            dest="workers",
+            default=multiprocessing.cpu_count(),
+            help="Number of worker processes (and shards per graph) for a resumable reindex",
+        )
+        parser.add_argument(
+            "--run-name",
+            dest="run_name",
+            default="default",
+            help="Name of the resumable reindex run. Rerunning with the same name resumes it",
+        )
+        parser.add_argument(
+            "--restart",
+            action="store_true",
+            dest="restart",
+            default=False,
+            help="Discard the checkpoints of the resumable run and start again",
+        )
+        parser.add_argument(
+            "--blue-green",
+            action="store_true",
+            dest="blue_green",
+            default=False,
+            help="Build new versions of the indexes while the live ones stay searchable, then swap them in",
+        )
+        parser.add_argument(
+            "--keep-previous",
+            action="store_true",
+            dest="keep_previous",
+            default=False,
+            help="Keep the indexes replaced by a blue/green reindex instead of deleting them",
+        )
+        # Set on the subprocess that builds the new indexes of a blue/green reindex
+        parser.add_argument(
+            "--blue-green-build",
+            action="store_true",
+            dest="blue_green_build",
+            default=False,
+            help=argparse.SUPPRESS,
+        )
 
     def get_index_order(self):
-        return [
+        order = [
             "contributor",
             "lg_person",
             "local_government",
@@ -19,3 +111,206 @@ class Command(BaseCommand):
             "project_sandbox",
             "site_submission",
         ]
+        return [
+            graph_slug for graph_slug in order if graph_slug not in self.deferred_graphs
+        ]
+
+    def get_bulk_descriptor_functions(self):
+        return [BCAPSiteDescriptors(), SiteVisitDescriptors()]
+
+    def handle(self, *args, **options):
+        if options.get("blue_green"):
+            self.reindex_blue_green(options)
+            return
+        self.reindex(*args, **options)
+        if options.get("blue_green_build"):
+            self.stdout.write(
+                "Indexed %s resources changed during the build"
+                % index_recorded_changes()
+            )
+
+    def reindex(self, *args, **options):
+        deferred_graphs = []
+        if options.get("batch_descriptors"):
+            for descriptors_function in self.get_bulk_descriptor_functions():
+                self.recalculate_descriptors(descriptors_function)
+                if options.get("recalculate_descriptors"):
+                    deferred_graphs.append(descriptors_function.graph_slug)
+        if options.get("resumable"):
+            self.reindex_resumable(
+                options["run_name"], options["workers"], options.get("restart")
+            )
+            return
+        if options.get("batch_search_values"):
+            CustomSearchValue.register_batches(
+                models.ResourceInstance.objects.filter(
+                    graph=get_current_graph(GraphSlugs.ARCHAEOLOGICAL_SITE)
+                ).values_list("resourceinstanceid", flat=True),
+                settings.BULK_IMPORT_BATCH_SIZE,
+            )
+        try:
+            # The other graphs still recalculate their descriptors per
+            # resource if asked to
+            self.deferred_graphs = deferred_graphs
+            try:
+                super().handle(*args, **options)
+            finally:
+                self.deferred_graphs = ()
+            self.index_graphs(deferred_graphs)
+        finally:
+            CustomSearchValue.clear_prefetched()
+
+    def index_graphs(self, graph_slugs):
+        """
+        Indexes the resources of the graphs in place, reading their saved
+        descriptors rather than recalculating them
+        """
+        for graph_slug in graph_slugs:
+            index_resources_by_type(
+                [str(get_current_graph(graph_slug).graphid)],
+                clear_index=False,
+                batch_size=settings.BULK_IMPORT_BATCH_SIZE,
+                recalculate_descriptors=False,
+            )
+
+    def get_build_args(self, options) -> list[str]:
+        """
+        Returns the command line that repeats this reindex, from its parsed
+        options, for the subprocess building the indexes of a blue/green
+        reindex.
+        """
+        build_args = []
+        parser = self.create_parser("manage.py", "bc_reindex_database")
+        for action in parser._actions:
+            if not action.option_strings or action.dest in (
+                "help",
+                "blue_green",
+                "keep_previous",
+                "blue_green_build",
+            ):
+                continue
+            value = options.get(action.dest, action.default)
+            if value is None or value == action.default:
+                continue
+            flag = max(action.option_strings, key=len)
+            if action.nargs == 0:
+                build_args.append(flag)
+            elif isinstance(value, (list, tuple)):
+                build_args += [flag, *[str(item) for item in value]]
+            else:
+                build_args += [flag, str(value)]
+        return build_args + ["--blue-green-build"]
+
+    def reindex_blue_green(self, options):
+        """
+        Reruns this command with the same options in a subprocess whose
+        ELASTICSEARCH_PREFIX is versioned, so it builds a new set of indexes,
+        then swaps the live index names over to them.
+
+        Resources changed while the indexes are built are recorded. The
+        subprocess indexes them once its build is done, and those changed
+        after that are indexed through the swapped names.
+        """
+        build = BlueGreenIndexBuild()
+        build.prepare()
+        build.start_recording_changes()
+        self.stdout.write("Building indexes with prefix %s" % build.build_prefix)
+
+        try:
+            try:
+                subprocess.run(
+                    [
+                        sys.executable,
+                        os.path.join(os.path.dirname(settings.APP_ROOT), "manage.py"),
+                        "bc_reindex_database",
+                        *self.get_build_args(options),
+                    ],
+                    env={**os.environ, "ES_INDEX_VERSION": build.version},
+                    check=True,
+                )
+            except subprocess.CalledProcessError as e:
+                build.discard()
+                raise CommandError(
+                    "Reindex into %s failed, the live indexes are unchanged"
+                    % build.build_prefix
+                ) from e
+            finally:
+                build.cleanup()
+
+            swapped_indexes = build.swap(options.get("keep_previous"))
+        finally:
+            build.stop_recording_changes()
+
+        for index_name in swapped_indexes:
+            self.stdout.write("%s -> %s" % (build.live_name(index_name), index_name))
+        self.stdout.write(
+            "Indexed %s resources changed during the swap" % index_recorded_changes()
+        )
+
+    def reindex_resumable(self, run_name, workers, restart=False):
+        """
+        Indexes the graphs in get_index_order, one graph at a time, sharding
+        each graph's resources across the worker processes. Documents are
+        indexed in place, so the index isn't cleared first. Instead, once all
+        the graphs are indexed, the documents of resources deleted from the
+        database are removed.
+        """
+        if restart:
+            clear_checkpoints(run_name)
+
+        total_indexed = 0
+        total_seconds = 0.0
+        for graph_slug in self.get_index_order():
+            indexed, seconds = reindex_graph(run_name, graph_slug, workers)
+            total_indexed += indexed
+            total_seconds += seconds
+            self.stdout.write(
+                "%s: indexed %s resources in %.1fs (%.1f docs/sec)"
+                % (graph_slug, indexed, seconds, indexed / seconds if seconds else 0)
+            )
+
+        for graph_slug in self.get_index_order():
+            deleted = delete_stale_documents(graph_slug)
+            if deleted:
+                self.stdout.write(
+                    "%s: deleted %s documents of deleted resources"
+                    % (graph_slug, deleted)
+                )
+
+        clear_checkpoints(run_name)
+        self.stdout.write(
+            "Indexed %s resources in %.1fs (%.1f docs/sec)"
+            % (
+                total_indexed,
+                total_seconds,
+                total_indexed / total_seconds if total_seconds else 0,
+            )
+        )
+
+    def recalculate_descriptors(self, descriptors_function, batch_size=None):
+        batch_size = batch_size if batch_size else settings.BULK_IMPORT_BATCH_SIZE
+        graph = get_current_graph(descriptors_function.graph_slug)
+        descriptor_configs = descriptors_function.get_descriptor_configs(graph)
+
+        resourceinstanceids = models.ResourceInstance.objects.filter(
+            graph=graph
+        ).values_list("resourceinstanceid", flat=True)
+
+        chunk = []
+        processed = 0
+        for resourceinstanceid in resourceinstanceids.iterator(chunk_size=batch_size):
+            chunk.append(str(resourceinstanceid))
+            if len(chunk) == batch_size:
+                processed += descriptors_function.save_descriptors_for_resources(
+                    chunk, descriptor_configs
+                )
+                chunk = []
+        if chunk:
+            processed += descriptors_function.save_descriptors_for_resources(
+                chunk, descriptor_configs
+            )
+
+        self.stdout.write(
+            "Recalculated descriptors for %s %s resources"
+            % (processed, descriptors_function.graph_slug)
+        )
@@ -0,0 +1,158 @@
+from django.contrib.gis.geos import Point
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+import logging
+import time
+
+from arches.app.models import models
+
+from bcap.util.mvt_cache import get_tile_range
+from bcap.util.mvt_tiler import MVTTiler, MVTTiler_Base
+
+logger = logging.getLogger(__name__)
+
+ARCHAEOLOGICAL_SITE_GEOMETRY_NODE = "1b6235b0-0d0f-11ed-98c2-5254008afee6"
+
+
+class Command(BaseCommand):
+    """
+    Command to time the generation of the map tiles containing a point at
+    several zooms, bypassing the tile cache, with the features of each tile
+    enriched one at a time (get_map_attribute_data, as the base tiler does)
+    and in one query (get_map_attribute_data_for_resources). The enrichment
+    queries are also timed on their own.
+
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "-z",
+            "--zoom",
+            action="append",
+            dest="zooms",
+            type=int,
+            default=None,
+            help="Zoom to time (default 6, 9, 12 and 15)",
+        )
+        parser.add_argument(
+            "--lon", dest="lon", type=float, default=-123.37, help="Longitude"
+        )
+        parser.add_argument(
+            "--lat", dest="lat", type=float, default=48.43, help="Latitude"
+        )
+        parser.add_argument(
+            "-n",
+            "--node",
+            dest="nodeid",
+            default=ARCHAEOLOGICAL_SITE_GEOMETRY_NODE,
+            help="Geometry node of the layer",
+        )
+        parser.add_argument(
+            "-u",
+            "--user",
+            dest="username",
+            default="anonymous",
+            help="User the tiles are rendered for",
+        )
+        parser.add_argument(
+            "-r",
+            "--repeat",
+            dest="repeat",
+            type=int,
+            default=3,
+            help="Number of times each tile is timed",
+        )
+
+    @staticmethod
+    def _time(repeat, func) -> float:
+        start = time.perf_counter()
+        for _ in range(repeat):
+            func()
+        return (time.perf_counter() - start) / repeat
+
+    @staticmethod
+    def _get_resource_ids(nodeid, zoom, x, y) -> list:
+        with connection.cursor() as cur:
+            cur.execute(
+                """
+                select distinct resourceinstanceid
+                  from geojson_geometries
+                 where nodeid = %s
+                   and geom && ST_TileEnvelope(%s, %s, %s)
+                """,
+                [nodeid, zoom, x, y],
+            )
+            return [row[0] for row in cur.fetchall()]
+
+    @staticmethod
+    def _execute(sql, params):
+        with connection.cursor() as cur:
+            cur.execute(sql, params)
+            cur.fetchall()
+
+    def handle(self, *args, **options):
+        try:
+            user = models.User.objects.get(username=options["username"])
+        except models.User.DoesNotExist:
+            raise CommandError("User %s does not exist" % options["username"])
+        viewable_nodegroups = user.userprofile.viewable_nodegroups
+        nodeid = options["nodeid"]
+        repeat = options["repeat"]
+
+        point = Point(options["lon"], options["lat"], srid=4326)
+        point.transform(3857)
+        tiler = MVTTiler()
+
+        self.stdout.write(
+            "%5s %14s %9s %20s %12s %14s %14s"
+            % (
+                "zoom",
+                "tile",
+                "features",
+                "per feature tile ms",
+                "set tile ms",
+                "per feature ms",
+                "set ms",
+            )
+        )
+        for zoom in options["zooms"] if options["zooms"] else [6, 9, 12, 15]:
+            x, y = get_tile_range(point.extent, zoom, tile_buffer=0)[:2]
+            resource_ids = self._get_resource_ids(nodeid, zoom, x, y)
+
+            # The base tiler enriches each feature with get_map_attribute_data
+            per_feature_tile_time = self._time(
+                repeat,
+                lambda: MVTTiler_Base.createTile(
+                    tiler, nodeid, viewable_nodegroups, user, zoom, x, y
+                ),
+            )
+            set_tile_time = self._time(
+                repeat,
+                lambda: tiler.createTile(nodeid, viewable_nodegroups, user, zoom, x, y),
+            )
+            per_feature_time = self._time(
+                repeat,
+                lambda: self._execute(
+                    "select get_map_attribute_data(id, %s) from unnest(%s::uuid[]) id",
+                    [nodeid, resource_ids],
+                ),
+            )
+            set_time = self._time(
+                repeat,
+                lambda: self._execute(
+                    "select * from get_map_attribute_data_for_resources(%s::uuid[], %s)",
+                    [resource_ids, nodeid],
+                ),
+            )
+            self.stdout.write(
+                "%5s %14s %9s %20.1f %12.1f %14.1f %14.1f"
+                % (
+                    zoom,
+                    "%s/%s" % (x, y),
+                    len(resource_ids),
+                    per_feature_tile_time * 1000,
+                    set_tile_time * 1000,
+                    per_feature_time * 1000,
+                    set_time * 1000,
+                )
+            )
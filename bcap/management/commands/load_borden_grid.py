@@ -0,0 +1,63 @@
+from django.contrib.gis.gdal import DataSource
+from django.contrib.gis.geos import MultiPolygon
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+import logging
+
+from bcap.models import BordenGrid
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    """
+    Command to load the Borden grid from a shapefile or GeoJSON file (e.g. an
+    export of WHSE_ARCHAEOLOGY.RAAD_BORDENGRID) into bcap_borden_grid, which
+    is used to find the grid of a new Borden number without calling the WFS.
+
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument("source", help="Path to the shapefile or GeoJSON file")
+        parser.add_argument(
+            "--field",
+            dest="field",
+            default="BORDGRID",
+            help="Name of the attribute holding the Borden grid",
+        )
+
+    @staticmethod
+    def _as_multipolygon(geometry):
+        if geometry.geom_type == "Polygon":
+            return MultiPolygon(geometry, srid=geometry.srid)
+        return geometry
+
+    def handle(self, *args, **options):
+        try:
+            layer = DataSource(options["source"])[0]
+        except Exception as e:
+            raise CommandError("Unable to read %s: %s" % (options["source"], e))
+
+        if options["field"] not in layer.fields:
+            raise CommandError(
+                "%s has no %s field (fields: %s)"
+                % (options["source"], options["field"], ", ".join(layer.fields))
+            )
+
+        grids = {}
+        for feature in layer:
+            borden_grid = feature.get(options["field"])
+            geometry = feature.geom.geos
+            geometry.transform(BordenGrid._meta.get_field("geom").srid)
+            if borden_grid in grids:
+                geometry = grids[borden_grid].geom.union(geometry)
+            grids[borden_grid] = BordenGrid(
+                borden_grid=borden_grid, geom=self._as_multipolygon(geometry)
+            )
+
+        with transaction.atomic():
+            BordenGrid.objects.all().delete()
+            BordenGrid.objects.bulk_create(grids.values(), batch_size=1000)
+
+        logger.info("Loaded %s Borden grids" % len(grids))
+        self.stdout.write("Loaded %s Borden grids" % len(grids))
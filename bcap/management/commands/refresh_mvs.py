@@ -1,7 +1,8 @@
-from django.db import connection
-from django.core.management.base import BaseCommand, CommandError
+from django.core.management.base import BaseCommand
 import logging
 
+from bcap.util.materialized_views import FAILED, REFRESHED, refresh_views
+
 logger = logging.getLogger(__name__)
 
 
@@ -9,16 +10,85 @@ class Command(BaseCommand):
     """
     Command to refresh materialized views that support the one-row view used by DataBC to create the BCGW layer
 
+    Views are refreshed in parallel, after the views they read from, and
+    concurrently when they have a unique index. Views whose source graphs
+    haven't been edited since their last refresh are skipped.
+
+    Edits are detected from the Arches edit log, which doesn't record bulk
+    loads or direct SQL changes to the tiles. Views are therefore refreshed
+    anyway once their last refresh is older than --max-age (default
+    MATERIALIZED_VIEW_MAX_AGE_SECONDS, a day), so a scheduled run picks such
+    changes up within that time. Use --force to refresh everything right
+    after a bulk load.
+
     """
 
     def add_arguments(self, parser):
-        pass
+        parser.add_argument(
+            "--view",
+            action="append",
+            dest="views",
+            default=None,
+            help="Materialized view to refresh (default all of them)",
+        )
+        parser.add_argument(
+            "-w",
+            "--workers",
+            dest="workers",
+            type=int,
+            default=4,
+            help="Number of views refreshed at the same time",
+        )
+        parser.add_argument(
+            "-f",
+            "--force",
+            action="store_true",
+            dest="force",
+            default=False,
+            help="Refresh views even if their sources haven't changed",
+        )
+        parser.add_argument(
+            "--max-age",
+            dest="max_age",
+            type=int,
+            default=None,
+            help="Refresh views last refreshed more than this many seconds ago, "
+            "even if no edit was logged, since bulk loads and SQL changes "
+            "aren't (default MATERIALIZED_VIEW_MAX_AGE_SECONDS)",
+        )
 
     def handle(self, *args, **options):
-        cursor = connection.cursor()
         logger.info("Refreshing materialized views")
-        try:
-            cursor.execute("call refresh_materialized_views()")
-            logger.info("Materialized views refreshed successfully")
-        except Exception as e:
-            logger.error("Unable to refresh materialized views: %s", str(e))
+        results = refresh_views(
+            view_names=options["views"],
+            workers=options["workers"],
+            force=options["force"],
+            max_age=options["max_age"],
+        )
+
+        for view_name, result in results.items():
+            self.stdout.write(
+                "%-35s %-18s %8.1fs%s"
+                % (
+                    view_name,
+                    result["status"],
+                    result["duration"],
+                    " (concurrently)" if result.get("concurrently") else "",
+                )
+            )
+
+        failed = [
+            view_name
+            for view_name, result in results.items()
+            if result["status"] == FAILED
+        ]
+        if failed:
+            logger.error("Unable to refresh materialized views: %s", ", ".join(failed))
+            return
+        logger.info(
+            "Materialized views refreshed successfully (%s of %s refreshed)",
+            len(
+                [result for result in results.values() if result["status"] == REFRESHED]
+            ),
+            len(results),
+        )
@@ -1,12 +1,14 @@
 from django.db import connection
 from django.core.management.base import BaseCommand, CommandError
 import logging
+import time
 from bcap.util.buisiness_permission_manager import (
     AdminOnlyPermissionManager,
     HeritageSitePermissionManager,
+    reset_permissions_in_parallel,
 )
-from arches.app.models import models
-from arches.app.utils.index_database import index_resources_by_type
+from arches.app.models.resource import Resource
+from arches.app.utils.index_database import index_resources_using_singleprocessing
 from arches.app.models.system_settings import settings
 
 logger = logging.getLogger(__name__)
@@ -14,7 +16,18 @@ logger = logging.getLogger(__name__)
 
 class Command(BaseCommand):
     """
-    Command to refresh materialized views that support the one-row view used by DataBC to create the BCGW layer
+    Command to reset the instance permissions of the admin-only and heritage
+    site graphs for the restricted users and groups
+
+    Only the guardian rows that differ from the desired permissions are
+    written, in batches. --dry-run reports the differences without writing.
+    The resources of each graph are processed in shards by a pool of workers,
+    and only the resources whose permissions changed are reindexed.
+
+    Each shard is written in its own transaction, so a graph is no longer
+    reset in one transaction: when a shard fails, the shards already written
+    are kept and reindexed before the command fails, and running it again
+    resets the remaining resources.
 
     """
 
@@ -34,6 +47,118 @@ class Command(BaseCommand):
             default=False,
             help="Clear any non-standard permissions",
         )
+        parser.add_argument(
+            "-n",
+            "--dry-run",
+            action="store_true",
+            dest="dry_run",
+            default=False,
+            help="Report the permissions that would change without writing them",
+        )
+        parser.add_argument(
+            "-b",
+            "--batch-size",
+            dest="batch_size",
+            type=int,
+            default=1000,
+            help="Number of permission rows inserted or deleted per statement",
+        )
+        parser.add_argument(
+            "-w",
+            "--workers",
+            dest="workers",
+            type=int,
+            default=4,
+            help="Number of shards processed at the same time",
+        )
+        parser.add_argument(
+            "--shard-size",
+            dest="shard_size",
+            type=int,
+            default=10000,
+            help="Number of resources per shard",
+        )
+
+    def _write_progress(self, slug, result):
+        self.stdout.write(
+            "%s: %s/%s shards, %s resources, %s changed (%.0f resources/s)"
+            % (
+                slug,
+                result["done"],
+                result["shards"],
+                result["resources"],
+                len(result["changed"]),
+                result["resources"] / result["duration"] if result["duration"] else 0,
+            )
+        )
+
+    def _reindex(self, resource_ids):
+        """Reindexes the resources of published graphs in batches"""
+        batch_size = settings.BULK_IMPORT_BATCH_SIZE
+        start = time.perf_counter()
+        for index in range(0, len(resource_ids), batch_size):
+            batch = resource_ids[index : index + batch_size]
+            index_resources_using_singleprocessing(
+                resources=Resource.objects.filter(pk__in=batch).exclude(
+                    graph__publication=None
+                ),
+                batch_size=batch_size,
+                quiet=True,
+            )
+            indexed = index + len(batch)
+            self.stdout.write(
+                "Reindexed %s/%s resources (%.0f resources/s)"
+                % (
+                    indexed,
+                    len(resource_ids),
+                    indexed / max(time.perf_counter() - start, 0.001),
+                )
+            )
+
+    def _write_report(self, results, verbosity):
+        self.stdout.write(
+            "%-32s %10s %10s %10s %10s %8s %10s"
+            % (
+                "graph",
+                "resources",
+                "restricted",
+                "add",
+                "remove",
+                "seconds",
+                "per sec",
+            )
+        )
+        for slug, diff in results.items():
+            self.stdout.write(
+                "%-32s %10s %10s %10s %10s %8.1f %10.0f"
+                % (
+                    slug,
+                    diff["resources"],
+                    diff["restricted"],
+                    len(diff["add"]),
+                    len(diff["remove"]),
+                    diff["duration"],
+                    diff["resources"] / diff["duration"] if diff["duration"] else 0,
+                )
+            )
+            if verbosity > 1:
+                for change, keys in (("+", diff["add"]), ("-", diff["remove"])):
+                    for (
+                        principal_type,
+                        object_pk,
+                        principal_id,
+                        permission_id,
+                    ) in sorted(keys):
+                        self.stdout.write(
+                            "  %s %s %s %s:%s"
+                            % (
+                                change,
+                                object_pk,
+                                permission_id,
+                                principal_type,
+                                principal_id,
+                            )
+                        )
 
     def handle(self, *args, **options):
         slugs = (
@@ -41,24 +166,33 @@ class Command(BaseCommand):
             if options["slugs"]
             else None
         )
-        processed_slugs = AdminOnlyPermissionManager().reset_all_permissions(
-            graph_slugs=slugs, clear_all_permissions=options["clear_existing"]
-        )
-        processed_slugs += HeritageSitePermissionManager().reset_all_permissions(
-            graph_slugs=slugs, clear_all_permissions=options["clear_existing"]
-        )
-
-        print("Processed graphs: %s" % processed_slugs)
-        resource_types_uuid = (
-            models.GraphModel.objects.filter(slug__in=processed_slugs)
-            .exclude(publication=None)
-            .values_list("graphid", flat=True)
-        )
-
-        index_resources_by_type(
-            resource_types_uuid,
-            clear_index=True,
-            batch_size=settings.BULK_IMPORT_BATCH_SIZE,
-            quiet=False,
-            recalculate_descriptors=False,
+        results = reset_permissions_in_parallel(
+            [AdminOnlyPermissionManager(), HeritageSitePermissionManager()],
+            graph_slugs=slugs,
+            clear_all_permissions=options["clear_existing"],
+            dry_run=options["dry_run"],
+            batch_size=options["batch_size"],
+            workers=options["workers"],
+            shard_size=options["shard_size"],
+            progress=self._write_progress,
         )
+        self._write_report(results, options["verbosity"])
+        failed = {
+            slug: result["failed"]
+            for slug, result in results.items()
+            if result["failed"]
+        }
+        if not options["dry_run"]:
+            print("Processed graphs: %s" % list(results.keys()))
+            # The shards that were written are reindexed even if others failed
+            self._reindex(
+                sorted(set().union(*[result["changed"] for result in results.values()]))
+            )
+        if failed:
+            raise CommandError(
+                "Unable to reset the permissions of %s, run the command again to "
+                "reset them"
+                % ", ".join(
+                    "%s shards of %s" % (count, slug) for slug, count in failed.items()
+                )
+            )
@@ -0,0 +1,66 @@
+from django.core.management.base import BaseCommand
+import logging
+
+from bcap.util.mvt_seed import seed_tiles
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    """
+    Command to pre-render the low zoom map tiles across BC into the tile cache
+    for each permission scope. Tiles that are still cached are skipped, so
+    after the first run only the tiles touched by geometries edited or
+    restricted since are rendered again.
+
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "-z",
+            "--max-zoom",
+            dest="max_zoom",
+            type=int,
+            default=None,
+            help="Highest zoom to render (default MVT_SEED_MAX_ZOOM)",
+        )
+        parser.add_argument(
+            "-n",
+            "--node",
+            action="append",
+            dest="nodeids",
+            default=None,
+            help="Geometry node of the layer to render (default all MVT layers)",
+        )
+        parser.add_argument(
+            "-u",
+            "--user",
+            action="append",
+            dest="usernames",
+            default=None,
+            help="User whose permission scope is rendered (default MVT_SEED_USERNAMES)",
+        )
+        parser.add_argument(
+            "-f",
+            "--force",
+            action="store_true",
+            dest="force",
+            default=False,
+            help="Render every tile, including those already cached",
+        )
+
+    def handle(self, *args, **options):
+        counts = seed_tiles(
+            nodeids=options["nodeids"],
+            max_zoom=options["max_zoom"],
+            usernames=options["usernames"],
+            force=options["force"],
+        )
+        self.stdout.write(
+            "Rendered %s of %s tiles" % (counts["rendered"], counts["tiles"])
+        )
+        if counts["skipped_scopes"]:
+            self.stdout.write(
+                "Skipped %s permission scopes whose instance permissions changed "
+                "during the run" % counts["skipped_scopes"]
+            )
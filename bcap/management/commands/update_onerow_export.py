@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand
+import logging
+import time
+
+from bcap.util.onerow_export import EXPORT_TABLE, rebuild_export, update_export
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    """
+    Command to update the persistent one-row export table read by DataBC to
+    create the BCGW layer, recomputing only the rows of the sites changed
+    since the last update.
+
+    --rebuild recreates the table from scratch and installs the triggers that
+    log changed resources, which is needed once before incremental updates.
+
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rebuild",
+            action="store_true",
+            dest="rebuild",
+            default=False,
+            help="Recreate and fully load the export table",
+        )
+        parser.add_argument(
+            "-b",
+            "--batch-size",
+            dest="batch_size",
+            type=int,
+            default=1000,
+            help="Number of changelog entries processed per transaction",
+        )
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        if options["rebuild"]:
+            rows = rebuild_export()
+            self.stdout.write(
+                "Loaded %s rows into %s in %.1fs"
+                % (rows, EXPORT_TABLE, time.perf_counter() - start)
+            )
+            return
+        sites = update_export(batch_size=options["batch_size"])
+        self.stdout.write(
+            "Updated %s sites in %s in %.1fs"
+            % (sites, EXPORT_TABLE, time.perf_counter() - start)
+        )
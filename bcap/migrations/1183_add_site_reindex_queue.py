@@ -0,0 +1,30 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bcap", "855_add_qgis_views"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SiteReindexQueue",
+            fields=[
+                (
+                    "resourceinstanceid",
+                    models.UUIDField(primary_key=True, serialize=False),
+                ),
+                ("queued", models.DateTimeField()),
+            ],
+            options={
+                "verbose_name": "Site Reindex Queue Entry",
+                "verbose_name_plural": "Site Reindex Queue",
+                "db_table": "bcap_site_reindex_queue",
+            },
+        ),
+        migrations.AddIndex(
+            model_name="sitereindexqueue",
+            index=models.Index(fields=["queued"], name="bcap_site_reindex_queued_idx"),
+        ),
+    ]
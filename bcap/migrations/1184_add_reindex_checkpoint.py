@@ -0,0 +1,45 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bcap", "1183_add_site_reindex_queue"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ReindexCheckpoint",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("run_name", models.CharField(max_length=64)),
+                ("graph_slug", models.CharField(max_length=64)),
+                ("shard", models.IntegerField()),
+                ("lower_bound", models.UUIDField(null=True)),
+                ("upper_bound", models.UUIDField(null=True)),
+                ("last_resourceinstanceid", models.UUIDField(null=True)),
+                ("indexed", models.BigIntegerField(default=0)),
+                ("completed", models.BooleanField(default=False)),
+                ("updated", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "verbose_name": "Reindex Checkpoint",
+                "verbose_name_plural": "Reindex Checkpoints",
+                "db_table": "bcap_reindex_checkpoints",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("run_name", "graph_slug", "shard"),
+                        name="bcap_reindex_checkpoint_shard_unique",
+                    )
+                ],
+            },
+        ),
+    ]
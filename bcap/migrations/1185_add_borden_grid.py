@@ -0,0 +1,30 @@
+import django.contrib.gis.db.models.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bcap", "1184_add_reindex_checkpoint"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="BordenGrid",
+            fields=[
+                (
+                    "borden_grid",
+                    models.CharField(max_length=4, primary_key=True, serialize=False),
+                ),
+                (
+                    "geom",
+                    django.contrib.gis.db.models.fields.MultiPolygonField(srid=3005),
+                ),
+            ],
+            options={
+                "verbose_name": "Borden Grid",
+                "verbose_name_plural": "Borden Grids",
+                "db_table": "bcap_borden_grid",
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+from django.db import migrations
+import os
+from .util.migration_util import format_sql
+
+
+class Migration(migrations.Migration):
+    # The index is created concurrently so tile edits aren't blocked
+    atomic = False
+
+    dependencies = [
+        ("bcap", "1185_add_borden_grid"),
+    ]
+
+    forward_file = os.path.join(
+        "sql", "v100", "v2026.10.19__get_map_attribute_data_for_resources.sql"
+    )
+    reverse_file = os.path.join(
+        "sql", "v100", "v2025.05.02.0215__get_map_attribute_data.sql"
+    )
+
+    operations = [
+        migrations.RunSQL(
+            "create index concurrently if not exists tiles_nodegroupid_resourceinstanceid_idx on tiles (nodegroupid, resourceinstanceid);",
+            "drop index concurrently if exists tiles_nodegroupid_resourceinstanceid_idx;",
+        ),
+        migrations.RunSQL(
+            format_sql(forward_file),
+            format_sql(reverse_file)
+            + "\ndrop function if exists get_map_attribute_data_for_resources;",
+        ),
+    ]
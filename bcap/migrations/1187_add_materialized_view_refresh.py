@@ -0,0 +1,64 @@
+from django.db import migrations, models
+
+# Unique indexes that let refresh_mvs refresh these views concurrently. The
+# views only exist in databases with the one-row export, so each is guarded.
+UNIQUE_INDEXES = {
+    "mv_bc_right": ("mv_bc_right_unique_idx", "bc_right_id"),
+    "mv_property_address": ("mv_pa_unique_idx", "property_address_id"),
+    "mv_heritage_class": ("mv_hc_unique_idx", "resourceinstanceid"),
+    "mv_heritage_function": (
+        "mv_hf_unique_idx",
+        "resourceinstanceid, state_period",
+    ),
+    "mv_heritage_theme": ("mv_ht_unique_idx", "resourceinstanceid, heritage_theme"),
+    "mv_construction_actors": ("mv_ca_unique_idx", "resourceinstanceid, actor_type"),
+}
+
+
+def format_unique_indexes(statement):
+    return "\n".join(
+        """
+        do $$
+        begin
+            if to_regclass('%s') is not null then
+                %s;
+            end if;
+        end
+        $$;
+        """
+        % (view, statement % {"view": view, "index": index, "columns": columns})
+        for view, (index, columns) in UNIQUE_INDEXES.items()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bcap", "1186_set_based_map_attribute_data"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="MaterializedViewRefresh",
+            fields=[
+                (
+                    "view_name",
+                    models.CharField(max_length=63, primary_key=True, serialize=False),
+                ),
+                ("refreshed", models.DateTimeField()),
+                ("duration", models.FloatField(default=0)),
+                ("concurrently", models.BooleanField(default=False)),
+            ],
+            options={
+                "verbose_name": "Materialized View Refresh",
+                "verbose_name_plural": "Materialized View Refreshes",
+                "db_table": "bcap_materialized_view_refreshes",
+            },
+        ),
+        migrations.RunSQL(
+            format_unique_indexes(
+                "create unique index if not exists %(index)s on %(view)s (%(columns)s)"
+            ),
+            format_unique_indexes("drop index if exists %(index)s"),
+        ),
+    ]
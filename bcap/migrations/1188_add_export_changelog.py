@@ -0,0 +1,24 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bcap", "1187_add_materialized_view_refresh"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ExportChangelog",
+            fields=[
+                ("id", models.BigAutoField(primary_key=True, serialize=False)),
+                ("resourceinstanceid", models.UUIDField()),
+                ("changed", models.DateTimeField()),
+            ],
+            options={
+                "verbose_name": "Export Changelog Entry",
+                "verbose_name_plural": "Export Changelog",
+                "db_table": "bcap_export_changelog",
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bcap", "1188_add_export_changelog"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="IndexBuildChange",
+            fields=[
+                ("id", models.BigAutoField(primary_key=True, serialize=False)),
+                ("resourceinstanceid", models.UUIDField()),
+            ],
+            options={
+                "verbose_name": "Index Build Change",
+                "verbose_name_plural": "Index Build Changes",
+                "db_table": "bcap_index_build_change",
+            },
+        ),
+    ]
@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bcap", "1189_add_index_build_change"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="exportchangelog",
+            name="graph_slug",
+            field=models.CharField(max_length=255, null=True),
+        ),
+    ]
@@ -0,0 +1,48 @@
+-- Enriches all the features of a map tile in one query: the attribute data of
+-- each of the resources, with every tile lookup filtered to those resources
+-- (see tiles_nodegroupid_resourceinstanceid_idx) before joining. Every
+-- requested site gets a row, with or without a protection event.
+create or replace function get_map_attribute_data_for_resources(p_resourceinstanceids uuid[], p_nodeid uuid)
+    returns table
+            (
+                resourceinstanceid uuid,
+                attribute_data     jsonb
+            )
+as
+$$
+with arch_site as (select distinct s.resourceinstanceid
+                   from unnest(p_resourceinstanceids) s(resourceinstanceid)
+                   where p_nodeid = '1b6235b0-0d0f-11ed-98c2-5254008afee6'::uuid), -- Archaeological Site
+     legislative_act as (select t.resourceinstanceid,
+                                (t.tiledata -> '1f28339e-3b93-11ee-b4c5-080027b7463b' -> 0 ->> 'resourceId')::uuid legislative_act_id
+                         from tiles t
+                         where t.nodegroupid = '6cc30064-0d06-11ed-8804-5254008afee6'::uuid
+                           and t.resourceinstanceid in (select s.resourceinstanceid from arch_site s)),
+     borden_number as (select distinct on (t.resourceinstanceid) t.resourceinstanceid,
+                              t.tiledata -> 'e5ecf044-0d06-11ed-86c8-5254008afee6' -> 'en' ->> 'value' borden_number
+                       from tiles t
+                       where t.nodegroupid = 'e5ecf044-0d06-11ed-86c8-5254008afee6'::uuid
+                         and t.resourceinstanceid in (select s.resourceinstanceid from arch_site s)),
+     authorities as (select t.resourceinstanceid,
+                            __arches_get_concept_label((t.tiledata ->> '7789d580-3b87-11ee-a701-080027b7463b')::uuid) authority
+                     from tiles t
+                     where t.nodegroupid = '7789d580-3b87-11ee-a701-080027b7463b'::uuid
+                       and t.resourceinstanceid in (select la.legislative_act_id from legislative_act la))
+select hs.resourceinstanceid,
+       jsonb_build_object('authorities', array_agg(distinct a.authority), 'borden_number', bn.borden_number)
+from arch_site hs
+         left join legislative_act la on la.resourceinstanceid = hs.resourceinstanceid
+         left join borden_number bn on bn.resourceinstanceid = hs.resourceinstanceid
+         left join authorities a on a.resourceinstanceid = la.legislative_act_id
+group by hs.resourceinstanceid, bn.borden_number;
+$$
+    language sql stable;
+
+-- Kept for the per-feature MVT queries of the shared MVTTiler base
+create or replace function get_map_attribute_data(p_resourceinstanceid uuid, nodeid uuid) returns jsonb as
+$$
+select attribute_data
+from get_map_attribute_data_for_resources(array [p_resourceinstanceid], nodeid)
+limit 1;
+$$
+    language sql stable;
@@ -1 +1,7 @@
+from .borden_grid import BordenGrid
 from .borden_number import BordenNumberCounter
+from .export_changelog import ExportChangelog
+from .index_build_change import IndexBuildChange
+from .materialized_view_refresh import MaterializedViewRefresh
+from .reindex_checkpoint import ReindexCheckpoint
+from .site_reindex_queue import SiteReindexQueue
@@ -0,0 +1,55 @@
+from django.contrib.gis.db import models
+from django.db import connection
+
+
+class BordenGrid(models.Model):
+    """
+    Local copy of the Borden grid (WHSE_ARCHAEOLOGY.RAAD_BORDENGRID), loaded
+    with the load_borden_grid command. Geometries are stored in BC Albers.
+    """
+
+    borden_grid = models.CharField(max_length=4, primary_key=True)
+    geom = models.MultiPolygonField(srid=3005, spatial_index=True)
+
+    class Meta:
+        db_table = "bcap_borden_grid"
+        verbose_name = "Borden Grid"
+        verbose_name_plural = "Borden Grids"
+
+    @classmethod
+    def get_borden_grid_for_point(cls, point) -> str | None:
+        """
+        Returns the grid containing the point, or None if it is outside the
+        loaded grid (or the grid hasn't been loaded).
+        """
+        return (
+            cls.objects.filter(geom__intersects=point)
+            .values_list("borden_grid", flat=True)
+            .first()
+        )
+
+    @classmethod
+    def get_borden_grids_for_points(cls, points) -> list[str | None]:
+        """
+        Returns the grid containing each of the points (in BC Albers) with a
+        single query, or None for points outside the loaded grid.
+        """
+        if not points:
+            return []
+
+        with connection.cursor() as cur:
+            cur.execute(
+                """
+                SELECT grid.borden_grid
+                  FROM unnest(%s::float8[], %s::float8[]) WITH ORDINALITY AS p(x, y, idx)
+                  LEFT JOIN LATERAL (
+                        SELECT borden_grid
+                          FROM bcap_borden_grid
+                         WHERE ST_Intersects(geom, ST_SetSRID(ST_MakePoint(p.x, p.y), 3005))
+                         LIMIT 1
+                  ) grid ON true
+                 ORDER BY p.idx
+                """,
+                [[point.x for point in points], [point.y for point in points]],
+            )
+            return [row[0] for row in cur.fetchall()]
@@ -35,6 +35,21 @@ class BordenNumberCounter(models.Model):
 
         return f"{borden_grid}-{next_grid_sequence}"
 
+    @classmethod
+    def get_grid_sequences(cls, borden_grids) -> dict[str, int]:
+        """
+        Returns the last allocated sequence of each borden_grid (0 if none have
+        been allocated) with a single query.
+        """
+        borden_grids = list(borden_grids)
+        with connection.cursor() as cur:
+            cur.execute(
+                "SELECT borden_grid, grid_sequence FROM bcap_borden_number_counters WHERE borden_grid = ANY(%s)",
+                [borden_grids],
+            )
+            sequences = dict(cur.fetchall())
+        return {grid: sequences.get(grid, 0) for grid in borden_grids}
+
     @classmethod
     @transaction.atomic
     def allocate_next_borden_number(cls, borden_grid: str) -> str:
@@ -42,30 +57,58 @@ class BordenNumberCounter(models.Model):
         Atomically increments and returns the next Borden number for the given borden_grid.
         Ensures no duplicates even across concurrent requests.
         """
+        return cls.allocate_borden_numbers(borden_grid, 1)[0]
+
+    @classmethod
+    def allocate_borden_numbers(cls, borden_grid: str, count: int) -> list[str]:
+        """
+        Reserves `count` consecutive Borden numbers for the given borden_grid.
+        """
+        return cls.allocate_borden_number_blocks({borden_grid: count}).get(
+            borden_grid, []
+        )
+
+    @classmethod
+    def allocate_borden_number_blocks(
+        cls, counts: dict[str, int]
+    ) -> dict[str, list[str]]:
+        """
+        Reserves a block of consecutive Borden numbers for each borden_grid in a
+        single statement, creating counters as needed.
+
+        The upsert locks each counter row until the end of the transaction, so
+        concurrent allocations are serialized per grid. Grids are locked in
+        sorted order to avoid deadlocks between overlapping blocks.
+
+        Returns a dict of borden_grid -> allocated Borden numbers
+        """
+        grids = sorted(grid for grid, count in counts.items() if count > 0)
+        if not grids:
+            return {}
+
         with connection.cursor() as cur:
-            # Ensure row exists
             cur.execute(
                 """
-                INSERT INTO bcap_borden_number_counters(borden_grid, grid_sequence)
-                VALUES (%s, 0)
-                ON CONFLICT (borden_grid) DO NOTHING
-                """,
-                [borden_grid],
-            )
-
-            # Atomically increment and return new grid_sequence
-            cur.execute(
+                INSERT INTO bcap_borden_number_counters AS counters(borden_grid, grid_sequence)
+                VALUES %s
+                ON CONFLICT (borden_grid) DO UPDATE
+                   SET grid_sequence = counters.grid_sequence + EXCLUDED.grid_sequence
+             RETURNING borden_grid, grid_sequence
                 """
-                UPDATE bcap_borden_number_counters
-                   SET grid_sequence = grid_sequence + 1
-                 WHERE borden_grid = %s
-             RETURNING grid_sequence
-                """,
-                [borden_grid],
+                % ", ".join(["(%s, %s)"] * len(grids)),
+                [value for grid in grids for value in (grid, counts[grid])],
             )
-            seq = cur.fetchone()[0]
+            last_sequences = dict(cur.fetchall())
 
-        return f"{borden_grid}-{seq}"
+        return {
+            grid: [
+                f"{grid}-{seq}"
+                for seq in range(
+                    last_sequences[grid] - counts[grid] + 1, last_sequences[grid] + 1
+                )
+            ]
+            for grid in grids
+        }
 
     def __str__(self):
         return f"{self.borden_grid}: {self.grid_sequence}"
@@ -0,0 +1,49 @@
+from django.db import models, connection
+
+
+class ExportChangelog(models.Model):
+    """
+    Resources whose rows in the persistent one-row export may be stale.
+
+    Rows are written by triggers on the tiles and resource_instances tables,
+    and on deletes from resource_x_resource (see bcap.util.onerow_export), so
+    changes from any source are captured, and removed once the export rows
+    have been recomputed.
+    """
+
+    id = models.BigAutoField(primary_key=True)
+    resourceinstanceid = models.UUIDField()
+    # Slug of the graph of the resource, which can't be looked up once the
+    # resource is deleted
+    graph_slug = models.CharField(max_length=255, null=True)
+    changed = models.DateTimeField()
+
+    class Meta:
+        db_table = "bcap_export_changelog"
+        verbose_name = "Export Changelog Entry"
+        verbose_name_plural = "Export Changelog"
+
+    @classmethod
+    def pop(cls, limit) -> list[tuple[str, str | None]]:
+        """
+        Removes up to `limit` of the oldest entries and returns their
+        (resource, graph slug) pairs.
+
+        Rows locked by another worker are skipped, and the removal is rolled
+        back with the caller's transaction if the update fails.
+        """
+        with connection.cursor() as cur:
+            cur.execute(
+                """
+                DELETE FROM bcap_export_changelog
+                WHERE id IN (
+                    SELECT id FROM bcap_export_changelog
+                    ORDER BY id
+                    LIMIT %s
+                    FOR UPDATE SKIP LOCKED
+                )
+                RETURNING resourceinstanceid, graph_slug
+                """,
+                [limit],
+            )
+            return list({(str(row[0]), row[1]) for row in cur.fetchall()})
@@ -0,0 +1,45 @@
+from django.db import models, connection
+
+
+class IndexBuildChange(models.Model):
+    """
+    Resources changed while a blue/green index build was running, whose
+    documents in the new indexes may be stale.
+
+    Rows are written by triggers on the tiles and resource_instances tables
+    (see bcap.util.blue_green_index) that only exist during a build, and
+    removed once the resources have been indexed again.
+    """
+
+    id = models.BigAutoField(primary_key=True)
+    resourceinstanceid = models.UUIDField()
+
+    class Meta:
+        db_table = "bcap_index_build_change"
+        verbose_name = "Index Build Change"
+        verbose_name_plural = "Index Build Changes"
+
+    @classmethod
+    def pop(cls, limit) -> list[str]:
+        """
+        Removes up to `limit` of the oldest entries and returns their
+        resources.
+
+        The removal is rolled back with the caller's transaction if the
+        indexing fails.
+        """
+        with connection.cursor() as cur:
+            cur.execute(
+                """
+                DELETE FROM bcap_index_build_change
+                WHERE id IN (
+                    SELECT id FROM bcap_index_build_change
+                    ORDER BY id
+                    LIMIT %s
+                    FOR UPDATE SKIP LOCKED
+                )
+                RETURNING resourceinstanceid
+                """,
+                [limit],
+            )
+            return list({str(row[0]) for row in cur.fetchall()})
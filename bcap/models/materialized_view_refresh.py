@@ -0,0 +1,18 @@
+from django.db import models
+
+
+class MaterializedViewRefresh(models.Model):
+    """
+    Last refresh of a materialized view by refresh_mvs. `refreshed` is when
+    the refresh started, so edits made while it ran are picked up next time.
+    """
+
+    view_name = models.CharField(max_length=63, primary_key=True)
+    refreshed = models.DateTimeField()
+    duration = models.FloatField(default=0)
+    concurrently = models.BooleanField(default=False)
+
+    class Meta:
+        db_table = "bcap_materialized_view_refreshes"
+        verbose_name = "Materialized View Refresh"
+        verbose_name_plural = "Materialized View Refreshes"
@@ -0,0 +1,33 @@
+from django.db import models
+
+
+class ReindexCheckpoint(models.Model):
+    """
+    Progress of one shard of a graph in a resumable reindex run.
+
+    A shard covers the resources of the graph with ids greater than
+    `lower_bound` and up to and including `upper_bound` (either may be null
+    for the first and last shard). `last_resourceinstanceid` is the last id
+    indexed, so a restarted run carries on from there.
+    """
+
+    run_name = models.CharField(max_length=64)
+    graph_slug = models.CharField(max_length=64)
+    shard = models.IntegerField()
+    lower_bound = models.UUIDField(null=True)
+    upper_bound = models.UUIDField(null=True)
+    last_resourceinstanceid = models.UUIDField(null=True)
+    indexed = models.BigIntegerField(default=0)
+    completed = models.BooleanField(default=False)
+    updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "bcap_reindex_checkpoints"
+        verbose_name = "Reindex Checkpoint"
+        verbose_name_plural = "Reindex Checkpoints"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["run_name", "graph_slug", "shard"],
+                name="bcap_reindex_checkpoint_shard_unique",
+            )
+        ]
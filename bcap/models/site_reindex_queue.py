@@ -0,0 +1,60 @@
+from django.db import models, connection
+from django.utils import timezone
+
+
+class SiteReindexQueue(models.Model):
+    """
+    Archaeological sites whose search documents are stale because a related
+    site visit or HRIA record changed.
+
+    Queueing a site again pushes back its `queued` time, so a burst of edits
+    results in a single reindex once the site has been quiet for the
+    debounce period.
+    """
+
+    resourceinstanceid = models.UUIDField(primary_key=True)
+    queued = models.DateTimeField()
+
+    class Meta:
+        db_table = "bcap_site_reindex_queue"
+        verbose_name = "Site Reindex Queue Entry"
+        verbose_name_plural = "Site Reindex Queue"
+        indexes = [models.Index(fields=["queued"], name="bcap_site_reindex_queued_idx")]
+
+    @classmethod
+    def enqueue(cls, resourceinstanceids):
+        now = timezone.now()
+        cls.objects.bulk_create(
+            [
+                cls(resourceinstanceid=resourceinstanceid, queued=now)
+                for resourceinstanceid in set(resourceinstanceids)
+            ],
+            update_conflicts=True,
+            unique_fields=["resourceinstanceid"],
+            update_fields=["queued"],
+        )
+
+    @classmethod
+    def pop_ready(cls, queued_before, limit) -> list[str]:
+        """
+        Removes and returns up to `limit` sites queued before the given time.
+
+        Rows locked by another worker are skipped, and the removal is rolled
+        back with the caller's transaction if the reindex fails.
+        """
+        with connection.cursor() as cur:
+            cur.execute(
+                """
+                DELETE FROM bcap_site_reindex_queue
+                WHERE resourceinstanceid IN (
+                    SELECT resourceinstanceid FROM bcap_site_reindex_queue
+                    WHERE queued <= %s
+                    ORDER BY queued
+                    LIMIT %s
+                    FOR UPDATE SKIP LOCKED
+                )
+                RETURNING resourceinstanceid
+                """,
+                [queued_before, limit],
+            )
+            return [str(row[0]) for row in cur.fetchall()]
@@ -12,6 +12,7 @@ from bcap.util.business_data_proxy import (
     SiteVisitDataProxy,
     HriaDiscontinuedDataProxy,
 )
+from bcap.util.bulk_descriptors import get_tile_bundles
 from arches.app.search.es_mapping_modifier import EsMappingModifier
 
 
@@ -22,6 +23,25 @@ class CustomSearchValue(EsMappingModifier):
     site_visit_proxy = None
     hria_discontinued_proxy = None
 
+    site_visit_attributes = [
+        sva.ASSOCIATED_PERMIT,
+        sva.CULTURAL_MATERIAL_TYPE,
+        sva.SITE_FORM_AUTHORS,
+        sva.ARCHAEOLOGICAL_CULTURE,
+        sva.BIOGEOGRAPHY_TYPE,
+        sva.TEAM_MEMBER,
+        sva.MEMBER_ROLES,
+    ]
+    hria_discontinued_attributes = [
+        hdda.UNREVIEWED_ADIF_RECORD,
+        hdda.SITE_ENTERED_BY,
+    ]
+
+    # Custom values calculated ahead of indexing, by site resourceinstanceid
+    _prefetched_values = {}
+    # Sites registered for batched enrichment, mapped to their batch
+    _pending_batches = {}
+
     # def __init__(self):
     #     pass
 
@@ -34,95 +54,119 @@ class CustomSearchValue(EsMappingModifier):
             CustomSearchValue.initialized = True
 
     @staticmethod
-    def add_search_terms(resourceinstance, document, terms):
+    def register_batches(resourceinstanceids, batch_size):
+        """
+        Registers the archaeological sites about to be indexed. The first time
+        one of them is indexed the custom values of its whole batch are
+        calculated at once, rather than site by site.
+        """
+        resourceinstanceids = [str(rid) for rid in resourceinstanceids]
+        for index in range(0, len(resourceinstanceids), batch_size):
+            batch = tuple(resourceinstanceids[index : index + batch_size])
+            for resourceinstanceid in batch:
+                CustomSearchValue._pending_batches[resourceinstanceid] = batch
+
+    @staticmethod
+    def prefetch(resourceinstanceids):
+        for resourceinstanceid in resourceinstanceids:
+            CustomSearchValue._pending_batches.pop(str(resourceinstanceid), None)
+        CustomSearchValue._prefetched_values.update(
+            CustomSearchValue.get_custom_values_for_sites(resourceinstanceids)
+        )
+
+    @staticmethod
+    def clear_prefetched():
+        CustomSearchValue._prefetched_values = {}
+        CustomSearchValue._pending_batches = {}
+
+    @staticmethod
+    def get_custom_values_for_sites(resourceinstanceids) -> dict[str, set[str]]:
+        """
+        Calculates the custom values of a set of archaeological sites with one
+        query for the related resources and one for their tiles.
+        """
         CustomSearchValue.initialize()
+        related_ids = CustomSearchValue.arch_site_proxy.get_related_resource_ids(
+            resourceinstanceids,
+            [GraphSlugs.HRIA_DISCONTINUED_DATA, GraphSlugs.SITE_VISIT],
+        )
+
+        bundle_ids = set()
+        for related in related_ids.values():
+            bundle_ids |= set(related[GraphSlugs.SITE_VISIT])
+            bundle_ids |= set(related[GraphSlugs.HRIA_DISCONTINUED_DATA][:1])
+
+        tile_bundles = get_tile_bundles(
+            bundle_ids,
+            CustomSearchValue.site_visit_proxy.get_nodegroup_ids(
+                CustomSearchValue.site_visit_attributes
+            )
+            | CustomSearchValue.hria_discontinued_proxy.get_nodegroup_ids(
+                CustomSearchValue.hria_discontinued_attributes
+            ),
+        )
+
+        return {
+            resourceinstanceid: CustomSearchValue._get_custom_values(
+                related, tile_bundles
+            )
+            for resourceinstanceid, related in related_ids.items()
+        }
+
+    @staticmethod
+    def _get_custom_values(related, tile_bundles) -> set[str]:
         custom_values = set(())
+        hria_discontinued = related[GraphSlugs.HRIA_DISCONTINUED_DATA]
+
+        if len(
+            hria_discontinued
+        ) > 0 and CustomSearchValue.hria_discontinued_proxy.get_value_from_node(
+            hdda.UNREVIEWED_ADIF_RECORD,
+            use_boolean_label=False,
+            tile_bundle=tile_bundles[hria_discontinued[0]],
+        ):
+            custom_values |= {"adif"}
+            custom_values |= {
+                (
+                    f"""adif_{hdda.SITE_ENTERED_BY}:{CustomSearchValue.hria_discontinued_proxy.get_value_from_node(
+                    hdda.SITE_ENTERED_BY,
+                    tile_bundle=tile_bundles[hria_discontinued[0]],
+                )}"""
+                )
+            }
 
-        if resourceinstance.graph.slug == GraphSlugs.ARCHAEOLOGICAL_SITE:
-            # site_visits = CustomSearchValue.arch_site_proxy.get_related_resources(
-            #     resourceinstance, GraphSlugs.SITE_VISIT
-            # )
-            # site_visit_nodes=[sva.]
-            # CustomSearchValue.site_visit_proxy.get_value_from_node()
-            hria_discontinued = CustomSearchValue.arch_site_proxy.get_related_resources(
-                resourceinstance, GraphSlugs.HRIA_DISCONTINUED_DATA
+        for site_visit_id in related[GraphSlugs.SITE_VISIT]:
+            for attribute in CustomSearchValue.site_visit_attributes:
+                value = CustomSearchValue.site_visit_proxy.get_value_from_node(
+                    attribute, tile_bundle=tile_bundles[site_visit_id]
+                )
+                if value and type(value) is list:
+                    custom_values |= set([f"{attribute}:{val}" for val in value])
+                elif value:
+                    custom_values |= {f"{attribute}:{value}"}
+
+        return custom_values
+
+    @staticmethod
+    def _get_site_custom_values(resourceinstanceid) -> set[str]:
+        resourceinstanceid = str(resourceinstanceid)
+        if resourceinstanceid not in CustomSearchValue._prefetched_values:
+            CustomSearchValue.prefetch(
+                CustomSearchValue._pending_batches.get(
+                    resourceinstanceid, (resourceinstanceid,)
+                )
             )
+        return CustomSearchValue._prefetched_values.pop(resourceinstanceid, set(()))
 
-            if len(
-                hria_discontinued
-            ) > 0 and CustomSearchValue.hria_discontinued_proxy.get_value_from_node(
-                hdda.UNREVIEWED_ADIF_RECORD,
-                hria_discontinued[0].resourceinstanceid,
-                use_boolean_label=False,
-            ):
-                custom_values |= {"adif"}
-                custom_values |= {
-                    (
-                        f"""adif_{hdda.SITE_ENTERED_BY}:{CustomSearchValue.hria_discontinued_proxy.get_value_from_node(
-                        hdda.SITE_ENTERED_BY,
-                        hria_discontinued[0].resourceinstanceid,
-                    )}"""
-                    )
-                }
+    @staticmethod
+    def add_search_terms(resourceinstance, document, terms):
+        CustomSearchValue.initialize()
+        custom_values = set(())
 
-            site_visits = CustomSearchValue.arch_site_proxy.get_related_resources(
-                resourceinstance, GraphSlugs.SITE_VISIT
+        if resourceinstance.graph.slug == GraphSlugs.ARCHAEOLOGICAL_SITE:
+            custom_values = CustomSearchValue._get_site_custom_values(
+                resourceinstance.resourceinstanceid
             )
-            site_visit_attributes = [
-                sva.ASSOCIATED_PERMIT,
-                sva.CULTURAL_MATERIAL_TYPE,
-                sva.SITE_FORM_AUTHORS,
-                sva.ARCHAEOLOGICAL_CULTURE,
-                sva.BIOGEOGRAPHY_TYPE,
-                sva.TEAM_MEMBER,
-                sva.MEMBER_ROLES,
-            ]
-
-            for site_visit in site_visits:
-                for attribute in site_visit_attributes:
-                    value = CustomSearchValue.site_visit_proxy.get_value_from_node(
-                        attribute, site_visit.resourceinstanceid
-                    )
-                    if value and type(value) is list:
-                        custom_values |= set([f"{attribute}:{val}" for val in value])
-                    elif value:
-                        custom_values |= {f"{attribute}:{value}"}
-            # print(custom_values)
-            # sample_ids = CustomSearchValue.collection_event_proxy.get_sample_ids(
-            #     resourceinstance
-            # )
-            #
-            # custom_values |= set(
-            #     CustomSearchValue.fossil_sample_proxy.get_scientific_names_from_samples(
-            #         sample_ids
-            #     )
-            # )
-            # custom_values |= set(
-            #     CustomSearchValue.fossil_sample_proxy.get_common_names_from_samples(
-            #         sample_ids
-            #     )
-            # )
-            #
-            # custom_value_aliases = [
-            #     (fsa.MINIMUM_TIME, fsa.MINIMUM_TIME_UNCERTAIN),
-            #     (fsa.MAXIMUM_TIME, fsa.MAXIMUM_TIME_UNCERTAIN),
-            #     (fsa.GEOLOGICAL_GROUP, fsa.GEOLOGICAL_GROUP_UNCERTAIN),
-            #     (fsa.GEOLOGICAL_FORMATION, fsa.GEOLOGICAL_FORMATION_UNCERTAIN),
-            #     (fsa.GEOLOGICAL_MEMBER, fsa.GEOLOGICAL_MEMBER_UNCERTAIN),
-            #     (fsa.FOSSIL_ABUNDANCE, None),
-            #     (fsa.FOSSIL_SIZE_CATEGORY, None),
-            #     (fsa.FOSSIL_SAMPLE_SIGNIFICANT, None),
-            #     (fsa.STORAGE_REFERENCE, None),
-            # ]
-            # for alias in custom_value_aliases:
-            #     custom_values |= set(
-            #         CustomSearchValue.fossil_sample_proxy.get_values_from_samples(
-            #             samples=sample_ids,
-            #             node_alias=alias[0],
-            #             uncertainty_alias=alias[1],
-            #             flatten=True,
-            #         )
-            #     )
 
         # print("Adding custom values: %s" % custom_values)
         if CustomSearchValue.custom_search_path not in document:
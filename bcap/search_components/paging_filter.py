@@ -2,6 +2,8 @@ from arches.app.models.system_settings import settings
 from arches.app.search.components.base import BaseSearchFilter
 from arches.app.utils.pagination import get_paginator
 
+from bcap.search_components.standard_search_view import get_total_hits
+
 
 details = {
     "searchcomponentid": "7aff5819-651c-4390-9b9a-a61221ba52c6",
@@ -51,11 +53,9 @@ class PagingFilter(BaseSearchFilter):
         if response_object.get("_cross_model_pagination_handled"):
             return
 
-        total = (
-            response_object["results"]["hits"]["total"]["value"]
-            if response_object["results"]["hits"]["total"]["value"]
-            <= settings.SEARCH_RESULT_LIMIT
-            else settings.SEARCH_RESULT_LIMIT
+        total = min(
+            get_total_hits(response_object["results"])[0],
+            settings.SEARCH_RESULT_LIMIT,
         )
 
         page_param = self._get_param(self.componentname, "1")
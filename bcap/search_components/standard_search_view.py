@@ -15,11 +15,12 @@ from arches.app.utils.permission_backend import (
 from arches.app.utils.string_utils import get_str_kwarg_as_bool
 from arches.app.views.search import (
     append_instance_permission_filter_dsl,
-    get_permitted_nodegroups,
     get_provisional_type,
 )
 from django.utils.translation import gettext as _
 
+from bcap.util.permission_snapshot import get_permission_snapshot
+
 
 details = {
     "classname": "StandardSearchView",
@@ -124,6 +125,15 @@ details = {
 logger = logging.getLogger(__name__)
 
 
+def get_total_hits(results: dict) -> Tuple[int, bool]:
+    """
+    Returns the total of a search response and whether it's approximate,
+    which is the case when there are more hits than SEARCH_TRACK_TOTAL_HITS
+    """
+    total = results["hits"]["total"]
+    return total["value"], total.get("relation", "eq") == "gte"
+
+
 class StandardSearchView(BaseSearchView):
     def append_dsl(self, search_query_object: dict, **kwargs) -> None:
         search_query_object["query"].include("displaydescription")
@@ -152,6 +162,9 @@ class StandardSearchView(BaseSearchView):
         total = int(self.request.GET.get("total", "0"))
         resourceinstanceid = self.request.GET.get("id", None)
         dsl = search_query_object["query"]
+        # The main query counts the hits, so post_search_hook doesn't need a
+        # separate count request
+        dsl.dsl["track_total_hits"] = settings.SEARCH_TRACK_TOTAL_HITS
 
         if for_export or pages:
             results = dsl.search(index=RESOURCES_INDEX, scroll="1m")
@@ -221,7 +234,9 @@ class StandardSearchView(BaseSearchView):
                 "sort_order": sorted_query_obj.get("sort-order", "asc"),
             }
 
-        permitted_nodegroups = get_permitted_nodegroups(self.request.user)
+        permitted_nodegroups = get_permission_snapshot(self.request.user)[
+            "permitted_nodegroups"
+        ]
         include_provisional = get_provisional_type(self.request)
 
         try:
@@ -274,8 +289,9 @@ class StandardSearchView(BaseSearchView):
         response_object: dict,
         **kwargs,
     ) -> None:
-        dsl = search_query_object["query"]
+        total, approximate = get_total_hits(response_object["results"])
         response_object["reviewer"] = user_is_resource_reviewer(self.request.user)
         response_object["timestamp"] = datetime.now()
-        response_object["total_results"] = dsl.count(index=RESOURCES_INDEX)
+        response_object["total_results"] = total
+        response_object["total_results_approximate"] = approximate
         response_object["userid"] = self.request.user.id
@@ -53,6 +53,10 @@ FUNCTION_LOCATIONS.append("bcap.functions")
 ETL_MODULE_LOCATIONS.append("bcap.etl_modules")
 SEARCH_COMPONENT_LOCATIONS.append("bcap.search_components")
 
+# Hits counted by each search (track_total_hits). True counts all of them; a
+# number stops counting there and the total is reported as approximate.
+SEARCH_TRACK_TOTAL_HITS = True
+
 LOCALE_PATHS.insert(0, os.path.join(APP_ROOT, "locale"))
 
 FILE_TYPE_CHECKING = "lenient"
@@ -138,6 +142,11 @@ if ELASTICSEARCH_CERT_LOCATION and ELASTICSEARCH_API_KEY:
     }
 # a prefix to append to all elasticsearch indexes, note: must be lower case
 ELASTICSEARCH_PREFIX = "bcap" + get_env_variable("APP_SUFFIX")
+# Set by bc_reindex_database --blue-green while it builds a new version of the
+# indexes, which are then swapped in under aliases named with the usual prefix
+ELASTICSEARCH_INDEX_VERSION = get_env_variable("ES_INDEX_VERSION", is_optional=True)
+if ELASTICSEARCH_INDEX_VERSION:
+    ELASTICSEARCH_PREFIX += "_v" + ELASTICSEARCH_INDEX_VERSION
 
 REFERENCES_INDEX_NAME = "references"
 ELASTICSEARCH_CUSTOM_INDEXES = [
@@ -427,6 +436,28 @@ CACHES = {
     },
 }
 
+# Cache holding a snapshot of the permissions of each user used by search, map
+# tiles and exports (see bcap.util.permission_snapshot). Snapshots are
+# invalidated when permissions change, so the timeout only bounds their size.
+PERMISSION_SNAPSHOT_CACHE_ALIAS = "user_permission"
+PERMISSION_SNAPSHOT_TIMEOUT = 24 * 60 * 60
+
+# Cache holding the rendered map vector tiles (see bcap.util.mvt_cache). Use a
+# shared or file based cache so tiles are reused between processes.
+MVT_CACHE_ALIAS = get_env_variable("MVT_CACHE_ALIAS", is_optional=True) or "default"
+# Seconds a cached vector tile is kept, by minimum zoom. Edited geometries
+# invalidate the tiles they touch, so these only bound stale permission scopes.
+MVT_CACHE_TIMEOUTS = {0: 24 * 60 * 60, 9: 6 * 60 * 60, 13: 60 * 60}
+# Zooms 0 to MVT_SEED_MAX_ZOOM are pre-rendered across BC (seed_mvt_tiles) for
+# the permission scope of each of these users
+MVT_SEED_MAX_ZOOM = 8
+MVT_SEED_USERNAMES = ["anonymous"]
+MVT_SEED_INTERVAL_SECONDS = 15 * 60
+
+# Most consecutive Borden numbers the external Borden number endpoint reserves
+# in one request
+BORDEN_NUMBER_MAX_RESERVE_COUNT = 100
+
 # Hide nodes and cards in a report that have no data
 HIDE_EMPTY_NODES_IN_REPORT = True
 
@@ -540,6 +571,20 @@ CELERY_TASK_SERIALIZER = "json"
 
 CELERY_SEARCH_EXPORT_EXPIRES = 24 * 3600  # seconds
 CELERY_SEARCH_EXPORT_CHECK = 3600  # seconds
+CELERY_IMPORTS = ("bcap.tasks.tasks",)
+
+# Archaeological sites are reindexed once their site visits / HRIA records
+# haven't changed for this long
+SITE_REINDEX_DEBOUNCE_SECONDS = 60
+
+# The one-row export table read by DataBC is updated with the sites changed
+# since the last update this often (see update_onerow_export)
+ONEROW_EXPORT_INTERVAL_SECONDS = 5 * 60
+
+# refresh_mvs only detects changes made through Arches (the edit log), so a
+# materialized view last refreshed longer ago than this is refreshed anyway,
+# picking up bulk loads and direct SQL changes
+MATERIALIZED_VIEW_MAX_AGE_SECONDS = 24 * 3600
 
 CELERY_BEAT_SCHEDULE = {
     "delete-expired-search-export": {
@@ -551,6 +596,18 @@ CELERY_BEAT_SCHEDULE = {
         "schedule": CELERY_SEARCH_EXPORT_CHECK,
         "args": ("Celery Beat is Running",),
     },
+    "reindex-dependent-sites": {
+        "task": "bcap.tasks.tasks.reindex_dependent_sites",
+        "schedule": SITE_REINDEX_DEBOUNCE_SECONDS,
+    },
+    "seed-mvt-tiles": {
+        "task": "bcap.tasks.tasks.seed_mvt_tiles",
+        "schedule": MVT_SEED_INTERVAL_SECONDS,
+    },
+    "update-onerow-export": {
+        "task": "bcap.tasks.tasks.update_onerow_export",
+        "schedule": ONEROW_EXPORT_INTERVAL_SECONDS,
+    },
 }
 
 # Set to True if you want to send celery tasks to the broker without being able to detect celery.
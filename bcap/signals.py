@@ -0,0 +1,125 @@
+from django.contrib.auth.models import Group, User
+from django.core.signals import request_finished
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+    pre_save,
+)
+from django.dispatch import receiver
+from guardian.models import GroupObjectPermission, UserObjectPermission
+
+from arches.app.models import models
+from arches_controlled_lists.models import List, ListItem, ListItemValue
+from celery.signals import task_postrun
+
+from bcap.util.bulk_descriptors import clear_shared_tile_bundle
+from bcap.util.controlled_list import invalidate_controlled_lists
+from bcap.util.descriptor_dependencies import (
+    clear_changed_nodegroups,
+    record_tile_change,
+)
+from bcap.util.graph import invalidate_graph_registry
+from bcap.util.mvt_cache import invalidate_tile_geometries, resource_permission_changed
+from bcap.util.permission_snapshot import (
+    invalidate_permission_snapshots,
+    object_permission_changed,
+    user_groups_changed,
+)
+from bcap.util.site_reindex import queue_site_for_relationship, queue_sites_for_tile
+
+
+@receiver(post_save, sender=List)
+@receiver(post_delete, sender=List)
+@receiver(post_save, sender=ListItem)
+@receiver(post_delete, sender=ListItem)
+@receiver(post_save, sender=ListItemValue)
+@receiver(post_delete, sender=ListItemValue)
+def controlled_list_changed(sender, instance, **kwargs):
+    invalidate_controlled_lists()
+
+
+# Graphs are saved through the Graph proxy model, so these receivers also
+# filter on the instance
+@receiver(post_save)
+@receiver(post_delete)
+def graph_changed(sender, instance, **kwargs):
+    if isinstance(instance, (models.GraphModel, models.Node, models.NodeGroup)):
+        invalidate_graph_registry()
+
+
+# Arches saves tiles through subclasses of TileModel, so these receivers
+# aren't bound to a sender and filter on the instance instead.
+@receiver(pre_save)
+@receiver(pre_delete)
+def tile_changing(sender, instance, **kwargs):
+    if isinstance(instance, models.TileModel):
+        record_tile_change(instance)
+        clear_shared_tile_bundle(instance.resourceinstance_id)
+        invalidate_tile_geometries(instance)
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def tile_changed(sender, instance, **kwargs):
+    if isinstance(instance, models.TileModel):
+        queue_sites_for_tile(instance)
+
+
+@receiver(post_save, sender=models.ResourceXResource)
+@receiver(post_delete, sender=models.ResourceXResource)
+def relationship_changed(sender, instance, **kwargs):
+    queue_site_for_relationship(instance)
+
+
+@receiver(post_save, sender=UserObjectPermission)
+@receiver(post_delete, sender=UserObjectPermission)
+@receiver(post_save, sender=GroupObjectPermission)
+@receiver(post_delete, sender=GroupObjectPermission)
+def guardian_permission_changed(sender, instance, **kwargs):
+    object_permission_changed(instance)
+    resource_permission_changed(instance)
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def user_group_membership_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action in ("post_add", "post_remove", "pre_clear"):
+        user_groups_changed(instance, reverse, pk_set)
+
+
+@receiver(m2m_changed, sender=User.user_permissions.through)
+def user_model_permissions_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear"):
+        invalidate_permission_snapshots(pk_set if reverse else [instance.pk])
+
+
+@receiver(m2m_changed, sender=Group.permissions.through)
+def group_model_permissions_changed(sender, action, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear"):
+        invalidate_permission_snapshots()
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, **kwargs):
+    invalidate_permission_snapshots([instance.pk])
+
+
+@receiver(post_save, sender=models.NodeGroup)
+@receiver(post_delete, sender=models.NodeGroup)
+def nodegroup_changed(sender, instance, **kwargs):
+    invalidate_permission_snapshots()
+
+
+@receiver(post_save)
+def resource_saved(sender, instance, **kwargs):
+    if isinstance(instance, models.ResourceInstance):
+        clear_changed_nodegroups(instance.resourceinstanceid)
+        clear_shared_tile_bundle(instance.resourceinstanceid)
+
+
+@receiver(request_finished)
+@task_postrun.connect
+def clear_descriptor_dependencies(*args, **kwargs):
+    clear_changed_nodegroups()
+    clear_shared_tile_bundle()
@@ -12,6 +12,27 @@ from arches.app.utils.message_contexts import return_message_context
 from tempfile import NamedTemporaryFile
 
 
+@shared_task
+def reindex_dependent_sites():
+    from bcap.util.site_reindex import reindex_queued_sites
+
+    return reindex_queued_sites()
+
+
+@shared_task
+def seed_mvt_tiles():
+    from bcap.util.mvt_seed import seed_tiles
+
+    return seed_tiles()
+
+
+@shared_task
+def update_onerow_export():
+    from bcap.util.onerow_export import update_export
+
+    return update_export()
+
+
 @shared_task(bind=True)
 def export_search_results(self, userid, request_values, format, report_link):
     from bcap.search.search_export import (
@@ -5,6 +5,7 @@ from arches.app.views.file import FileView
 from bcap.views.api import (
     BordenNumber,
     BordenNumberExternal,
+    BordenNumberBatchExternal,
     MVT,
     LegislativeAct,
     RegisterType,
@@ -51,6 +52,11 @@ urlpatterns = [
         BordenNumberExternal.as_view(),
         name="borden-number-external",
     ),
+    path(
+        f"{PREFIX}api/borden-number/batch/",
+        BordenNumberBatchExternal.as_view(),
+        name="borden-number-batch-external",
+    ),
     path(
         f"{PREFIX}register_type/<uuid:resourceinstanceid>",
         RegisterType.as_view(),
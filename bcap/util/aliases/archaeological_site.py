@@ -54,6 +54,7 @@ class ArchaeologicalSiteAliases(AbstractAliases):
     NAME_REMARKS = "name_remarks"
     NAME_TYPE = "name_type"
     NROS_FILE_NUMBER = "nros_file_number"
+    OFFICIALLY_RECOGNIZED_SITE = "officially_recognized_site"
     PARCEL_OWNER_TYPE = "parcel_owner_type"
     PARENT_SITE = "parent_site"
     PHOTOGRAPHER = "photographer"
@@ -0,0 +1,223 @@
+import logging
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from arches.app.models import models
+from arches.app.models.resource import Resource
+from arches.app.models.system_settings import settings
+from arches.app.search.mappings import (
+    RESOURCES_INDEX,
+    TERMS_INDEX,
+    prepare_resource_index,
+    prepare_terms_index,
+)
+from arches.app.search.search_engine_factory import SearchEngineFactory
+from arches.app.utils.index_database import index_resources_using_singleprocessing
+
+from bcap.models import IndexBuildChange
+
+logger = logging.getLogger(__name__)
+
+# Applied to every index of a build while it is loaded, and reset afterwards
+BULK_LOAD_SETTINGS = {"refresh_interval": "-1", "number_of_replicas": 0}
+
+# Triggers recording the resources changed from any source while a build runs.
+# They only exist during a build.
+CHANGE_TRIGGERS = [
+    ("bcap_index_build_insert", "insert", "tiles", "new"),
+    ("bcap_index_build_update", "update", "tiles", "new"),
+    ("bcap_index_build_delete", "delete", "tiles", "old"),
+    ("bcap_index_build_insert", "insert", "resource_instances", "new"),
+    ("bcap_index_build_update", "update", "resource_instances", "new"),
+    ("bcap_index_build_delete", "delete", "resource_instances", "old"),
+]
+
+
+class BlueGreenIndexBuild:
+    """
+    Builds a new version of the search indexes alongside the live ones.
+
+    The indexes of a build are named with the live ELASTICSEARCH_PREFIX plus
+    a version ("bcap_v20250101120000_resources"). An index template gives
+    them bulk load settings while they're being filled. Once loaded, the
+    settings are restored and the live names ("bcap_resources") are swapped
+    over to the new indexes as aliases in a single request.
+    """
+
+    def __init__(self, version=None, es=None):
+        self.version = version if version else timezone.now().strftime("%Y%m%d%H%M%S")
+        self.live_prefix = settings.ELASTICSEARCH_PREFIX.lower()
+        self.build_prefix = "%s_v%s" % (self.live_prefix, self.version)
+        self.es = es if es else SearchEngineFactory().create().es
+
+    @property
+    def template_name(self):
+        return "%s_bulk_load" % self.build_prefix
+
+    def live_name(self, index_name):
+        return "%s_%s" % (self.live_prefix, index_name[len(self.build_prefix) + 1 :])
+
+    def prepare(self):
+        """
+        Adds the bulk load template and creates the resources and terms
+        indexes, which a resumable reindex doesn't create itself.
+        """
+        self.es.indices.put_index_template(
+            name=self.template_name,
+            index_patterns=["%s_*" % self.build_prefix],
+            template={"settings": {"index": BULK_LOAD_SETTINGS}},
+            priority=500,
+        )
+        for index, prepare_index in (
+            (RESOURCES_INDEX, prepare_resource_index),
+            (TERMS_INDEX, prepare_terms_index),
+        ):
+            body = prepare_index(create=False)
+            self.es.indices.create(
+                index="%s_%s" % (self.build_prefix, index),
+                mappings=body.get("mappings"),
+                settings=body.get("settings"),
+            )
+
+    def get_built_indexes(self) -> list[str]:
+        return sorted(
+            self.es.indices.get(
+                index="%s_*" % self.build_prefix, allow_no_indices=True
+            ).keys()
+        )
+
+    def _live_replicas(self, live_name):
+        if not self.es.indices.exists(index=live_name):
+            return None
+        index_settings = self.es.indices.get_settings(index=live_name)
+        for live_settings in index_settings.values():
+            return live_settings["settings"]["index"].get("number_of_replicas")
+
+    def finish_load(self, built_indexes):
+        """
+        Restores the refresh interval and replicas of the loaded indexes,
+        copying the replica count of the indexes they replace.
+        """
+        for index_name in built_indexes:
+            self.es.indices.put_settings(
+                index=index_name,
+                settings={
+                    "index": {
+                        "refresh_interval": None,
+                        "number_of_replicas": self._live_replicas(
+                            self.live_name(index_name)
+                        ),
+                    }
+                },
+            )
+            self.es.indices.refresh(index=index_name)
+
+    def get_alias_actions(self, built_indexes) -> tuple[list[dict], list[str]]:
+        """
+        Returns the actions pointing the live names at the built indexes, and
+        the previous versions they replace.
+        """
+        actions = []
+        previous_indexes = []
+        for index_name in built_indexes:
+            live_name = self.live_name(index_name)
+            if self.es.indices.exists_alias(name=live_name):
+                for previous_index in self.es.indices.get_alias(name=live_name):
+                    actions.append(
+                        {"remove": {"index": previous_index, "alias": live_name}}
+                    )
+                    previous_indexes.append(previous_index)
+            elif self.es.indices.exists(index=live_name):
+                # The first swap replaces the index created by a regular reindex
+                actions.append({"remove_index": {"index": live_name}})
+            actions.append({"add": {"index": index_name, "alias": live_name}})
+        return actions, previous_indexes
+
+    def swap(self, keep_previous=False) -> list[str]:
+        built_indexes = self.get_built_indexes()
+        self.finish_load(built_indexes)
+        actions, previous_indexes = self.get_alias_actions(built_indexes)
+        self.es.indices.update_aliases(actions=actions)
+        logger.info("Swapped search aliases to %s" % ", ".join(built_indexes))
+
+        if previous_indexes and not keep_previous:
+            self.es.indices.delete(index=",".join(previous_indexes))
+        return built_indexes
+
+    def start_recording_changes(self):
+        """
+        Installs the triggers recording the resources changed from now on,
+        whose documents in the new indexes must be updated before the swap.
+        """
+        with transaction.atomic(), connection.cursor() as cur:
+            cur.execute(
+                """
+                create or replace function bcap_log_index_build_change() returns trigger as
+                $$
+                begin
+                    insert into bcap_index_build_change (resourceinstanceid)
+                    select distinct resourceinstanceid from changed_rows;
+                    return null;
+                end
+                $$ language plpgsql
+                """
+            )
+            cur.execute("truncate bcap_index_build_change")
+            for name, event, table, transition in CHANGE_TRIGGERS:
+                cur.execute("drop trigger if exists %s on %s" % (name, table))
+                cur.execute(
+                    """
+                    create trigger %s after %s on %s
+                    referencing %s table as changed_rows
+                    for each statement execute function bcap_log_index_build_change()
+                    """
+                    % (name, event, table, transition)
+                )
+
+    def stop_recording_changes(self):
+        with transaction.atomic(), connection.cursor() as cur:
+            for name, _event, table, _transition in CHANGE_TRIGGERS:
+                cur.execute("drop trigger if exists %s on %s" % (name, table))
+
+    def discard(self):
+        """Removes the indexes of a failed build."""
+        built_indexes = self.get_built_indexes()
+        if built_indexes:
+            self.es.indices.delete(index=",".join(built_indexes))
+
+    def cleanup(self):
+        self.es.indices.delete_index_template(name=self.template_name)
+
+
+def index_recorded_changes(batch_size=None) -> int:
+    """
+    Indexes the resources recorded as changed during a build into the indexes
+    of the current ELASTICSEARCH_PREFIX, a batch at a time, and removes the
+    documents of those that were deleted. Returns the number of resources.
+    """
+    batch_size = batch_size if batch_size else settings.BULK_IMPORT_BATCH_SIZE
+    indexed = 0
+    while True:
+        with transaction.atomic():
+            resourceinstanceids = IndexBuildChange.pop(batch_size)
+            if not resourceinstanceids:
+                break
+            existing_ids = {
+                str(resourceinstanceid)
+                for resourceinstanceid in models.ResourceInstance.objects.filter(
+                    pk__in=resourceinstanceids
+                ).values_list("resourceinstanceid", flat=True)
+            }
+            index_resources_using_singleprocessing(
+                resources=Resource.objects.filter(pk__in=existing_ids),
+                batch_size=batch_size,
+                quiet=True,
+            )
+            for resourceinstanceid in set(resourceinstanceids) - existing_ids:
+                Resource(resourceinstanceid=resourceinstanceid).delete_index()
+        indexed += len(resourceinstanceids)
+
+    if indexed:
+        logger.info("Indexed %s resources changed during the build" % indexed)
+    return indexed
@@ -1,25 +1,75 @@
 import json
+import logging
 import urllib3
+from collections import Counter
 
 from django.conf import settings
+from django.core.cache import cache
 from django.contrib.gis.geos import Point
 
 from arches.app.datatypes.datatypes import DataTypeFactory
 from arches.app.models import models
 from arches.app.utils import geo_utils
 
+from bcap.models.borden_grid import BordenGrid
 from bcap.models.borden_number import BordenNumberCounter
 from bcap.util.aliases.archaeological_site import (
     ArchaeologicalSiteAliases as site_aliases,
 )
 from bcap.util.bcap_aliases import GraphSlugs as slugs
-from bcap.util.graph import get_current_graph
+from bcap.util.graph import GraphRegistry
+
+
+logger = logging.getLogger(__name__)
 
 
 class MissingGeometryError(Exception):
     pass
 
 
+# Remote grid lookups are cached by BC Albers coordinates snapped to this many
+# meters, so repeated lookups around the same location skip the WFS
+BORDEN_GRID_CACHE_RESOLUTION = 10
+BORDEN_GRID_CACHE_TIMEOUT = 7 * 24 * 3600  # seconds
+
+HTTP_TIMEOUT = urllib3.Timeout(connect=5.0, read=15.0)
+HTTP_RETRIES = urllib3.Retry(
+    total=3,
+    backoff_factor=0.5,
+    status_forcelist=[429, 502, 503, 504],
+    allowed_methods=["GET"],
+)
+
+# Shared by all lookups so connections to the WFS are kept alive and reused
+_http_client = None
+
+
+def get_http_client():
+    global _http_client
+    if _http_client is None:
+        if (
+            hasattr(settings, "TILESERVER_OUTBOUND_PROXY")
+            and settings.TILESERVER_OUTBOUND_PROXY
+        ):
+            _http_client = urllib3.ProxyManager(
+                settings.TILESERVER_OUTBOUND_PROXY,
+                timeout=HTTP_TIMEOUT,
+                retries=HTTP_RETRIES,
+            )
+        else:
+            _http_client = urllib3.PoolManager(
+                timeout=HTTP_TIMEOUT, retries=HTTP_RETRIES
+            )
+    return _http_client
+
+
+def _borden_grid_cache_key(pnt) -> str:
+    return "bcap_borden_grid:%d:%d" % (
+        round(pnt.x / BORDEN_GRID_CACHE_RESOLUTION),
+        round(pnt.y / BORDEN_GRID_CACHE_RESOLUTION),
+    )
+
+
 # @todo - How do we handle multiple geometries?
 class BordenNumberApi:
     _datatype_factory = None
@@ -33,10 +83,9 @@ class BordenNumberApi:
     def _initialize_models(self):
         if not self.geom_node:
             self._datatype_factory = DataTypeFactory()
-            graph = get_current_graph(slugs.ARCHAEOLOGICAL_SITE)
-            self.geom_node = models.Node.objects.filter(
-                alias=site_aliases.SITE_BOUNDARY, graph=graph
-            ).first()
+            self.geom_node = GraphRegistry.get_node(
+                slugs.ARCHAEOLOGICAL_SITE, site_aliases.SITE_BOUNDARY
+            )
 
     def _get_borden_grid(self, resourceinstanceid):
         tile = models.TileModel.objects.filter(
@@ -54,8 +103,7 @@ class BordenNumberApi:
         geometry = tile.data[str(self.geom_node.nodeid)]
         return self._get_borden_grid_for_geometry(geometry)
 
-    def _get_borden_grid_for_geometry(self, geometry):
-
+    def _get_point(self, geometry):
         # print('Geometry: %s %s' % (geometry, type(geometry)))
         utils = geo_utils.GeoUtils()
         centroid = utils.get_centroid(geometry)
@@ -66,21 +114,30 @@ class BordenNumberApi:
         pnt.transform(desired_srid)
         # print("Translated: %s" % pnt.ewkt)
         # print("Points: %s, %s" % (pnt.x, pnt.y))
+        return pnt
+
+    def _get_borden_grid_for_geometry(self, geometry):
+        pnt = self._get_point(geometry)
+        borden_grid = BordenGrid.get_borden_grid_for_point(pnt)
+        if borden_grid:
+            return borden_grid
+
+        # Fall back to the WFS if the grid hasn't been loaded (load_borden_grid)
+        return self._get_remote_borden_grid(pnt)
+
+    def _get_remote_borden_grid(self, pnt):
+        cache_key = _borden_grid_cache_key(pnt)
+        borden_grid = cache.get(cache_key)
+        if borden_grid:
+            return borden_grid
 
         url = BordenNumberApi._url % (pnt.x, pnt.y)
         # print(url)
-        if (
-            hasattr(settings, "TILESERVER_OUTBOUND_PROXY")
-            and settings.TILESERVER_OUTBOUND_PROXY
-        ):
-            req = urllib3.ProxyManager(settings.TILESERVER_OUTBOUND_PROXY)
-        else:
-            req = urllib3.PoolManager()
-
-        response = req.request("GET", url)
+        response = get_http_client().request("GET", url)
         body = json.loads(response.data.decode())
         borden_grid = body["features"][0]["properties"]["BORDGRID"]
 
+        cache.set(cache_key, borden_grid, BORDEN_GRID_CACHE_TIMEOUT)
         return borden_grid
 
     def get_next_borden_number(self, resourceinstanceid=None, geometry=None):
@@ -96,6 +153,67 @@ class BordenNumberApi:
 
         return BordenNumberCounter.peek_next_borden_number(borden_grid)
 
+    def get_borden_numbers_for_geometries(
+        self, geometries, reserve=False
+    ) -> list[dict]:
+        """
+        Returns a Borden number for each geometry, in order. The grids are
+        found with one spatial query (falling back to the WFS for points
+        outside the local grid) and the numbers are peeked, or reserved, with
+        one query for the whole batch. Sites in the same grid get consecutive
+        numbers.
+
+        Each result is {"borden_number": ...}, or {"error": ...} if the grid of
+        that geometry couldn't be found.
+        """
+        points = []
+        results = []
+        for geometry in geometries:
+            try:
+                points.append(self._get_point(geometry))
+                results.append({})
+            except Exception as e:
+                logger.warning("Invalid site boundary: %s", e)
+                points.append(None)
+                results.append({"error": "Invalid site boundary"})
+
+        local_grids = iter(
+            BordenGrid.get_borden_grids_for_points([p for p in points if p])
+        )
+        grids = []
+        for pnt, result in zip(points, results):
+            grid = next(local_grids) if pnt else None
+            if pnt and not grid:
+                try:
+                    grid = self._get_remote_borden_grid(pnt)
+                except Exception as e:
+                    logger.error("Unable to look up Borden grid: %s", e)
+                    result["error"] = "Unable to find the Borden grid"
+            grids.append(grid)
+
+        counts = Counter(grid for grid in grids if grid)
+        if reserve:
+            numbers = BordenNumberCounter.allocate_borden_number_blocks(counts)
+        else:
+            sequences = BordenNumberCounter.get_grid_sequences(counts.keys())
+            numbers = {
+                grid: [
+                    f"{grid}-{seq}"
+                    for seq in range(sequences[grid] + 1, sequences[grid] + count + 1)
+                ]
+                for grid, count in counts.items()
+            }
+
+        numbers = {grid: iter(grid_numbers) for grid, grid_numbers in numbers.items()}
+        for grid, result in zip(grids, results):
+            if grid:
+                result["borden_number"] = next(numbers[grid])
+        return results
+
     @classmethod
     def reserve_borden_number(cls, borden_grid):
         return BordenNumberCounter.allocate_next_borden_number(borden_grid)
+
+    @classmethod
+    def reserve_borden_numbers(cls, borden_grid, count) -> list[str]:
+        return BordenNumberCounter.allocate_borden_numbers(borden_grid, count)
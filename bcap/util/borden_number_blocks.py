@@ -0,0 +1,74 @@
+import re
+import threading
+from collections import Counter, deque
+
+from bcap.models.borden_number import BordenNumberCounter
+
+_state = threading.local()
+
+
+def get_borden_grid(borden_number) -> str:
+    return re.sub("-.*", "", borden_number)
+
+
+def get_active_blocks():
+    return getattr(_state, "blocks", None)
+
+
+class BordenNumberBlocks:
+    """
+    Reserves the Borden numbers needed by a bulk import up front, one block per
+    grid in a single statement, rather than one number per saved tile.
+
+    While active, BordenNumberDataType.pre_tile_save takes numbers from these
+    blocks. Numbers left unused when the block exits are not returned to the
+    counter, so size the blocks with the number of sites being imported.
+
+    Pass new_tiles=True when every tile saved inside the block is being
+    created (e.g. an import of new sites), so pre_tile_save doesn't have to
+    check whether each tile already exists.
+
+        with BordenNumberBlocks.for_borden_numbers(values, new_tiles=True):
+            ... save the imported tiles ...
+    """
+
+    def __init__(self, counts: dict[str, int], new_tiles=False):
+        self.counts = counts
+        self.new_tiles = new_tiles
+        self._numbers = {}
+
+    @classmethod
+    def for_borden_numbers(cls, borden_numbers, new_tiles=False):
+        """Sizes the blocks from the (provisional) Borden numbers being imported."""
+        return cls(
+            Counter(
+                get_borden_grid(borden_number)
+                for borden_number in borden_numbers
+                if borden_number
+            ),
+            new_tiles=new_tiles,
+        )
+
+    def __enter__(self):
+        self._numbers = {
+            grid: deque(numbers)
+            for grid, numbers in BordenNumberCounter.allocate_borden_number_blocks(
+                self.counts
+            ).items()
+        }
+        _state.blocks = self
+        return self
+
+    def __exit__(self, *args):
+        _state.blocks = None
+
+    def take(self, borden_grid) -> str | None:
+        """
+        Returns the next reserved number for the grid, or None when none are
+        left.
+        """
+        numbers = self._numbers.get(borden_grid)
+        return numbers.popleft() if numbers else None
+
+    def remaining(self) -> dict[str, list[str]]:
+        return {grid: list(numbers) for grid, numbers in self._numbers.items()}
@@ -1,8 +1,20 @@
+from arches.app.models import models
 from arches.app.models.graph import Graph
 from arches.app.models.models import Group, User
 from arches.app.models.resource import Resource
 import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from django.contrib.auth.models import Permission
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection, transaction
+from django.db.models import CharField
+from django.db.models.functions import Cast
 from .business_data_proxy import ArchaeologicalSiteDataProxy
+from .graph import get_current_graph
+from .mvt_cache import invalidate_resource_tiles
+from .permission_snapshot import invalidate_permission_snapshots
+from guardian.models import GroupObjectPermission, UserObjectPermission
 from guardian.shortcuts import (
     assign_perm,
     get_perms,
@@ -14,6 +26,12 @@ from guardian.shortcuts import (
 
 logger = logging.getLogger(__name__)
 
+# Guardian object permission model and principal column by principal type
+PRINCIPAL_MODELS = {
+    "user": (UserObjectPermission, "user_id"),
+    "group": (GroupObjectPermission, "group_id"),
+}
+
 
 class AdminOnlyPermissionManager:
     admin_only_graph_slugs = [
@@ -46,27 +64,174 @@ class AdminOnlyPermissionManager:
         graph = Graph.objects.get(slug=slug)
         return Resource.objects.filter(graph=graph).all()
 
-    def reset_all_permissions(self, graph_slugs=None, clear_all_permissions=False):
-        processed_graphs = []
-        slugs_to_process = (
+    def _get_restricted_resource_ids(self, slug, resource_ids) -> set[str]:
+        """Returns the resources hidden from the restricted users and groups"""
+        return set(resource_ids)
+
+    def get_slugs_to_process(self, graph_slugs):
+        slugs = (
             self.admin_only_graph_slugs
             if not graph_slugs
             else (graph_slugs if type(graph_slugs) is list else [graph_slugs])
         )
-        for slug in slugs_to_process:
-            if slug in self.admin_only_graph_slugs:
-                print("Processing: %s " % slug, end="", flush=True)
-                processed_graphs.append(slug)
-                resources = self._get_resource_instances(slug)
-
-                for idx, obj in enumerate(resources):
-                    if clear_all_permissions:
-                        self.remove_all_object_permissions(obj)
-                    self.apply_object_permissions(obj)
-
-                    if (idx % 100) == 0:
-                        print(".", end="", flush=True)
-                print("\nProcessed %s %s" % (len(resources), slug))
+        return [slug for slug in slugs if slug in self.admin_only_graph_slugs]
+
+    def get_resource_ids(self, slug) -> list[str]:
+        return [
+            str(resourceinstanceid)
+            for resourceinstanceid in models.ResourceInstance.objects.filter(
+                graph_id=get_current_graph(slug).graphid
+            )
+            .order_by("resourceinstanceid")
+            .values_list("resourceinstanceid", flat=True)
+        ]
+
+    def get_permission_diff(
+        self, slug, clear_all_permissions=False, resource_ids=None
+    ) -> dict:
+        """
+        Compares the object permissions the restricted users and groups should
+        have on the resources of a graph (or the given shard of them) with the
+        ones in the guardian tables. With clear_all_permissions, every other
+        object permission on the resources is removed too.
+
+        The permissions to add are (principal type, object pk, principal id,
+        permission id) tuples, and the ones to remove map those tuples to the
+        ids of their rows.
+        """
+        if resource_ids is None:
+            resources = models.ResourceInstance.objects.filter(
+                graph_id=get_current_graph(slug).graphid
+            )
+            resource_ids = [
+                str(resourceinstanceid)
+                for resourceinstanceid in resources.values_list(
+                    "resourceinstanceid", flat=True
+                )
+            ]
+            object_pks = resources.annotate(
+                object_pk=Cast("resourceinstanceid", CharField())
+            ).values("object_pk")
+        else:
+            object_pks = resource_ids
+        restricted_ids = self._get_restricted_resource_ids(slug, resource_ids)
+        content_type = ContentType.objects.get_for_model(models.ResourceInstance)
+        permission = Permission.objects.get(
+            content_type=content_type, codename=self.no_access_perm
+        )
+        principal_ids = {
+            "user": [user.pk for user in self.restricted_users],
+            "group": [group.pk for group in self.restricted_groups],
+        }
+
+        add = set()
+        remove = {}
+        for principal_type, (model, principal_field) in PRINCIPAL_MODELS.items():
+            desired = {
+                (principal_type, object_pk, principal_id, permission.pk)
+                for object_pk in restricted_ids
+                for principal_id in principal_ids[principal_type]
+            }
+            current = model.objects.filter(
+                content_type=content_type, object_pk__in=object_pks
+            )
+            if not clear_all_permissions:
+                current = current.filter(
+                    permission=permission,
+                    **{principal_field + "__in": principal_ids[principal_type]},
+                )
+            existing = set()
+            for id, object_pk, principal_id, permission_id in current.values_list(
+                "id", "object_pk", principal_field, "permission_id"
+            ):
+                key = (principal_type, object_pk, principal_id, permission_id)
+                existing.add(key)
+                if key not in desired:
+                    remove[key] = id
+            add |= desired - existing
+
+        return {
+            "resources": len(resource_ids),
+            "restricted": len(restricted_ids),
+            "content_type_id": content_type.pk,
+            "add": add,
+            "remove": remove,
+        }
+
+    def apply_permission_diff(self, diff, batch_size=1000):
+        """
+        Deletes and inserts the guardian rows of a permission diff in batches,
+        in one transaction.
+        """
+        with transaction.atomic():
+            for principal_type, (model, principal_field) in PRINCIPAL_MODELS.items():
+                ids = [
+                    id for key, id in diff["remove"].items() if key[0] == principal_type
+                ]
+                for start in range(0, len(ids), batch_size):
+                    model.objects.filter(
+                        pk__in=ids[start : start + batch_size]
+                    ).delete()
+                model.objects.bulk_create(
+                    [
+                        model(
+                            content_type_id=diff["content_type_id"],
+                            object_pk=object_pk,
+                            permission_id=permission_id,
+                            **{principal_field: principal_id},
+                        )
+                        for key_type, object_pk, principal_id, permission_id in diff[
+                            "add"
+                        ]
+                        if key_type == principal_type
+                    ],
+                    batch_size=batch_size,
+                    ignore_conflicts=True,
+                )
+        # Bulk writes don't send the signals that invalidate the snapshots
+        invalidate_permission_snapshots(
+            {key[2] for key in diff["add"] if key[0] == "user"}
+            | {key[2] for key in diff["remove"] if key[0] == "user"}
+        )
+        invalidate_resource_tiles(
+            {key[1] for key in diff["add"]} | {key[1] for key in diff["remove"]}
+        )
+
+    def reset_shard_permissions(
+        self,
+        slug,
+        resource_ids,
+        clear_all_permissions=False,
+        dry_run=False,
+        batch_size=1000,
+    ) -> dict:
+        """
+        Resets the permissions of a shard of the resources of a graph on the
+        connection of the calling thread
+        """
+        try:
+            diff = self.get_permission_diff(slug, clear_all_permissions, resource_ids)
+            if not dry_run:
+                self.apply_permission_diff(diff, batch_size)
+            return diff
+        finally:
+            connection.close()
+
+    def reset_all_permissions(self, graph_slugs=None, clear_all_permissions=False):
+        processed_graphs = []
+        for slug in self.get_slugs_to_process(graph_slugs):
+            print("Processing: %s " % slug, end="", flush=True)
+            processed_graphs.append(slug)
+            resources = self._get_resource_instances(slug)
+
+            for idx, obj in enumerate(resources):
+                if clear_all_permissions:
+                    self.remove_all_object_permissions(obj)
+                self.apply_object_permissions(obj)
+
+                if (idx % 100) == 0:
+                    print(".", end="", flush=True)
+            print("\nProcessed %s %s" % (len(resources), slug))
         return processed_graphs
 
     def apply_object_permissions(self, obj):
@@ -104,6 +269,99 @@ class HeritageSitePermissionManager(AdminOnlyPermissionManager):
         super().__init__()
         self.admin_only_graph_slugs = ["heritage_site"]
         self._populate_restricted_objects()
+        self.site_proxy = ArchaeologicalSiteDataProxy()
 
     def _is_resource_restricted(self, obj):
-        return not ArchaeologicalSiteDataProxy().is_site_public(obj)
+        return not self.site_proxy.is_site_public(obj)
+
+    def _get_restricted_resource_ids(self, slug, resource_ids) -> set[str]:
+        return set(resource_ids) - self.site_proxy.get_public_site_ids(resource_ids)
+
+
+def reset_permissions_in_parallel(
+    managers,
+    graph_slugs=None,
+    clear_all_permissions=False,
+    dry_run=False,
+    batch_size=1000,
+    workers=4,
+    shard_size=10000,
+    progress=None,
+) -> dict[str, dict]:
+    """
+    Set based version of reset_all_permissions for the graphs of the
+    managers, which only writes the guardian rows that differ from the
+    desired permissions. With dry_run nothing is written. The resources of
+    each graph are split into shards that are diffed and written in
+    parallel, each on its own connection. progress is called with the graph slug and its result so far
+    after each shard.
+
+    Each shard is written in its own transaction. A failed shard is logged
+    and counted in "failed" while the other shards carry on, so the changes
+    of the shards that were written are still returned (e.g. to reindex
+    them); re-running the reset writes what the failed shards didn't.
+
+    Returns the merged permission diff of each graph, with the ids of the
+    resources whose permissions changed, the number of failed shards and the
+    time it took.
+    """
+    shards = []
+    results = {}
+    for manager in managers:
+        for slug in manager.get_slugs_to_process(graph_slugs):
+            if get_current_graph(slug) is None:
+                logger.warning("Graph %s does not exist, skipping it" % slug)
+                continue
+            resource_ids = manager.get_resource_ids(slug)
+            graph_shards = [
+                resource_ids[start : start + shard_size]
+                for start in range(0, len(resource_ids), shard_size)
+            ]
+            shards += [(manager, slug, shard) for shard in graph_shards]
+            results[slug] = {
+                "resources": 0,
+                "restricted": 0,
+                "add": set(),
+                "remove": {},
+                "changed": set(),
+                "shards": len(graph_shards),
+                "done": 0,
+                "failed": 0,
+                "duration": 0,
+            }
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(
+                manager.reset_shard_permissions,
+                slug,
+                resource_ids,
+                clear_all_permissions,
+                dry_run,
+                batch_size,
+            ): slug
+            for manager, slug, resource_ids in shards
+        }
+        for future in as_completed(futures):
+            slug = futures[future]
+            result = results[slug]
+            try:
+                diff = future.result()
+            except Exception:
+                logger.exception("Unable to reset the permissions of a %s shard" % slug)
+                result["failed"] += 1
+                result["duration"] = time.perf_counter() - start
+                continue
+            result["resources"] += diff["resources"]
+            result["restricted"] += diff["restricted"]
+            result["add"] |= diff["add"]
+            result["remove"].update(diff["remove"])
+            result["changed"] |= {key[1] for key in diff["add"]} | {
+                key[1] for key in diff["remove"]
+            }
+            result["done"] += 1
+            result["duration"] = time.perf_counter() - start
+            if progress:
+                progress(slug, result)
+    return results
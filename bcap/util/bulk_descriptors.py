@@ -0,0 +1,142 @@
+import threading
+
+from arches.app.models import models
+from arches.app.models.system_settings import settings
+
+from bcap.util.graph import get_current_graph
+
+
+def get_tile_bundles(resourceinstanceids, nodegroup_ids) -> dict[str, dict[str, list]]:
+    """
+    Fetches the tiles of the given nodegroups for a set of resources in a
+    single query, grouped by resourceinstanceid and then by nodegroupid.
+    Every requested resource has a bundle, even if it has no tiles.
+    """
+    bundles = {
+        str(resourceinstanceid): {} for resourceinstanceid in resourceinstanceids
+    }
+
+    if not bundles or not nodegroup_ids:
+        return bundles
+
+    for tile in models.TileModel.objects.filter(
+        resourceinstance_id__in=bundles.keys(),
+        nodegroup_id__in=nodegroup_ids,
+    ).order_by("tileid"):
+        bundles[str(tile.resourceinstance_id)].setdefault(
+            str(tile.nodegroup_id), []
+        ).append(tile)
+
+    return bundles
+
+
+# The bundle shared by the descriptors of the resource being calculated, per thread
+_state = threading.local()
+
+
+def get_shared_tile_bundle(
+    resourceinstanceid, nodegroup_ids, descriptor
+) -> dict[str, list]:
+    """
+    Returns the tile bundle of a resource for one of its descriptors. The
+    descriptors of a resource are calculated one after the other, so they
+    share one bundle until one of them is calculated again, the resource is
+    saved or one of its tiles changes.
+
+    Keyword Arguments
+
+    resourceinstanceid -- id of the resource
+    nodegroup_ids -- nodegroups of the tiles in the bundle
+    descriptor -- key of the descriptor being calculated, e.g. its type and language
+    """
+    resourceinstanceid = str(resourceinstanceid)
+    shared = getattr(_state, "shared_bundle", None)
+    if (
+        shared is None
+        or shared["resourceinstanceid"] != resourceinstanceid
+        or descriptor in shared["descriptors"]
+    ):
+        shared = {
+            "resourceinstanceid": resourceinstanceid,
+            "bundle": get_tile_bundles([resourceinstanceid], nodegroup_ids)[
+                resourceinstanceid
+            ],
+            "descriptors": set(),
+        }
+        _state.shared_bundle = shared
+    shared["descriptors"].add(descriptor)
+    return shared["bundle"]
+
+
+def clear_shared_tile_bundle(resourceinstanceid=None):
+    """Drops the shared bundle of the resource, or of any resource"""
+    shared = getattr(_state, "shared_bundle", None)
+    if shared is not None and (
+        resourceinstanceid is None
+        or shared["resourceinstanceid"] == str(resourceinstanceid)
+    ):
+        _state.shared_bundle = None
+
+
+def get_bundle_tiles(bundle, node) -> list:
+    if node is None:
+        return []
+    return bundle.get(str(node.nodegroup_id), [])
+
+
+class BulkDescriptorsMixin:
+    """
+    Calculates and stores the primary descriptors of a chunk of resources at
+    once. Subclasses set function_id and graph_slug and implement
+    get_primary_descriptors_for_resources.
+    """
+
+    function_id = None
+    graph_slug = None
+    default_descriptor_configs = None
+
+    def get_descriptor_configs(self, graph=None) -> dict:
+        """
+        Returns the descriptor configs saved for the graph, falling back to the
+        function defaults.
+        """
+        function_x_graph = models.FunctionXGraph.objects.filter(
+            function_id=self.function_id,
+            graph=graph if graph else get_current_graph(self.graph_slug),
+        ).first()
+        if function_x_graph and function_x_graph.config.get("descriptor_types"):
+            return function_x_graph.config["descriptor_types"]
+        return self.default_descriptor_configs
+
+    def get_primary_descriptors_for_resources(
+        self, resourceinstanceids, descriptor_configs=None
+    ) -> dict[str, dict]:
+        raise NotImplementedError
+
+    def save_descriptors_for_resources(
+        self, resourceinstanceids, descriptor_configs=None
+    ) -> int:
+        """
+        Calculates and stores the descriptors and names for a chunk of resources.
+        Returns the number of resources updated.
+        """
+        descriptors = self.get_primary_descriptors_for_resources(
+            resourceinstanceids, descriptor_configs
+        )
+        resources = list(
+            models.ResourceInstance.objects.filter(
+                resourceinstanceid__in=descriptors.keys()
+            ).only("resourceinstanceid", "descriptors", "name")
+        )
+
+        for resource in resources:
+            values = descriptors[str(resource.resourceinstanceid)]
+            resource.descriptors = resource.descriptors or {}
+            resource.name = resource.name or {}
+            for language, _label in settings.LANGUAGES:
+                resource.descriptors[language] = dict(values)
+                if values.get("name") is not None:
+                    resource.name[language] = values["name"]
+
+        models.ResourceInstance.objects.bulk_update(resources, ["descriptors", "name"])
+        return len(resources)
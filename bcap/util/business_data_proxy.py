@@ -1,3 +1,4 @@
+from django.db import connection
 from arches.app.models import models
 from bcap.util.bcap_aliases import GraphSlugs
 from bcap.util.aliases.legislative_act import LegislativeActAliases
@@ -6,6 +7,8 @@ from bcap.util.aliases.archaeological_site import (
 )
 from bcap.util.aliases.hria_discontinued_data import HriaDiscontinuedDataAliases
 from bcap.util.aliases.site_visit import SiteVisitAliases
+from bcap.util.bulk_descriptors import get_bundle_tiles
+from bcap.util.graph import get_current_graph
 from bcgov_arches_common.util.graph_lookup import GraphLookup
 from arches.settings import LANGUAGE_CODE
 
@@ -23,6 +26,7 @@ class BusinessDataProxy:
         data_tile=None,
         context=None,
         use_boolean_label=True,
+        tile_bundle=None,
     ):
         """
         get the values from the resource tile(s) for the node with the given name
@@ -34,6 +38,7 @@ class BusinessDataProxy:
         data_tile -- if specified, the tile to extract the value from
         context -- if specified, context with the target language
         use_boolean_label -- If true, for boolean datatypes, returns the associated label, otherwise use raw value
+        tile_bundle -- if specified, prefetched tiles of the resource grouped by nodegroupid (see get_tile_bundles)
         """
         node = self._graph_lookup.get_node(alias)
         datatype = self._graph_lookup.get_datatype(alias)
@@ -48,13 +53,14 @@ class BusinessDataProxy:
         else:
             language = LANGUAGE_CODE
 
-        tiles = (
-            [data_tile]
-            if data_tile
-            else models.TileModel.objects.filter(nodegroup_id=node.nodegroup_id).filter(
-                resourceinstance_id=resourceinstanceid
-            )
-        )
+        if data_tile:
+            tiles = [data_tile]
+        elif tile_bundle is not None:
+            tiles = get_bundle_tiles(tile_bundle, node)
+        else:
+            tiles = models.TileModel.objects.filter(
+                nodegroup_id=node.nodegroup_id
+            ).filter(resourceinstance_id=resourceinstanceid)
 
         for tile in tiles:
             if tile:
@@ -82,6 +88,14 @@ class BusinessDataProxy:
             else (display_values[0] if len(display_values) == 1 else display_values)
         )
 
+    def get_nodegroup_ids(self, aliases) -> set[str]:
+        """
+        Returns the nodegroupids of the nodes with the given aliases, skipping
+        aliases not in the graph.
+        """
+        nodes = [self._graph_lookup.get_node(alias) for alias in aliases]
+        return {str(node.nodegroup_id) for node in nodes if node is not None}
+
 
 class SiteVisitDataProxy(BusinessDataProxy):
     def __init__(self):
@@ -99,6 +113,8 @@ class HriaDiscontinuedDataProxy(BusinessDataProxy):
 
 
 class ArchaeologicalSiteDataProxy(BusinessDataProxy):
+    public_submission_statuses = ["Approved - Full Record", "Approved - Basic Record"]
+    public_registration_statuses = ["Registered", "Federal Jurisdiction"]
 
     def __init__(self):
         super(ArchaeologicalSiteDataProxy, self).__init__(
@@ -111,12 +127,8 @@ class ArchaeologicalSiteDataProxy(BusinessDataProxy):
         related_resource_graph_slug,
         related_resource_node_alias=None,
     ):
-        arch_site_graph = models.Graph.objects.get(
-            slug=GraphSlugs.ARCHAEOLOGICAL_SITE, source_identifier_id__isnull=True
-        )
-        related_resource_graph = models.Graph.objects.get(
-            slug=related_resource_graph_slug, source_identifier_id__isnull=True
-        )
+        arch_site_graph = get_current_graph(GraphSlugs.ARCHAEOLOGICAL_SITE)
+        related_resource_graph = get_current_graph(related_resource_graph_slug)
         site_visits = (
             models.ResourceXResource.objects.filter(
                 to_resource=arch_site_resourceinstanceid,
@@ -128,6 +140,48 @@ class ArchaeologicalSiteDataProxy(BusinessDataProxy):
         )
         return [visit.from_resource for visit in site_visits]
 
+    def get_related_resource_ids(
+        self, arch_site_resourceinstanceids, related_resource_graph_slugs
+    ) -> dict[str, dict[str, list[str]]]:
+        """
+        Returns the ids of the resources of the given graphs that relate to
+        each of the sites, from a single query.
+
+        Returns a dict of site resourceinstanceid -> {graph slug -> [resourceinstanceids]}
+        """
+        graph_slugs = {
+            str(get_current_graph(slug).graphid): slug
+            for slug in related_resource_graph_slugs
+        }
+        related_ids = {
+            str(resourceinstanceid): {slug: [] for slug in related_resource_graph_slugs}
+            for resourceinstanceid in arch_site_resourceinstanceids
+        }
+
+        for relation in models.ResourceXResource.objects.filter(
+            to_resource_id__in=related_ids.keys(),
+            from_resource_graph_id__in=graph_slugs.keys(),
+            to_resource_graph_id=get_current_graph(
+                GraphSlugs.ARCHAEOLOGICAL_SITE
+            ).graphid,
+        ).values_list("to_resource_id", "from_resource_id", "from_resource_graph_id"):
+            related_ids[str(relation[0])][graph_slugs[str(relation[2])]].append(
+                str(relation[1])
+            )
+
+        return related_ids
+
+    def get_public_status_nodegroup_ids(self) -> set[str]:
+        """Returns the nodegroups of the nodes that decide if a site is public"""
+        return self.get_nodegroup_ids(
+            [
+                BCAPSiteAliases.RESTRICTED,
+                BCAPSiteAliases.OFFICIALLY_RECOGNIZED_SITE,
+                BCAPSiteAliases.BCAP_SUBMISSION_STATUS,
+                BCAPSiteAliases.REGISTRATION_STATUS,
+            ]
+        )
+
     def is_site_public(self, resourceinstance):
         return (
             self.get_value_from_node(
@@ -147,17 +201,111 @@ class ArchaeologicalSiteDataProxy(BusinessDataProxy):
                     BCAPSiteAliases.BCAP_SUBMISSION_STATUS,
                     resourceinstanceid=resourceinstance.resourceinstanceid,
                 )
-                in ["Approved - Full Record", "Approved - Basic Record"]
+                in self.public_submission_statuses
             )
             and (
                 self.get_value_from_node(
                     BCAPSiteAliases.REGISTRATION_STATUS,
                     resourceinstanceid=resourceinstance.resourceinstanceid,
                 )
-                in ["Registered", "Federal Jurisdiction"]
+                in self.public_registration_statuses
             )
         )
 
+    def get_public_site_ids(self, resourceinstanceids) -> set[str]:
+        """
+        Returns the sites that meet the same public criteria as
+        is_site_public, from a single query over the tiles of all of the
+        sites. A site is only public when every node of the rule is in the
+        graph, as with is_site_public.
+
+        As in is_site_public, a node only has a value when its nodegroup has
+        exactly one tile for the site; with several tiles (e.g. two site
+        record admin tiles) its value is a list, which matches no criterion.
+        """
+        aliases = [
+            BCAPSiteAliases.RESTRICTED,
+            BCAPSiteAliases.OFFICIALLY_RECOGNIZED_SITE,
+            BCAPSiteAliases.BCAP_SUBMISSION_STATUS,
+            BCAPSiteAliases.REGISTRATION_STATUS,
+        ]
+        nodes = {alias: self._graph_lookup.get_node(alias) for alias in aliases}
+        if not resourceinstanceids or None in nodes.values():
+            return set()
+
+        def node_value(alias, as_text=False):
+            return "t.tiledata %s '%s'" % (
+                "->>" if as_text else "->",
+                nodes[alias].nodeid,
+            )
+
+        def has_label(alias):
+            # Reference values are lists of list items with their labels
+            return """exists (
+                select 1
+                  from jsonb_array_elements(
+                           case jsonb_typeof(%(value)s) when 'array' then %(value)s else '[]' end
+                       ) item,
+                       jsonb_array_elements(item -> 'labels') label
+                 where label ->> 'valuetype_id' = 'prefLabel'
+                   and label ->> 'value' = any(%%(%(alias)s)s)
+            )""" % {
+                "value": node_value(alias),
+                "alias": alias,
+            }
+
+        with connection.cursor() as cur:
+            cur.execute(
+                """
+                select r.id, t.nodegroupid, count(*),
+                       coalesce(bool_or((%(restricted)s)::boolean), false),
+                       coalesce(bool_or((%(recognized)s)::boolean), false),
+                       bool_or(%(submission_status)s),
+                       bool_or(%(registration_status)s)
+                  from unnest(%%(ids)s::uuid[]) r(id)
+                  join tiles t on t.resourceinstanceid = r.id
+                              and t.nodegroupid = any(%%(nodegroups)s::uuid[])
+                 group by r.id, t.nodegroupid
+                """
+                % {
+                    "restricted": node_value(BCAPSiteAliases.RESTRICTED, as_text=True),
+                    "recognized": node_value(
+                        BCAPSiteAliases.OFFICIALLY_RECOGNIZED_SITE, as_text=True
+                    ),
+                    "submission_status": has_label(
+                        BCAPSiteAliases.BCAP_SUBMISSION_STATUS
+                    ),
+                    "registration_status": has_label(
+                        BCAPSiteAliases.REGISTRATION_STATUS
+                    ),
+                },
+                {
+                    "ids": list(resourceinstanceids),
+                    "nodegroups": list(
+                        {str(node.nodegroup_id) for node in nodes.values()}
+                    ),
+                    BCAPSiteAliases.BCAP_SUBMISSION_STATUS: self.public_submission_statuses,
+                    BCAPSiteAliases.REGISTRATION_STATUS: self.public_registration_statuses,
+                },
+            )
+            rows = cur.fetchall()
+
+        # Whether each node has a single matching value, per site
+        matches = {}
+        for site_id, nodegroup_id, tile_count, *node_matches in rows:
+            site_matches = matches.setdefault(str(site_id), {})
+            for alias, node_match in zip(aliases, node_matches):
+                if str(nodes[alias].nodegroup_id) == str(nodegroup_id):
+                    site_matches[alias] = tile_count == 1 and bool(node_match)
+        return {
+            site_id
+            for site_id, site_matches in matches.items()
+            if not site_matches.get(BCAPSiteAliases.RESTRICTED)
+            and site_matches.get(BCAPSiteAliases.OFFICIALLY_RECOGNIZED_SITE)
+            and site_matches.get(BCAPSiteAliases.BCAP_SUBMISSION_STATUS)
+            and site_matches.get(BCAPSiteAliases.REGISTRATION_STATUS)
+        }
+
 
 class LegislativeActDataProxy(BusinessDataProxy):
 
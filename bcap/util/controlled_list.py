@@ -1,5 +1,9 @@
+from django.core.cache import cache
+
 from arches_controlled_lists.models import ListItem, ListItemValue
 
+CONTROLLED_LIST_VERSION_KEY = "bcap_controlled_list_version"
+
 
 def get_hierarchy_for_list_item(list_item_id):
     try:
@@ -26,3 +30,125 @@ def get_hierarchy_for_list_item(list_item_id):
         return labels
     except ListItem.DoesNotExist:
         return []
+
+
+def get_controlled_list_version() -> int:
+    return cache.get(CONTROLLED_LIST_VERSION_KEY, 0)
+
+
+def invalidate_controlled_lists():
+    try:
+        cache.incr(CONTROLLED_LIST_VERSION_KEY)
+    except ValueError:
+        cache.set(CONTROLLED_LIST_VERSION_KEY, 1, None)
+
+
+class ControlledListCache:
+    """
+    Process-level cache of the items of a controlled list.
+
+    Each list is loaded with two queries and kept until the shared controlled
+    list version changes (see invalidate_controlled_lists), so lookups of
+    labels, hierarchies and reference values don't touch the database.
+    """
+
+    _lists = {}
+
+    @classmethod
+    def _load(cls, list_id: str) -> dict:
+        items = {
+            str(item["id"]): {
+                "uri": str(item["uri"]),
+                "list_id": str(item["list_id"]),
+                "parent_id": str(item["parent_id"]) if item["parent_id"] else None,
+                "labels": [],
+            }
+            for item in ListItem.objects.filter(list_id=list_id).values(
+                "id", "uri", "list_id", "parent_id"
+            )
+        }
+
+        for value in ListItemValue.objects.filter(list_item__list_id=list_id).values(
+            "id", "value", "language_id", "list_item_id", "valuetype_id"
+        ):
+            item = items.get(str(value["list_item_id"]))
+
+            if item is None:
+                continue
+
+            item["labels"].append(
+                {
+                    "id": str(value["id"]),
+                    "value": value["value"],
+                    "language_id": value["language_id"],
+                    "list_item_id": str(value["list_item_id"]),
+                    "valuetype_id": value["valuetype_id"],
+                }
+            )
+
+        return items
+
+    @classmethod
+    def get_items(cls, list_id: str) -> dict[str, dict]:
+        list_id = str(list_id)
+        version = get_controlled_list_version()
+        cached = cls._lists.get(list_id)
+
+        if cached is None or cached[0] != version:
+            cached = (version, cls._load(list_id))
+            cls._lists[list_id] = cached
+
+        return cached[1]
+
+    @classmethod
+    def clear(cls):
+        cls._lists = {}
+
+    @staticmethod
+    def _pref_label(item: dict) -> str | None:
+        for label in item["labels"]:
+            if label["valuetype_id"] == "prefLabel":
+                return label["value"]
+        return None
+
+    @classmethod
+    def get_item_ids_by_label(cls, list_id: str) -> dict[str, str]:
+        label_map = {}
+
+        for item_id, item in cls.get_items(list_id).items():
+            for label in item["labels"]:
+                if label["valuetype_id"] == "prefLabel":
+                    label_map[label["value"]] = item_id
+
+        return label_map
+
+    @classmethod
+    def get_hierarchy(cls, list_id: str, list_item_id: str) -> list[str]:
+        items = cls.get_items(list_id)
+        labels = []
+        item = items.get(str(list_item_id))
+
+        while item:
+            label = cls._pref_label(item)
+
+            if label:
+                labels.append(label)
+
+            item = items.get(item["parent_id"]) if item["parent_id"] else None
+
+        labels.reverse()
+
+        return labels
+
+    @classmethod
+    def get_reference_value(cls, list_id: str, list_item_id: str) -> dict | None:
+        item = cls.get_items(list_id).get(str(list_item_id))
+
+        if not item:
+            return None
+
+        return {
+            "uri": item["uri"],
+            "labels": [dict(label) for label in item["labels"]],
+            "list_id": item["list_id"],
+        }
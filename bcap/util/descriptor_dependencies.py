@@ -0,0 +1,99 @@
+import logging
+import threading
+
+from arches.app.models.system_settings import settings
+
+logger = logging.getLogger(__name__)
+
+_state = threading.local()
+
+
+def _get_saved_nodegroups() -> dict[str, set[str]]:
+    if not hasattr(_state, "saved_nodegroups"):
+        _state.saved_nodegroups = {}
+    return _state.saved_nodegroups
+
+
+def record_tile_change(tile):
+    """
+    Records the nodegroup of a tile that is being saved or deleted so the
+    descriptor functions of its resource know what changed.
+    """
+    if tile.resourceinstance_id is None or tile.nodegroup_id is None:
+        return
+    _get_saved_nodegroups().setdefault(str(tile.resourceinstance_id), set()).add(
+        str(tile.nodegroup_id)
+    )
+
+
+def get_changed_nodegroups(resourceinstanceid) -> set[str] | None:
+    """
+    Returns the nodegroups changed on the resource since its descriptors
+    were last saved, or None if no tile change has been recorded.
+    """
+    return _get_saved_nodegroups().get(str(resourceinstanceid))
+
+
+def clear_changed_nodegroups(resourceinstanceid=None):
+    if resourceinstanceid is None:
+        _get_saved_nodegroups().clear()
+    else:
+        _get_saved_nodegroups().pop(str(resourceinstanceid), None)
+
+
+class DescriptorDependencyMixin:
+    """
+    Lets a descriptor function reuse a resource's stored descriptor when the
+    tile being saved belongs to a nodegroup the descriptor doesn't read.
+
+    Subclasses implement get_descriptor_nodegroup_ids and call
+    get_reusable_descriptor before calculating a descriptor. Returning None
+    from get_descriptor_nodegroup_ids means the dependencies of that
+    descriptor type are unknown, so it is always recalculated.
+    """
+
+    def get_descriptor_nodegroup_ids(self, descriptor) -> set[str] | None:
+        raise NotImplementedError
+
+    @staticmethod
+    def _nodegroup_ids_for_nodes(nodes) -> set[str] | None:
+        if not nodes or any(node is None for node in nodes):
+            return None
+        return {str(node.nodegroup_id) for node in nodes}
+
+    @staticmethod
+    def get_stored_descriptor(resource, descriptor, context=None):
+        language = (
+            context["language"]
+            if context is not None and "language" in context
+            else settings.LANGUAGE_CODE
+        )
+        descriptors = getattr(resource, "descriptors", None) or {}
+        return descriptors.get(language, {}).get(descriptor)
+
+    def get_reusable_descriptor(
+        self, resource, config, context=None, descriptor=None
+    ) -> str | None:
+        """
+        Returns the stored descriptor if none of the nodegroups it reads have
+        changed, otherwise None to signal that it must be recalculated.
+        """
+        descriptor = descriptor if descriptor else config.get("type")
+        if not descriptor:
+            return None
+
+        resourceinstanceid = getattr(resource, "resourceinstanceid", resource)
+        changed_nodegroups = get_changed_nodegroups(resourceinstanceid)
+        if changed_nodegroups is None:
+            return None
+
+        dependent_nodegroups = self.get_descriptor_nodegroup_ids(descriptor)
+        if dependent_nodegroups is None or changed_nodegroups & dependent_nodegroups:
+            return None
+
+        stored_descriptor = self.get_stored_descriptor(resource, descriptor, context)
+        if stored_descriptor is not None:
+            logger.debug(
+                "Reusing %s descriptor for %s" % (descriptor, resourceinstanceid)
+            )
+        return stored_descriptor
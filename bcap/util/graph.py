@@ -1,7 +1,137 @@
+import threading
+import time
+
+from django.core.cache import cache
+
 from arches.app.models import models
 
+GRAPH_REGISTRY_VERSION_KEY = "bcap_graph_registry_version"
+# Seconds a process uses its registry before reading the shared version again
+VERSION_CHECK_SECONDS = 5
+
 
 def get_current_graph(slug: str) -> models.GraphModel | None:
-    return models.GraphModel.objects.filter(
-        slug=slug, source_identifier_id__isnull=True
-    ).first()
+    return GraphRegistry.get_graph(slug)
+
+
+def get_graph_registry_version() -> int:
+    return cache.get(GRAPH_REGISTRY_VERSION_KEY, 0)
+
+
+def invalidate_graph_registry():
+    try:
+        cache.incr(GRAPH_REGISTRY_VERSION_KEY)
+    except ValueError:
+        cache.set(GRAPH_REGISTRY_VERSION_KEY, 1, None)
+    GraphRegistry.clear()
+
+
+class _Registry:
+    """The graphs and nodes loaded for one version of the registry"""
+
+    def __init__(self, version=None):
+        self.version = version
+        self.graphs = {}
+        self.nodes = {}
+        self.nodegroup_nodes = {}
+
+
+class GraphRegistry:
+    """
+    Process-level cache of the current (published) graphs and their nodes.
+
+    The nodes of a graph are loaded with one query the first time any of
+    them is looked up. Everything is dropped when the shared registry version
+    changes, which happens whenever a graph, node or nodegroup is saved or
+    deleted (see invalidate_graph_registry), e.g. when a graph is published.
+    The shared version is read at most once every VERSION_CHECK_SECONDS, so
+    other processes pick up a change within that time.
+
+    Lookups read from the registry they started with, so a registry replaced
+    by another thread doesn't affect them.
+    """
+
+    _registry = _Registry()
+    # Monotonic time the shared version was last read
+    _checked = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def _version_is_fresh(cls) -> bool:
+        return (
+            cls._checked is not None
+            and time.monotonic() - cls._checked < VERSION_CHECK_SECONDS
+        )
+
+    @classmethod
+    def _get_registry(cls) -> _Registry:
+        if cls._version_is_fresh():
+            return cls._registry
+        with cls._lock:
+            if not cls._version_is_fresh():
+                version = get_graph_registry_version()
+                if version != cls._registry.version:
+                    cls._registry = _Registry(version)
+                cls._checked = time.monotonic()
+            return cls._registry
+
+    @classmethod
+    def clear(cls):
+        with cls._lock:
+            cls._registry = _Registry()
+            cls._checked = None
+
+    @classmethod
+    def get_graph(cls, slug: str) -> models.GraphModel | None:
+        registry = cls._get_registry()
+        graph = registry.graphs.get(slug)
+        if graph is None:
+            graph = models.GraphModel.objects.filter(
+                slug=slug, source_identifier_id__isnull=True
+            ).first()
+            if graph is None:
+                return None
+            registry.graphs[slug] = graph
+        return graph
+
+    @classmethod
+    def _get_graph_nodes(cls, slug: str) -> dict[str, models.Node]:
+        registry = cls._get_registry()
+        graph_nodes = registry.nodes.get(slug)
+        if graph_nodes is None:
+            graph = cls.get_graph(slug)
+            if graph is None:
+                return {}
+            nodes = list(models.Node.objects.filter(graph_id=graph.graphid))
+            graph_nodes = {node.alias: node for node in nodes}
+            nodegroup_nodes = {}
+            for node in nodes:
+                nodegroup_nodes.setdefault(str(node.nodegroup_id), []).append(node)
+            registry.nodegroup_nodes.update(nodegroup_nodes)
+            registry.nodes[slug] = graph_nodes
+        return graph_nodes
+
+    @classmethod
+    def get_node(cls, slug: str, alias: str) -> models.Node | None:
+        return cls._get_graph_nodes(slug).get(alias)
+
+    @classmethod
+    def get_nodes(cls, slug: str) -> list[models.Node]:
+        return list(cls._get_graph_nodes(slug).values())
+
+    @classmethod
+    def get_nodegroup_nodes(cls, nodegroup_id) -> list[models.Node]:
+        registry = cls._get_registry()
+        nodegroup_id = str(nodegroup_id)
+        nodes = registry.nodegroup_nodes.get(nodegroup_id)
+        if nodes is None:
+            nodes = list(models.Node.objects.filter(nodegroup_id=nodegroup_id))
+            registry.nodegroup_nodes[nodegroup_id] = nodes
+        return nodes
+
+    @classmethod
+    def get_nodegroup_node(cls, nodegroup_id, alias: str) -> models.Node | None:
+        for node in cls.get_nodegroup_nodes(nodegroup_id):
+            if node.alias == alias:
+                return node
+        return None
@@ -0,0 +1,250 @@
+import datetime
+import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.db import connection
+from django.utils import timezone
+
+from arches.app.models import models
+from arches.app.models.system_settings import settings
+
+from bcap.models import MaterializedViewRefresh
+
+logger = logging.getLogger(__name__)
+
+# The views refreshed by the refresh_materialized_views() procedure, which
+# support the one-row view used by DataBC to create the BCGW layer
+MATERIALIZED_VIEWS = [
+    "mv_bc_right",
+    "mv_bc_statement_of_significance",
+    "mv_borden_number",
+    "mv_chronology",
+    "mv_construction_actors",
+    "mv_government",
+    "mv_heritage_function",
+    "mv_heritage_class",
+    "mv_heritage_theme",
+    "mv_legal_description",
+    "mv_property_address",
+    "mv_unique_property_address",
+    "mv_protection_event",
+    "mv_geojson_geoms",
+    "mv_site_boundary",
+    "mv_site_names",
+    "mv_site_protection_event",
+    "mv_site_record_admin",
+]
+
+REFRESHED = "refreshed"
+UNCHANGED = "unchanged"
+FAILED = "failed"
+DEPENDENCY_FAILED = "dependency failed"
+
+
+def get_existing_views(view_names) -> list[str]:
+    with connection.cursor() as cur:
+        cur.execute(
+            "select relname from pg_class where relkind = 'm' and relname = any(%s)",
+            [list(view_names)],
+        )
+        existing = {row[0] for row in cur.fetchall()}
+    return [view_name for view_name in view_names if view_name in existing]
+
+
+def get_view_sources(view_names) -> tuple[dict[str, set[str]], dict[str, set[str]]]:
+    """
+    Returns the other materialized views each view reads from, and the
+    schemas of the tables and views it reads from. The relational views of a
+    graph are in a schema named with its slug (e.g. heritage_site.bc_right).
+    """
+    with connection.cursor() as cur:
+        cur.execute(
+            """
+            select distinct v.relname, d.relname, d.relkind = 'm', n.nspname
+              from pg_class v
+              join pg_rewrite r on r.ev_class = v.oid
+              join pg_depend dep on dep.objid = r.oid
+                                and dep.classid = 'pg_rewrite'::regclass
+                                and dep.refclassid = 'pg_class'::regclass
+              join pg_class d on d.oid = dep.refobjid
+              join pg_namespace n on n.oid = d.relnamespace
+             where v.relkind = 'm'
+               and d.relkind in ('r', 'p', 'v', 'm', 'f')
+               and d.oid <> v.oid
+               and v.relname = any(%s)
+            """,
+            [list(view_names)],
+        )
+        rows = cur.fetchall()
+    dependencies = {view_name: set() for view_name in view_names}
+    schemas = {view_name: set() for view_name in view_names}
+    for view_name, source, is_materialized_view, schema in rows:
+        if is_materialized_view:
+            if source in dependencies:
+                dependencies[view_name].add(source)
+        else:
+            schemas[view_name].add(schema)
+    return dependencies, schemas
+
+
+def get_concurrent_views(view_names) -> set[str]:
+    """
+    Returns the views with a unique index on plain columns covering all rows,
+    which REFRESH MATERIALIZED VIEW CONCURRENTLY requires.
+    """
+    with connection.cursor() as cur:
+        cur.execute(
+            """
+            select distinct c.relname
+              from pg_index i
+              join pg_class c on c.oid = i.indrelid
+             where c.relkind = 'm'
+               and c.relispopulated
+               and c.relname = any(%s)
+               and i.indisunique
+               and i.indisvalid
+               and i.indpred is null
+               and 0 <> all (i.indkey::int2[])
+            """,
+            [list(view_names)],
+        )
+        return {row[0] for row in cur.fetchall()}
+
+
+def is_view_changed(schemas, last_refresh, graph_ids, max_age=None) -> bool:
+    """
+    Returns whether a resource of a graph the view reads from has been edited
+    since its last refresh. Views that have never been refreshed, or that read
+    from a schema which isn't a graph (so edits can't be tracked), have always
+    changed.
+
+    The edit log only records changes made through Arches, not bulk loads or
+    direct SQL updates of the tiles, so a view last refreshed more than
+    max_age seconds ago (default MATERIALIZED_VIEW_MAX_AGE_SECONDS) has
+    always changed too.
+    """
+    if last_refresh is None or not schemas or schemas - graph_ids.keys():
+        return True
+    if max_age is None:
+        max_age = settings.MATERIALIZED_VIEW_MAX_AGE_SECONDS
+    if last_refresh.refreshed < timezone.now() - datetime.timedelta(seconds=max_age):
+        return True
+    return models.EditLog.objects.filter(
+        resourceclassid__in=[str(graph_ids[schema]) for schema in schemas],
+        timestamp__gt=last_refresh.refreshed,
+    ).exists()
+
+
+def refresh_view(view_name, concurrently) -> float:
+    """Refreshes the view on the connection of the calling thread"""
+    start = time.perf_counter()
+    try:
+        with connection.cursor() as cur:
+            cur.execute(
+                "refresh materialized view %s%s"
+                % ("concurrently " if concurrently else "", view_name)
+            )
+    finally:
+        connection.close()
+    return time.perf_counter() - start
+
+
+def refresh_views(
+    view_names=None, workers=4, force=False, max_age=None
+) -> dict[str, dict]:
+    """
+    Refreshes the materialized views in parallel, each on its own connection,
+    starting a view once the views it reads from are done. Views with a
+    unique index are refreshed concurrently so readers aren't blocked.
+
+    Unless force is set, a view is skipped when none of the graphs it reads
+    from have been edited since its last refresh, it was refreshed within
+    max_age seconds and none of the views it reads from were refreshed.
+
+    Returns the status, duration and whether it was refreshed concurrently
+    for each view.
+    """
+    view_names = get_existing_views(view_names if view_names else MATERIALIZED_VIEWS)
+    dependencies, schemas = get_view_sources(view_names)
+    concurrent_views = get_concurrent_views(view_names)
+    last_refreshes = MaterializedViewRefresh.objects.in_bulk(view_names)
+    graph_ids = dict(
+        models.GraphModel.objects.filter(
+            slug__in=set().union(*schemas.values())
+        ).values_list("slug", "graphid")
+    )
+
+    results = {}
+    pending = list(view_names)
+    running = {}
+
+    def start_ready_views(executor):
+        ready = [
+            view_name
+            for view_name in pending
+            if not dependencies[view_name] - results.keys()
+        ]
+        while ready:
+            for view_name in ready:
+                pending.remove(view_name)
+                statuses = {
+                    results[dependency]["status"]
+                    for dependency in dependencies[view_name]
+                }
+                if statuses & {FAILED, DEPENDENCY_FAILED}:
+                    results[view_name] = {"status": DEPENDENCY_FAILED, "duration": 0}
+                elif (
+                    not force
+                    and REFRESHED not in statuses
+                    and not is_view_changed(
+                        schemas[view_name],
+                        last_refreshes.get(view_name),
+                        graph_ids,
+                        max_age,
+                    )
+                ):
+                    results[view_name] = {"status": UNCHANGED, "duration": 0}
+                else:
+                    concurrently = view_name in concurrent_views
+                    future = executor.submit(refresh_view, view_name, concurrently)
+                    running[future] = (view_name, concurrently, timezone.now())
+            # Views skipped above may have unblocked others
+            ready = [
+                view_name
+                for view_name in pending
+                if not dependencies[view_name] - results.keys()
+            ]
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        start_ready_views(executor)
+        while running:
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                view_name, concurrently, started = running.pop(future)
+                try:
+                    duration = future.result()
+                except Exception as e:
+                    logger.error("Unable to refresh %s: %s" % (view_name, e))
+                    results[view_name] = {"status": FAILED, "duration": 0}
+                    continue
+                MaterializedViewRefresh.objects.update_or_create(
+                    view_name=view_name,
+                    defaults={
+                        "refreshed": started,
+                        "duration": duration,
+                        "concurrently": concurrently,
+                    },
+                )
+                results[view_name] = {
+                    "status": REFRESHED,
+                    "duration": duration,
+                    "concurrently": concurrently,
+                }
+            start_ready_views(executor)
+
+    # Views still pending wait on a dependency cycle
+    for view_name in pending:
+        results[view_name] = {"status": DEPENDENCY_FAILED, "duration": 0}
+
+    return {view_name: results[view_name] for view_name in view_names}
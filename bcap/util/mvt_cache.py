@@ -0,0 +1,282 @@
+import hashlib
+import json
+import logging
+import math
+
+from django.contrib.contenttypes.models import ContentType
+from django.contrib.gis.db.models import Extent
+from django.contrib.gis.geos import GEOSGeometry
+from django.core.cache import caches
+from django.db import transaction
+from guardian.models import UserObjectPermission
+
+from arches.app.models import models
+from arches.app.models.system_settings import settings
+
+from bcap.util.graph import GraphRegistry
+
+logger = logging.getLogger(__name__)
+
+GEOMETRY_DATATYPE = "geojson-feature-collection"
+
+# Half the width of the web mercator (EPSG:3857) world
+ORIGIN_SHIFT = 20037508.342789244
+# Geometries are drawn up to this fraction of a tile outside it (the tile
+# buffer of the MVT queries)
+TILE_BUFFER = 256 / 4096
+# Tiles deeper than this share the invalidation version of their ancestor at
+# this zoom, which bounds the number of versions an edit has to update
+INVALIDATION_ZOOM = 12
+# An edit covering more tiles than this at any zoom invalidates the layer
+MAX_INVALIDATED_TILES = 256
+# Instance permission changes to more resources than this invalidate the
+# layers of their geometries instead of the tiles around each of them
+MAX_INVALIDATED_RESOURCES = 100
+# Bumped whenever the instance permissions of a resource change, so tiles
+# rendered before the change can be recognised (see mvt_seed)
+RESTRICTION_VERSION_KEY = "bcap_mvt_restrictions"
+
+
+def get_mvt_cache():
+    return caches[settings.MVT_CACHE_ALIAS]
+
+
+def get_timeout(zoom: int) -> int | None:
+    timeout = None
+    for min_zoom, seconds in sorted(settings.MVT_CACHE_TIMEOUTS.items()):
+        if zoom >= min_zoom:
+            timeout = seconds
+    return timeout
+
+
+def get_permission_scope(user, viewable_nodegroups) -> str:
+    """
+    Returns a key shared by the users who see the same tiles: users with the
+    same viewable nodegroups and groups (instance restrictions, e.g. for the
+    Guest group, are assigned to groups). Users with instance permissions of
+    their own, like the anonymous user, get a scope of their own.
+    """
+    has_own_permissions = UserObjectPermission.objects.filter(user=user).exists()
+    scope = [
+        sorted(str(nodegroup_id) for nodegroup_id in viewable_nodegroups),
+        sorted(user.groups.values_list("id", flat=True)),
+        user.is_superuser,
+        user.pk if has_own_permissions else None,
+    ]
+    return hashlib.sha1(json.dumps(scope).encode("utf-8")).hexdigest()
+
+
+def get_tile_range(
+    extent, zoom: int, tile_buffer=TILE_BUFFER
+) -> tuple[int, int, int, int]:
+    """Returns the (min x, min y, max x, max y) tiles at zoom covering a 3857 extent"""
+    count = 2**zoom
+    size = 2 * ORIGIN_SHIFT / count
+    buffer = size * tile_buffer
+    min_x, min_y, max_x, max_y = extent
+
+    def to_tile(value):
+        return min(max(int(math.floor(value / size)), 0), count - 1)
+
+    return (
+        to_tile(min_x - buffer + ORIGIN_SHIFT),
+        to_tile(ORIGIN_SHIFT - max_y - buffer),
+        to_tile(max_x + buffer + ORIGIN_SHIFT),
+        to_tile(ORIGIN_SHIFT - min_y + buffer),
+    )
+
+
+def _layer_version_key(nodeid) -> str:
+    return "bcap_mvt_layer:%s" % nodeid
+
+
+def _region_version_key(nodeid, zoom: int, x: int, y: int) -> str:
+    region_zoom = min(zoom, INVALIDATION_ZOOM)
+    shift = zoom - region_zoom
+    return "bcap_mvt_region:%s:%s:%s:%s" % (nodeid, region_zoom, x >> shift, y >> shift)
+
+
+def _increment(cache, key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, None)
+
+
+def get_restriction_version() -> int:
+    return get_mvt_cache().get(RESTRICTION_VERSION_KEY, 0)
+
+
+def _get_tile_keys(cache, nodeid, tiles, scope: str) -> list[str]:
+    """Returns the current cache key of each (zoom, x, y) tile"""
+    layer_key = _layer_version_key(nodeid)
+    region_keys = [_region_version_key(nodeid, *tile) for tile in tiles]
+    versions = cache.get_many([layer_key] + region_keys)
+    return [
+        "bcap_mvt:%s:%s:%s:%s:%s:%s:%s"
+        % (
+            nodeid,
+            zoom,
+            x,
+            y,
+            scope,
+            versions.get(layer_key, 0),
+            versions.get(region_key, 0),
+        )
+        for (zoom, x, y), region_key in zip(tiles, region_keys)
+    ]
+
+
+def _set_tile(cache, key, zoom, tile) -> bytes:
+    tile = bytes(tile) if tile else b""
+    cache.set(key, tile, get_timeout(zoom))
+    return tile
+
+
+def get_tile(nodeid, zoom, x, y, scope: str, create_tile):
+    """
+    Returns the cached tile for the permission scope, calling create_tile()
+    to render (and cache) it when it isn't cached. Empty tiles are cached too.
+    """
+    zoom, x, y = int(zoom), int(x), int(y)
+    cache = get_mvt_cache()
+    [key] = _get_tile_keys(cache, nodeid, [(zoom, x, y)], scope)
+
+    tile = cache.get(key)
+    if tile is None:
+        tile = _set_tile(cache, key, zoom, create_tile())
+    return tile
+
+
+def get_uncached_tiles(nodeid, tiles, scope: str) -> list[tuple[tuple, str]]:
+    """
+    Returns the (zoom, x, y) tiles that aren't cached for the permission
+    scope, i.e. that have never been rendered, have expired or were
+    invalidated by an edit, each with the key to cache it under.
+
+    The keys are those of the current versions, so a tile rendered after this
+    call but invalidated before it is cached is stored under a key that is
+    no longer read.
+    """
+    cache = get_mvt_cache()
+    keys = _get_tile_keys(cache, nodeid, tiles, scope)
+    cached = cache.get_many(keys)
+    return [(tile, key) for tile, key in zip(tiles, keys) if key not in cached]
+
+
+def get_tile_keys(nodeid, tiles, scope: str) -> list[tuple[tuple, str]]:
+    """Returns the (zoom, x, y) tiles, each with its current cache key"""
+    return list(zip(tiles, _get_tile_keys(get_mvt_cache(), nodeid, tiles, scope)))
+
+
+def set_tile(key, zoom, tile):
+    """Caches a tile under a key from get_uncached_tiles or get_tile_keys"""
+    _set_tile(get_mvt_cache(), key, zoom, tile)
+
+
+def invalidate_extent(nodeid, extent):
+    """Invalidates the cached tiles of a layer touching a 3857 extent"""
+    cache = get_mvt_cache()
+    keys = set()
+    for zoom in range(INVALIDATION_ZOOM + 1):
+        min_x, min_y, max_x, max_y = get_tile_range(extent, zoom)
+        if (max_x - min_x + 1) * (max_y - min_y + 1) > MAX_INVALIDATED_TILES:
+            logger.debug("Invalidating all %s tiles" % nodeid)
+            _increment(cache, _layer_version_key(nodeid))
+            return
+        keys.update(
+            _region_version_key(nodeid, zoom, tile_x, tile_y)
+            for tile_x in range(min_x, max_x + 1)
+            for tile_y in range(min_y, max_y + 1)
+        )
+    for key in keys:
+        _increment(cache, key)
+
+
+def _get_feature_extent(feature_collection):
+    extent = None
+    for feature in (feature_collection or {}).get("features", []):
+        geometry = GEOSGeometry(json.dumps(feature["geometry"]), srid=4326)
+        geometry.transform(3857)
+        min_x, min_y, max_x, max_y = geometry.extent
+        if extent:
+            min_x, min_y = min(min_x, extent[0]), min(min_y, extent[1])
+            max_x, max_y = max(max_x, extent[2]), max(max_y, extent[3])
+        extent = (min_x, min_y, max_x, max_y)
+    return extent
+
+
+def invalidate_tile_geometries(tile):
+    """
+    Invalidates the cached tiles touching the geometries of a tile being
+    saved or deleted, both where they were and where they're going, once the
+    transaction commits. Tiles without geometry nodes don't query anything.
+    """
+    nodeids = [
+        str(node.nodeid)
+        for node in GraphRegistry.get_nodegroup_nodes(tile.nodegroup_id)
+        if node.datatype == GEOMETRY_DATATYPE
+    ]
+    if not nodeids:
+        return
+
+    extents = [
+        (str(row["node_id"]), row["extent"])
+        for row in models.GeoJSONGeometry.objects.filter(
+            tile_id=tile.tileid, node_id__in=nodeids
+        )
+        .values("node_id")
+        .annotate(extent=Extent("geom"))
+    ]
+    extents += [
+        (nodeid, _get_feature_extent(tile.data.get(nodeid)))
+        for nodeid in nodeids
+        if tile.data
+    ]
+    extents = [(nodeid, extent) for nodeid, extent in extents if extent]
+
+    def invalidate():
+        for nodeid, extent in extents:
+            invalidate_extent(nodeid, extent)
+
+    if extents:
+        transaction.on_commit(invalidate)
+
+
+def invalidate_resource_tiles(resourceinstanceids):
+    """
+    Invalidates the cached tiles showing the geometries of resources whose
+    instance permissions changed, e.g. a site restricted from the Guest group
+    and the anonymous user, once the transaction commits.
+    """
+    resourceinstanceids = sorted({str(id) for id in resourceinstanceids})
+    if not resourceinstanceids:
+        return
+
+    def invalidate():
+        cache = get_mvt_cache()
+        _increment(cache, RESTRICTION_VERSION_KEY)
+        geometries = models.GeoJSONGeometry.objects.filter(
+            resourceinstance_id__in=resourceinstanceids
+        )
+        if len(resourceinstanceids) > MAX_INVALIDATED_RESOURCES:
+            for nodeid in geometries.values_list("node_id", flat=True).distinct():
+                logger.debug("Invalidating all %s tiles" % nodeid)
+                _increment(cache, _layer_version_key(nodeid))
+            return
+        for row in geometries.values("resourceinstance_id", "node_id").annotate(
+            extent=Extent("geom")
+        ):
+            if row["extent"]:
+                invalidate_extent(str(row["node_id"]), row["extent"])
+
+    transaction.on_commit(invalidate)
+
+
+def resource_permission_changed(instance):
+    """Invalidates the tiles of the resource of a guardian object permission"""
+    if (
+        ContentType.objects.get_for_id(instance.content_type_id).model_class()
+        is models.ResourceInstance
+    ):
+        invalidate_resource_tiles([instance.object_pk])
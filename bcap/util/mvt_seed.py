@@ -0,0 +1,106 @@
+import logging
+
+from django.contrib.gis.geos import Polygon
+
+from arches.app.models import models
+from arches.app.models.system_settings import settings
+
+from bcap.util.mvt_cache import (
+    get_restriction_version,
+    get_tile_keys,
+    get_tile_range,
+    get_uncached_tiles,
+    set_tile,
+)
+from bcap.util.mvt_tiler import MVTTiler
+from bcap.util.permission_snapshot import get_permission_snapshot
+
+logger = logging.getLogger(__name__)
+
+# Extent of British Columbia (EPSG:4326)
+BC_EXTENT = (-139.06, 48.3, -114.03, 60.0)
+
+
+def get_seed_tiles(max_zoom: int, extent=BC_EXTENT) -> list[tuple[int, int, int]]:
+    """Returns the (zoom, x, y) tiles covering the extent for zooms 0 to max_zoom"""
+    bbox = Polygon.from_bbox(extent)
+    bbox.srid = 4326
+    bbox.transform(3857)
+    tiles = []
+    for zoom in range(max_zoom + 1):
+        min_x, min_y, max_x, max_y = get_tile_range(bbox.extent, zoom)
+        tiles += [
+            (zoom, x, y)
+            for x in range(min_x, max_x + 1)
+            for y in range(min_y, max_y + 1)
+        ]
+    return tiles
+
+
+def get_seed_users(usernames) -> list[tuple]:
+    """
+    Returns (user, viewable nodegroups, permission scope) for the first of
+    the users with each permission scope.
+    """
+    seed_users = []
+    scopes = set()
+    for user in models.User.objects.filter(username__in=usernames).order_by("id"):
+        snapshot = get_permission_snapshot(user)
+        viewable_nodegroups = snapshot["viewable_nodegroups"]
+        scope = snapshot["mvt_scope"]
+        if scope not in scopes:
+            scopes.add(scope)
+            seed_users.append((user, viewable_nodegroups, scope))
+    return seed_users
+
+
+def seed_tiles(nodeids=None, max_zoom=None, usernames=None, force=False) -> dict:
+    """
+    Renders the low zoom tiles of the map layers into the tile cache, for the
+    permission scope of each of the users.
+
+    Only tiles missing from the cache are rendered unless force is set. Saving
+    a geometry, or changing the instance permissions of a resource, invalidates
+    the cached tiles it touches, so after the first run only the tiles around
+    geometries edited or restricted since (or that expired) are rendered again.
+
+    Tiles are cached under the keys read before they're rendered, so a tile
+    invalidated while it renders is never read. A scope is skipped for the
+    rest of the run once any instance permission changes, since the user it is
+    rendered for may no longer see the same tiles; the next run renders it.
+    """
+    nodeids = nodeids if nodeids else list(MVTTiler.get_query_config())
+    max_zoom = settings.MVT_SEED_MAX_ZOOM if max_zoom is None else max_zoom
+    usernames = usernames if usernames else settings.MVT_SEED_USERNAMES
+
+    tiles = get_seed_tiles(max_zoom)
+    tiler = MVTTiler()
+    counts = {"tiles": 0, "rendered": 0, "skipped_scopes": 0}
+    for user, viewable_nodegroups, scope in get_seed_users(usernames):
+        restriction_version = get_restriction_version()
+        for nodeid in nodeids:
+            if force:
+                pending = get_tile_keys(nodeid, tiles, scope)
+            else:
+                pending = get_uncached_tiles(nodeid, tiles, scope)
+            rendered = 0
+            for (zoom, x, y), key in pending:
+                tile = tiler.createTile(nodeid, viewable_nodegroups, user, zoom, x, y)
+                if get_restriction_version() != restriction_version:
+                    break
+                set_tile(key, zoom, tile)
+                rendered += 1
+            counts["tiles"] += len(tiles)
+            counts["rendered"] += rendered
+            if rendered < len(pending):
+                logger.warning(
+                    "Instance permissions changed while seeding tiles for %s, "
+                    "skipping the rest of its tiles" % user.username
+                )
+                counts["skipped_scopes"] += 1
+                break
+            logger.info(
+                "Seeded %s of %s %s tiles for %s"
+                % (rendered, len(tiles), nodeid, user.username)
+            )
+    return counts
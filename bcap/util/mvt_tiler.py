@@ -1,7 +1,26 @@
+from django.db import connection
+
+from arches.app.models import models
+from arches.app.models.system_settings import settings
+from arches.app.search.search_engine_factory import SearchEngineFactory
+from arches.app.utils.permission_backend import get_filtered_instances
 from bcgov_arches_common.util.mvt_tiler_common import MVTTiler as MVTTiler_Base
 
+# A uuid that is never a resource id, so the permission filter is never empty
+NO_RESOURCE_ID = "10000000-0000-0000-0000-000000000001"
+
 
 class MVTTiler(MVTTiler_Base):
+    """
+    Tiler of the map layers. The features of the layers in get_query_config
+    are enriched with their attribute data by joining
+    get_map_attribute_data_for_resources once per tile, rather than calling
+    get_map_attribute_data once per feature as the base does.
+    """
+
+    EARTHCIRCUM = 40075016.6856
+    PIXELSPERTILE = 256
+    se = SearchEngineFactory().create()
 
     def __init__(self):
         pass
@@ -16,3 +35,168 @@ class MVTTiler(MVTTiler_Base):
                 "borden_number",
             ],  # Archaeological Site
         }
+
+    def createTile(self, nodeid, viewable_nodegroups, user, zoom, x, y):
+        attributes = self.get_query_config().get(str(nodeid))
+        if not attributes:
+            return super().createTile(nodeid, viewable_nodegroups, user, zoom, x, y)
+        try:
+            node = models.Node.objects.get(
+                nodeid=nodeid, nodegroup_id__in=viewable_nodegroups
+            )
+        except models.Node.DoesNotExist:
+            return None
+
+        zoom, x, y = int(zoom), int(x), int(y)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT resourceinstanceid::text
+                  FROM geojson_geometries
+                 WHERE ST_Intersects(geom, TileBBox(%s, %s, %s, 3857))
+                   AND nodeid = %s
+                """,
+                [zoom, x, y, nodeid],
+            )
+            resources = [row[0] for row in cursor.fetchall()]
+            exclusive_set, resource_ids = get_filtered_instances(
+                user, search_engine=self.se, resources=resources
+            )
+            permission_filter = (
+                "resourceinstanceid in %s"
+                if exclusive_set
+                else "resourceinstanceid not in %s"
+            )
+            resource_ids = tuple(resource_ids) if resource_ids else (NO_RESOURCE_ID,)
+
+            config = node.config
+            if zoom <= int(config["clusterMaxZoom"]):
+                cursor.execute(
+                    """
+                    SELECT count(*)
+                      FROM geojson_geometries
+                     WHERE ST_Intersects(geom, TileBBox(%s, %s, %s, 3857))
+                       AND nodeid = %s AND {filter}
+                    """.format(
+                        filter=permission_filter
+                    ),
+                    [zoom, x, y, nodeid, resource_ids],
+                )
+                count = cursor.fetchone()[0]
+                if not count:
+                    return ""
+                min_points = int(config["clusterMinPoints"])
+                if count >= min_points:
+                    arc = self.EARTHCIRCUM / ((1 << zoom) * self.PIXELSPERTILE)
+                    distance = min(
+                        arc * float(config["clusterDistance"]),
+                        settings.CLUSTER_DISTANCE_MAX,
+                    )
+                    cursor.execute(
+                        self.get_cluster_query(attributes, permission_filter),
+                        [distance, min_points, zoom, x, y, nodeid, resource_ids]
+                        + [nodeid, nodeid]
+                        + [zoom, x, y] * 2,
+                    )
+                    return bytes(cursor.fetchone()[0])
+
+            cursor.execute(
+                self.get_feature_query(attributes, permission_filter),
+                [zoom, x, y, nodeid, resource_ids, zoom, x, y, nodeid, nodeid],
+            )
+            return bytes(cursor.fetchone()[0])
+
+    @staticmethod
+    def _attribute_columns(attributes, source="a.attribute_data") -> str:
+        return "".join(
+            ", %s AS %s"
+            % ("%s ->> '%s'" % (source, attribute) if source else "NULL", attribute)
+            for attribute in attributes
+        )
+
+    def get_feature_query(self, attributes, permission_filter) -> str:
+        """
+        Returns the query of a tile of features, each with the attribute data
+        of its resource. Parameters: zoom, x, y, nodeid, resource ids, zoom,
+        x, y, nodeid (attribute data) and nodeid (layer name).
+        """
+        return """
+            WITH features AS (
+                SELECT tileid,
+                       id,
+                       resourceinstanceid,
+                       nodeid,
+                       featureid::text AS featureid,
+                       ST_AsMVTGeom(geom, TileBBox(%s, %s, %s, 3857)) AS geom
+                  FROM geojson_geometries
+                 WHERE nodeid = %s AND {filter}
+                   AND geom && ST_TileEnvelope(%s, %s, %s)
+            ),
+            attributes AS (
+                SELECT *
+                  FROM get_map_attribute_data_for_resources(
+                           (SELECT array_agg(DISTINCT resourceinstanceid) FROM features), %s
+                       )
+            )
+            SELECT ST_AsMVT(tile, %s, 4096, 'geom', 'id')
+              FROM (SELECT f.*, 1 AS total{attributes}
+                      FROM features f
+                      LEFT JOIN attributes a ON a.resourceinstanceid = f.resourceinstanceid
+                   ) AS tile
+            """.format(
+            filter=permission_filter,
+            attributes=self._attribute_columns(attributes),
+        )
+
+    def get_cluster_query(self, attributes, permission_filter) -> str:
+        """
+        Returns the query of a tile of clustered features. Features left out
+        of the clusters have the attribute data of their resource. Parameters:
+        distance, min points, zoom, x, y, nodeid, resource ids, nodeid
+        (attribute data), nodeid (layer name) and zoom, x, y twice.
+        """
+        return """
+            WITH clusters AS (
+                SELECT m.*,
+                       ST_ClusterDBSCAN(geom, eps := %s, minpoints := %s) OVER () AS cid
+                  FROM (SELECT tileid, resourceinstanceid, nodeid, geom
+                          FROM geojson_geometries
+                         WHERE ST_Intersects(geom, TileBBox(%s, %s, %s, 3857))
+                           AND nodeid = %s AND {filter}
+                       ) m
+            ),
+            attributes AS (
+                SELECT *
+                  FROM get_map_attribute_data_for_resources(
+                           (SELECT array_agg(DISTINCT resourceinstanceid)
+                              FROM clusters
+                             WHERE cid IS NULL), %s
+                       )
+            )
+            SELECT ST_AsMVT(tile, %s, 4096, 'geom', 'id')
+              FROM (SELECT c.resourceinstanceid::text,
+                           row_number() OVER () AS id,
+                           1 AS total,
+                           ST_AsMVTGeom(c.geom, TileBBox(%s, %s, %s, 3857)) AS geom,
+                           '' AS extent{attributes}
+                      FROM clusters c
+                      LEFT JOIN attributes a ON a.resourceinstanceid = c.resourceinstanceid
+                     WHERE c.cid IS NULL
+                     UNION
+                    SELECT NULL AS resourceinstanceid,
+                           row_number() OVER () AS id,
+                           count(*) AS total,
+                           ST_AsMVTGeom(
+                               ST_Centroid(ST_Collect(geom)),
+                               TileBBox(%s, %s, %s, 3857)
+                           ) AS geom,
+                           ST_AsGeoJSON(ST_Extent(geom)) AS extent{cluster_attributes}
+                      FROM clusters
+                     WHERE cid IS NOT NULL
+                     GROUP BY cid
+                   ) AS tile
+            """.format(
+            filter=permission_filter,
+            attributes=self._attribute_columns(attributes),
+            cluster_attributes=self._attribute_columns(attributes, source=None),
+        )
@@ -0,0 +1,278 @@
+import logging
+
+from django.db import connection, transaction
+from django.db.models import Q
+
+from arches.app.models import models
+
+from bcap.models import ExportChangelog
+from bcap.util.materialized_views import (
+    MATERIALIZED_VIEWS,
+    get_existing_views,
+    get_view_sources,
+)
+
+logger = logging.getLogger(__name__)
+
+EXPORT_VIEW = "databc.v_historic_enviro_onerow_site"
+# Persistent copy of EXPORT_VIEW read by DataBC to create the BCGW layer
+EXPORT_TABLE = "databc.historic_enviro_onerow_site"
+# Plain views with the definitions of the materialized views behind
+# EXPORT_VIEW, so export rows can be recomputed from the current data
+LIVE_SCHEMA = "databc_live"
+
+SITE_GRAPH_SLUG = "heritage_site"
+# Graphs whose resources appear in the export. Changes to a legislative act
+# or government affect the sites related to it.
+EXPORT_GRAPH_SLUGS = [SITE_GRAPH_SLUG, "legislative_act", "government"]
+
+# Changes are logged per statement from the transition table, so bulk loads
+# add one changelog row per resource rather than one per tile
+CHANGELOG_TRIGGERS = [
+    ("bcap_export_changelog_insert", "insert", "tiles", "new"),
+    ("bcap_export_changelog_update", "update", "tiles", "new"),
+    ("bcap_export_changelog_delete", "delete", "tiles", "old"),
+    ("bcap_export_changelog_delete", "delete", "resource_instances", "old"),
+    ("bcap_export_changelog_delete", "delete", "resource_x_resource", "old"),
+]
+# Each change is logged with the graph of the resource, as deleted resources
+# are no longer in resource_instances and their graph is read from the
+# transition table. Relationships are removed before the resources they
+# relate, so the sites related to a deleted legislative act or government are
+# logged when its relationships are removed.
+CHANGELOG_FUNCTIONS = {
+    "tiles": """
+        select distinct c.resourceinstanceid, g.slug, now()
+          from changed_rows c
+          join resource_instances ri on ri.resourceinstanceid = c.resourceinstanceid
+          join graphs g on g.graphid = ri.graphid
+         where g.slug = any(tg_argv)
+    """,
+    "resource_instances": """
+        select c.resourceinstanceid, g.slug, now()
+          from changed_rows c
+          join graphs g on g.graphid = c.graphid
+         where g.slug = any(tg_argv)
+    """,
+    "resource_x_resource": """
+        select distinct r.resourceinstanceid, site_graph.slug, now()
+          from changed_rows c
+          join graphs site_graph on site_graph.slug = '%s'
+          join graphs other_graph on other_graph.slug = any(tg_argv)
+         cross join lateral (
+                select c.resourceinstanceidfrom resourceinstanceid
+                 where c.resourceinstancefrom_graphid = site_graph.graphid
+                   and c.resourceinstanceto_graphid = other_graph.graphid
+                 union all
+                select c.resourceinstanceidto
+                 where c.resourceinstanceto_graphid = site_graph.graphid
+                   and c.resourceinstancefrom_graphid = other_graph.graphid
+               ) r
+    """
+    % SITE_GRAPH_SLUG,
+}
+
+
+def export_exists() -> bool:
+    with connection.cursor() as cur:
+        cur.execute("select to_regclass(%s) is not null", [EXPORT_TABLE])
+        return cur.fetchone()[0]
+
+
+def _get_live_view_definitions() -> list[tuple[str, str]]:
+    """
+    Returns the name and definition of the views to create in LIVE_SCHEMA,
+    each after the views it reads from. The definitions are read with the
+    default search path, so the views they read from aren't schema qualified.
+    """
+    view_names = get_existing_views(MATERIALIZED_VIEWS)
+    dependencies, _ = get_view_sources(view_names)
+    ordered = []
+    while len(ordered) < len(view_names):
+        ready = [
+            view_name
+            for view_name in view_names
+            if view_name not in ordered and dependencies[view_name] <= set(ordered)
+        ]
+        if not ready:
+            raise Exception("Materialized views depend on each other in a cycle")
+        ordered += ready
+
+    definitions = []
+    with connection.cursor() as cur:
+        for view_name, source in [(view_name, view_name) for view_name in ordered] + [
+            ("v_historic_site", "v_historic_site"),
+            ("v_historic_enviro_onerow_site", EXPORT_VIEW),
+        ]:
+            cur.execute("select pg_get_viewdef(%s::regclass)", [source])
+            definitions.append((view_name, cur.fetchone()[0]))
+    return definitions
+
+
+def create_live_views():
+    """
+    (Re)creates LIVE_SCHEMA with plain views of the same names as the
+    materialized views, v_historic_site and the one-row view. With LIVE_SCHEMA
+    first in the search path, the copied definitions read from the live views.
+    """
+    definitions = _get_live_view_definitions()
+    with transaction.atomic(), connection.cursor() as cur:
+        cur.execute("drop schema if exists %s cascade" % LIVE_SCHEMA)
+        cur.execute("create schema %s" % LIVE_SCHEMA)
+        cur.execute("set local search_path to %s, public" % LIVE_SCHEMA)
+        for view_name, definition in definitions:
+            cur.execute(
+                "create view %s.%s as %s" % (LIVE_SCHEMA, view_name, definition)
+            )
+
+
+def _create_changelog_triggers(cur):
+    for table, query in CHANGELOG_FUNCTIONS.items():
+        cur.execute(
+            """
+            create or replace function bcap_log_export_%s_change() returns trigger as
+            $$
+            begin
+                insert into bcap_export_changelog (resourceinstanceid, graph_slug, changed)
+                %s;
+                return null;
+            end
+            $$ language plpgsql
+            """
+            % (table, query)
+        )
+    for name, event, table, transition in CHANGELOG_TRIGGERS:
+        cur.execute("drop trigger if exists %s on %s" % (name, table))
+        cur.execute(
+            """
+            create trigger %s after %s on %s
+            referencing %s table as changed_rows
+            for each statement execute function bcap_log_export_%s_change(%s)
+            """
+            % (
+                name,
+                event,
+                table,
+                transition,
+                table,
+                ", ".join("'%s'" % slug for slug in EXPORT_GRAPH_SLUGS),
+            )
+        )
+
+
+def rebuild_export():
+    """
+    Recreates the live views, installs the triggers that log the resources to
+    update and loads the whole export table. Writers to the tiles table wait
+    on the new triggers until the load is committed, so no change is missed
+    between the two. Returns the number of rows loaded.
+    """
+    create_live_views()
+    with transaction.atomic(), connection.cursor() as cur:
+        _create_changelog_triggers(cur)
+        cur.execute("truncate bcap_export_changelog")
+        cur.execute("drop table if exists %s" % EXPORT_TABLE)
+        cur.execute(
+            "create table %s as select * from %s.v_historic_enviro_onerow_site"
+            % (EXPORT_TABLE, LIVE_SCHEMA)
+        )
+        cur.execute(
+            "create index historic_enviro_onerow_site_id_idx on %s (site_id)"
+            % EXPORT_TABLE
+        )
+        cur.execute(
+            """
+            DO
+            $$
+                DECLARE
+                    databc_user text;
+                BEGIN
+                    select replace(current_database(), 'bcap','proxy_databc') into databc_user;
+                    EXECUTE format('grant select on %s to %%s' ,quote_ident(databc_user));
+                end;
+            $$ language 'plpgsql'
+            """
+            % EXPORT_TABLE
+        )
+        cur.execute("select count(*) from %s" % EXPORT_TABLE)
+        return cur.fetchone()[0]
+
+
+def get_affected_sites(changes) -> list[str]:
+    """
+    Returns the sites whose export rows depend on the changed resources, given
+    as (resource, graph slug) pairs from the changelog: the changed sites
+    themselves and the sites related to a changed legislative act or
+    government. Deleted sites are returned as is so their rows are removed.
+    Entries logged without a graph are looked up.
+    """
+    graph_slugs = {id: slug for id, slug in changes if slug}
+    unknown_ids = {id for id, slug in changes if not slug} - graph_slugs.keys()
+    if unknown_ids:
+        graph_slugs.update(
+            (str(id), slug)
+            for id, slug in models.ResourceInstance.objects.filter(
+                pk__in=unknown_ids
+            ).values_list("resourceinstanceid", "graph__slug")
+        )
+    resourceinstanceids = {id for id, slug in changes}
+    site_ids = {
+        id
+        for id in resourceinstanceids
+        if graph_slugs.get(id, SITE_GRAPH_SLUG) == SITE_GRAPH_SLUG
+    }
+    other_ids = resourceinstanceids - site_ids
+    if other_ids:
+        site_graph = models.GraphModel.objects.filter(
+            slug=SITE_GRAPH_SLUG, source_identifier_id__isnull=True
+        ).first()
+        for from_id, to_id in models.ResourceXResource.objects.filter(
+            Q(from_resource_id__in=other_ids, to_resource_graph=site_graph)
+            | Q(to_resource_id__in=other_ids, from_resource_graph=site_graph)
+        ).values_list("from_resource_id", "to_resource_id"):
+            site_ids.add(str(to_id) if str(from_id) in other_ids else str(from_id))
+    return sorted(site_ids)
+
+
+def update_sites(site_ids):
+    """
+    Replaces the export rows of the sites with rows from the live views. Sites
+    are recomputed one at a time, as an equality on the site lets the planner
+    push the site down into every view joined on it.
+    """
+    with connection.cursor() as cur:
+        for site_id in site_ids:
+            cur.execute("delete from %s where site_id = %%s" % EXPORT_TABLE, [site_id])
+            cur.execute(
+                "insert into %s select * from %s.v_historic_enviro_onerow_site where site_id = %%s"
+                % (EXPORT_TABLE, LIVE_SCHEMA),
+                [site_id],
+            )
+
+
+def update_export(batch_size=1000) -> int:
+    """
+    Recomputes the export rows of the sites affected by the logged changes, a
+    batch of changelog entries at a time. Returns the number of sites updated.
+    """
+    if not export_exists():
+        return 0
+    updated = 0
+    while True:
+        with transaction.atomic():
+            # Two updaters replacing the rows of the same site would both
+            # insert them, so only one runs at a time
+            with connection.cursor() as cur:
+                cur.execute(
+                    "select pg_advisory_xact_lock(hashtext(%s))", [EXPORT_TABLE]
+                )
+            changes = ExportChangelog.pop(batch_size)
+            if not changes:
+                break
+            site_ids = get_affected_sites(changes)
+            update_sites(site_ids)
+        updated += len(site_ids)
+
+    if updated:
+        logger.info("Updated the export rows of %s sites" % updated)
+    return updated
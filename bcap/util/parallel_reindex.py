@@ -0,0 +1,197 @@
+import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.db import connections
+from elasticsearch import helpers
+
+from arches.app.models import models
+from arches.app.models.resource import Resource
+from arches.app.models.system_settings import settings
+from arches.app.search.mappings import RESOURCES_INDEX
+from arches.app.search.search_engine_factory import SearchEngineFactory
+from arches.app.utils.index_database import index_resources_using_singleprocessing
+
+from bcap.models import ReindexCheckpoint
+from bcap.util.bcap_aliases import GraphSlugs
+from bcap.util.graph import get_current_graph
+from bcap.util.site_reindex import custom_search_values_enabled
+
+logger = logging.getLogger(__name__)
+
+
+def _resource_ids(graph_slug):
+    return (
+        models.ResourceInstance.objects.filter(graph=get_current_graph(graph_slug))
+        .order_by("resourceinstanceid")
+        .values_list("resourceinstanceid", flat=True)
+    )
+
+
+def create_checkpoints(run_name, graph_slug, shard_count) -> list[ReindexCheckpoint]:
+    """
+    Splits the resources of a graph into contiguous id ranges of about the
+    same size and records a checkpoint for each, unless the run already has
+    checkpoints for the graph.
+    """
+    checkpoints = list(
+        ReindexCheckpoint.objects.filter(
+            run_name=run_name, graph_slug=graph_slug
+        ).order_by("shard")
+    )
+    if checkpoints:
+        return checkpoints
+
+    resource_ids = _resource_ids(graph_slug)
+    shard_size = max(-(-resource_ids.count() // shard_count), 1)
+    lower_bound = None
+    for shard in range(shard_count):
+        last_index = (shard + 1) * shard_size - 1
+        upper_bound = (
+            next(iter(resource_ids[last_index : last_index + 1]), None)
+            if shard < shard_count - 1
+            else None
+        )
+        checkpoints.append(
+            ReindexCheckpoint(
+                run_name=run_name,
+                graph_slug=graph_slug,
+                shard=shard,
+                lower_bound=lower_bound,
+                upper_bound=upper_bound,
+            )
+        )
+        if upper_bound is None:
+            break
+        lower_bound = upper_bound
+
+    ReindexCheckpoint.objects.bulk_create(checkpoints)
+    return list(
+        ReindexCheckpoint.objects.filter(
+            run_name=run_name, graph_slug=graph_slug
+        ).order_by("shard")
+    )
+
+
+def index_shard(checkpoint_id, batch_size) -> int:
+    """
+    Indexes the resources of one shard in batches, saving the checkpoint after
+    each batch. Returns the number of resources indexed.
+    """
+    from bcap.search.arch_site_es_values import CustomSearchValue
+
+    checkpoint = ReindexCheckpoint.objects.get(pk=checkpoint_id)
+    resource_ids = _resource_ids(checkpoint.graph_slug)
+    if checkpoint.upper_bound is not None:
+        resource_ids = resource_ids.filter(
+            resourceinstanceid__lte=checkpoint.upper_bound
+        )
+    prefetch_search_values = (
+        checkpoint.graph_slug == GraphSlugs.ARCHAEOLOGICAL_SITE
+        and custom_search_values_enabled()
+    )
+    indexed = 0
+
+    while True:
+        start = checkpoint.last_resourceinstanceid or checkpoint.lower_bound
+        batch = resource_ids
+        if start is not None:
+            batch = batch.filter(resourceinstanceid__gt=start)
+        batch = [str(resourceinstanceid) for resourceinstanceid in batch[:batch_size]]
+        if not batch:
+            break
+
+        if prefetch_search_values:
+            CustomSearchValue.prefetch(batch)
+        try:
+            index_resources_using_singleprocessing(
+                resources=Resource.objects.filter(pk__in=batch),
+                batch_size=batch_size,
+                quiet=True,
+            )
+        finally:
+            CustomSearchValue.clear_prefetched()
+
+        indexed += len(batch)
+        checkpoint.last_resourceinstanceid = batch[-1]
+        checkpoint.indexed += len(batch)
+        checkpoint.save(update_fields=["last_resourceinstanceid", "indexed", "updated"])
+
+    checkpoint.completed = True
+    checkpoint.save(update_fields=["completed", "updated"])
+    logger.info(
+        "Indexed shard %s of %s (%s resources)"
+        % (checkpoint.shard, checkpoint.graph_slug, checkpoint.indexed)
+    )
+    return indexed
+
+
+def reindex_graph(run_name, graph_slug, workers, batch_size=None) -> tuple[int, float]:
+    """
+    Indexes the incomplete shards of a graph across a pool of processes.
+    Returns the number of resources indexed and the elapsed seconds.
+    """
+    batch_size = batch_size if batch_size else settings.BULK_IMPORT_BATCH_SIZE
+    pending = [
+        checkpoint.pk
+        for checkpoint in create_checkpoints(run_name, graph_slug, workers)
+        if not checkpoint.completed
+    ]
+    start = time.monotonic()
+    if not pending:
+        return 0, 0.0
+
+    # Forked workers must open their own database connections
+    connections.close_all()
+    with ProcessPoolExecutor(
+        max_workers=min(workers, len(pending)),
+        mp_context=multiprocessing.get_context("fork"),
+    ) as executor:
+        indexed = sum(executor.map(index_shard, pending, [batch_size] * len(pending)))
+
+    return indexed, time.monotonic() - start
+
+
+def get_indexed_resource_ids(graph_slug) -> set[str]:
+    se = SearchEngineFactory().create()
+    return {
+        hit["_id"]
+        for hit in helpers.scan(
+            se.es,
+            index=se._add_prefix(RESOURCES_INDEX),
+            query={
+                "query": {"term": {"graph_id": str(get_current_graph(graph_slug).pk)}}
+            },
+            _source=False,
+        )
+    }
+
+
+def delete_stale_documents(graph_slug, batch_size=None) -> int:
+    """
+    Deletes the index documents of the graph's resources that are no longer
+    in the database. A resumable reindex indexes in place rather than
+    clearing the index, so these would otherwise stay searchable. Returns the
+    number of resources deleted.
+    """
+    batch_size = batch_size if batch_size else settings.BULK_IMPORT_BATCH_SIZE
+    indexed_ids = sorted(get_indexed_resource_ids(graph_slug))
+    deleted = 0
+    for start in range(0, len(indexed_ids), batch_size):
+        batch = indexed_ids[start : start + batch_size]
+        existing_ids = {
+            str(resourceinstanceid)
+            for resourceinstanceid in models.ResourceInstance.objects.filter(
+                resourceinstanceid__in=batch
+            ).values_list("resourceinstanceid", flat=True)
+        }
+        for resourceinstanceid in batch:
+            if resourceinstanceid not in existing_ids:
+                Resource().delete_index(resourceinstanceid=resourceinstanceid)
+                deleted += 1
+    return deleted
+
+
+def clear_checkpoints(run_name):
+    ReindexCheckpoint.objects.filter(run_name=run_name).delete()
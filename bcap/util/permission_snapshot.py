@@ -0,0 +1,111 @@
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import caches
+
+from arches.app.models import models
+from arches.app.models.system_settings import settings
+
+from bcap.util.mvt_cache import get_permission_scope
+
+# Bumped when a change can affect the permissions of every user, like the
+# nodegroup permissions of a group. Each user also has a version of their own.
+GLOBAL_VERSION_KEY = "bcap_permission_snapshot_version"
+
+
+def get_permission_cache():
+    return caches[settings.PERMISSION_SNAPSHOT_CACHE_ALIAS]
+
+
+def _user_version_key(user_id) -> str:
+    return "%s:user:%s" % (GLOBAL_VERSION_KEY, user_id)
+
+
+def _bump_version(cache, key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, None)
+
+
+def invalidate_permission_snapshots(user_ids=None):
+    """
+    Invalidates the snapshots of the given users, or of every user when no
+    users are given
+    """
+    cache = get_permission_cache()
+    if user_ids is None:
+        _bump_version(cache, GLOBAL_VERSION_KEY)
+        return
+    for user_id in set(user_ids):
+        _bump_version(cache, _user_version_key(user_id))
+
+
+def _create_snapshot(user) -> dict:
+    from arches.app.views.search import get_permitted_nodegroups
+
+    if hasattr(user, "userprofile") is not True:
+        models.UserProfile.objects.create(user=user)
+    viewable_nodegroups = user.userprofile.viewable_nodegroups
+    return {
+        "permitted_nodegroups": get_permitted_nodegroups(user),
+        "viewable_nodegroups": viewable_nodegroups,
+        "mvt_scope": get_permission_scope(user, viewable_nodegroups),
+    }
+
+
+def get_permission_snapshot(user) -> dict:
+    """
+    Returns the permissions of the user that search, map tiles and exports
+    need on every request: the nodegroups they can read (as used by search
+    and by the map layers) and the scope of the map tiles they share with
+    other users.
+
+    Snapshots are cached until the permissions, groups or nodegroups they
+    were computed from change. The instance restrictions aren't part of the
+    snapshot: search still builds its instance permission filter from the
+    permission backend on each request.
+    """
+    if user.pk is None:
+        return _create_snapshot(user)
+
+    cache = get_permission_cache()
+    user_version_key = _user_version_key(user.pk)
+    versions = cache.get_many([GLOBAL_VERSION_KEY, user_version_key])
+    key = "bcap_permission_snapshot:%s:%s:%s" % (
+        user.pk,
+        versions.get(GLOBAL_VERSION_KEY, 0),
+        versions.get(user_version_key, 0),
+    )
+    snapshot = cache.get(key)
+    if snapshot is None:
+        snapshot = _create_snapshot(user)
+        cache.set(key, snapshot, settings.PERMISSION_SNAPSHOT_TIMEOUT)
+    return snapshot
+
+
+def object_permission_changed(instance):
+    """
+    Invalidates the snapshots affected by a guardian object permission. Only
+    the user's own snapshot depends on their object permissions, while a
+    group's nodegroup permissions affect all of its members. Instance
+    restrictions of a group don't change any snapshot.
+    """
+    if hasattr(instance, "user_id"):
+        invalidate_permission_snapshots([instance.user_id])
+    elif (
+        ContentType.objects.get_for_id(instance.content_type_id).model_class()
+        is not models.ResourceInstance
+    ):
+        invalidate_permission_snapshots()
+
+
+def user_groups_changed(instance, reverse, pk_set):
+    """Invalidates the snapshots of the users added to or removed from groups"""
+    if reverse:
+        # Users added to or removed from a group, or all of them when cleared
+        invalidate_permission_snapshots(
+            pk_set
+            if pk_set is not None
+            else instance.user_set.values_list("id", flat=True)
+        )
+    else:
+        invalidate_permission_snapshots([instance.pk])
@@ -1,9 +1,9 @@
 import logging
 
 from arches.app.models import models
-from arches_controlled_lists.models import ListItem, ListItemValue
 
-from bcap.util.graph import get_current_graph
+from bcap.util.controlled_list import ControlledListCache
+from bcap.util.graph import GraphRegistry
 
 logger = logging.getLogger(__name__)
 
@@ -57,28 +57,15 @@ def _extract_resource_instance_id(resource_instance_value) -> list[str]:
 
 
 def _get_node(graph_slug: str, alias: str) -> models.Node:
-    graph = get_current_graph(graph_slug)
-    return models.Node.objects.get(alias=alias, graph=graph)
-
-
-def _resolve_hierarchy(list_item_id: str) -> dict:
-    labels = []
-    item = ListItem.objects.filter(id=list_item_id).first()
-
-    while item:
-        label = (
-            ListItemValue.objects.filter(list_item=item, valuetype_id="prefLabel")
-            .values_list("value", flat=True)
-            .first()
+    node = GraphRegistry.get_node(graph_slug, alias)
+    if node is None:
+        raise models.Node.DoesNotExist(
+            "No %s node in the %s graph" % (alias, graph_slug)
         )
+    return node
 
-        if label:
-            labels.append(label)
-
-        item = item.parent
-
-    labels.reverse()
 
+def _hierarchy_to_row(labels: list[str]) -> dict:
     return {
         "class_name": labels[0] if len(labels) > 0 else None,
         "type_name": labels[1] if len(labels) > 1 else None,
@@ -151,100 +138,99 @@ def calculate_register_types(
 
 
 class RegisterTypeApi:
+    """
+    Calculates the register types of an archaeological site.
+
+    Node lookups are resolved once per process, and the register type and
+    typology controlled lists are served from ControlledListCache, so a
+    calculation only reads the site's tiles and those of its legislative acts.
+    """
+
     _la_act_section_node = None
     _legislative_act_node = None
     _register_type_list_id = None
     _typology_class_node = None
+    _typology_list_id = None
 
     def _build_reference_value(self, list_item_ids: list[str]) -> list[dict]:
         values = []
         for item_id in list_item_ids:
-            item = ListItem.objects.filter(id=item_id).first()
-
-            if not item:
-                continue
-
-            values.append(
-                {
-                    "uri": str(item.uri),
-                    "labels": [
-                        {
-                            "id": str(lv.id),
-                            "value": lv.value,
-                            "language_id": lv.language_id,
-                            "list_item_id": str(item_id),
-                            "valuetype_id": lv.valuetype_id,
-                        }
-                        for lv in ListItemValue.objects.filter(list_item=item)
-                    ],
-                    "list_id": str(item.list_id),
-                }
+            reference_value = ControlledListCache.get_reference_value(
+                self._register_type_list_id, item_id
             )
 
+            if reference_value:
+                values.append(reference_value)
+
         return values
 
     def _build_register_type_map(self) -> dict[str, str]:
-        return dict(
-            ListItemValue.objects.filter(
-                list_item__list_id=self._register_type_list_id,
-                valuetype_id="prefLabel",
-            ).values_list("value", "list_item_id")
-        )
-
-    def _get_act_sections(self, resourceinstanceid: str) -> list[str]:
-        authority_tiles = models.TileModel.objects.filter(
-            resourceinstance_id=resourceinstanceid,
-            nodegroup_id=self._legislative_act_node.nodegroup_id,
+        return ControlledListCache.get_item_ids_by_label(self._register_type_list_id)
+
+    def _get_site_tiles(self, resourceinstanceid: str) -> list[models.TileModel]:
+        return list(
+            models.TileModel.objects.filter(
+                resourceinstance_id=resourceinstanceid,
+                nodegroup_id__in=[
+                    self._typology_class_node.nodegroup_id,
+                    self._legislative_act_node.nodegroup_id,
+                ],
+            )
         )
 
+    def _get_act_sections(self, authority_tiles: list[models.TileModel]) -> list[str]:
         la_nodeid = str(self._legislative_act_node.nodeid)
         act_section_nodeid = str(self._la_act_section_node.nodeid)
         act_sections = []
 
+        la_resource_ids = []
         for tile in authority_tiles:
-            la_refs = _extract_resource_instance_id(tile.data.get(la_nodeid))
+            la_resource_ids += _extract_resource_instance_id(tile.data.get(la_nodeid))
 
-            for la_resource_id in la_refs:
-                la_tiles = models.TileModel.objects.filter(
-                    resourceinstance_id=la_resource_id,
-                    nodegroup_id=self._la_act_section_node.nodegroup_id,
-                )
+        if not la_resource_ids:
+            return act_sections
 
-                for la_tile in la_tiles:
-                    act_section_data = la_tile.data.get(act_section_nodeid)
-                    if not act_section_data:
-                        continue
+        la_tiles = {}
+        for la_tile in models.TileModel.objects.filter(
+            resourceinstance_id__in=set(la_resource_ids),
+            nodegroup_id=self._la_act_section_node.nodegroup_id,
+        ):
+            la_tiles.setdefault(str(la_tile.resourceinstance_id), []).append(la_tile)
 
-                    if isinstance(act_section_data, dict):
-                        value = act_section_data.get("en", {}).get("value", "")
-                    elif isinstance(act_section_data, str):
-                        value = act_section_data
-                    else:
-                        continue
+        # Preserve the order (and repeats) of the references on the site
+        for la_resource_id in la_resource_ids:
+            for la_tile in la_tiles.get(str(la_resource_id), []):
+                act_section_data = la_tile.data.get(act_section_nodeid)
+                if not act_section_data:
+                    continue
 
-                    if value:
-                        act_sections.append(value.strip())
+                if isinstance(act_section_data, dict):
+                    value = act_section_data.get("en", {}).get("value", "")
+                elif isinstance(act_section_data, str):
+                    value = act_section_data
+                else:
+                    continue
 
-        return act_sections
+                if value:
+                    act_sections.append(value.strip())
 
-    def _get_typology_rows(self, resourceinstanceid: str) -> list[dict]:
-        tiles = models.TileModel.objects.filter(
-            resourceinstance_id=resourceinstanceid,
-            nodegroup_id=self._typology_class_node.nodegroup_id,
-        )
+        return act_sections
 
+    def _get_typology_rows(self, typology_tiles: list[models.TileModel]) -> list[dict]:
         nodeid = str(self._typology_class_node.nodeid)
         rows = []
 
-        for tile in tiles:
+        for tile in typology_tiles:
             reference_value = tile.data.get(nodeid)
             list_item_id = _extract_list_item_id(reference_value)
 
             if not list_item_id:
                 continue
 
-            hierarchy = _resolve_hierarchy(list_item_id)
-            rows.append(hierarchy)
+            hierarchy = ControlledListCache.get_hierarchy(
+                self._typology_list_id, list_item_id
+            )
+            rows.append(_hierarchy_to_row(hierarchy))
 
         return rows
 
@@ -253,6 +239,9 @@ class RegisterTypeApi:
             self._typology_class_node = _get_node(
                 ARCHAEOLOGICAL_SITE_SLUG, "typology_class"
             )
+            self._typology_list_id = self._typology_class_node.config.get(
+                "controlledList"
+            )
             self._legislative_act_node = _get_node(
                 ARCHAEOLOGICAL_SITE_SLUG, "legislative_act"
             )
@@ -264,8 +253,21 @@ class RegisterTypeApi:
     def calculate(self, resourceinstanceid: str) -> dict:
         self._initialize()
 
-        typology_rows = self._get_typology_rows(resourceinstanceid)
-        act_sections = self._get_act_sections(resourceinstanceid)
+        tiles = self._get_site_tiles(resourceinstanceid)
+        typology_rows = self._get_typology_rows(
+            [
+                tile
+                for tile in tiles
+                if tile.nodegroup_id == self._typology_class_node.nodegroup_id
+            ]
+        )
+        act_sections = self._get_act_sections(
+            [
+                tile
+                for tile in tiles
+                if tile.nodegroup_id == self._legislative_act_node.nodegroup_id
+            ]
+        )
 
         labels = calculate_register_types(typology_rows, act_sections)
 
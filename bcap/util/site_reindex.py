@@ -0,0 +1,113 @@
+import logging
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from arches.app.models import models
+from arches.app.models.resource import Resource
+from arches.app.models.system_settings import settings
+from arches.app.utils.index_database import index_resources_using_singleprocessing
+
+from bcap.models import SiteReindexQueue
+from bcap.util.bcap_aliases import GraphSlugs
+from bcap.util.graph import GraphRegistry, get_current_graph
+
+logger = logging.getLogger(__name__)
+
+CUSTOM_SEARCH_VALUE_CLASS = "bcap.search.arch_site_es_values.CustomSearchValue"
+
+# Graphs whose data is copied into the archaeological site search document
+DEPENDENT_GRAPH_SLUGS = [GraphSlugs.SITE_VISIT, GraphSlugs.HRIA_DISCONTINUED_DATA]
+
+
+def custom_search_values_enabled() -> bool:
+    return CUSTOM_SEARCH_VALUE_CLASS in settings.ES_MAPPING_MODIFIER_CLASSES
+
+
+def _get_dependent_graphs() -> dict:
+    return {
+        "site": str(get_current_graph(GraphSlugs.ARCHAEOLOGICAL_SITE).graphid),
+        "dependent": {
+            str(get_current_graph(slug).graphid) for slug in DEPENDENT_GRAPH_SLUGS
+        },
+        "nodegroups": {
+            str(node.nodegroup_id)
+            for slug in DEPENDENT_GRAPH_SLUGS
+            for node in GraphRegistry.get_nodes(slug)
+            if node.nodegroup_id
+        },
+    }
+
+
+def queue_sites_for_tile(tile):
+    """
+    Queues the archaeological sites related to the resource of a site visit
+    or HRIA tile that was saved or deleted.
+    """
+    if not custom_search_values_enabled() or tile.resourceinstance_id is None:
+        return
+    graph_ids = _get_dependent_graphs()
+    if str(tile.nodegroup_id) not in graph_ids["nodegroups"]:
+        return
+
+    site_ids = list(
+        models.ResourceXResource.objects.filter(
+            from_resource_id=tile.resourceinstance_id,
+            to_resource_graph_id=graph_ids["site"],
+        ).values_list("to_resource_id", flat=True)
+    )
+    if site_ids:
+        SiteReindexQueue.enqueue(site_ids)
+
+
+def queue_site_for_relationship(relationship):
+    """
+    Queues the archaeological site of a relationship from a site visit or
+    HRIA record that was created or removed.
+    """
+    if not custom_search_values_enabled():
+        return
+    graph_ids = _get_dependent_graphs()
+    if (
+        str(relationship.to_resource_graph_id) == graph_ids["site"]
+        and str(relationship.from_resource_graph_id) in graph_ids["dependent"]
+    ):
+        SiteReindexQueue.enqueue([relationship.to_resource_id])
+
+
+def reindex_queued_sites(debounce_seconds=None, batch_size=None) -> int:
+    """
+    Reindexes the queued sites that haven't been queued again within the
+    debounce period, a batch at a time. Returns the number of sites indexed.
+    """
+    from bcap.search.arch_site_es_values import CustomSearchValue
+
+    debounce_seconds = (
+        debounce_seconds
+        if debounce_seconds is not None
+        else settings.SITE_REINDEX_DEBOUNCE_SECONDS
+    )
+    batch_size = batch_size if batch_size else settings.BULK_IMPORT_BATCH_SIZE
+    queued_before = timezone.now() - timedelta(seconds=debounce_seconds)
+    indexed = 0
+
+    while True:
+        with transaction.atomic():
+            resourceinstanceids = SiteReindexQueue.pop_ready(queued_before, batch_size)
+            if not resourceinstanceids:
+                break
+            CustomSearchValue.prefetch(resourceinstanceids)
+            try:
+                index_resources_using_singleprocessing(
+                    resources=Resource.objects.filter(pk__in=resourceinstanceids),
+                    batch_size=batch_size,
+                    quiet=True,
+                )
+            finally:
+                CustomSearchValue.clear_prefetched()
+        indexed += len(resourceinstanceids)
+
+    if indexed:
+        logger.info("Reindexed %s archaeological sites" % indexed)
+    return indexed
@@ -2,6 +2,10 @@ import os
 from arches.app.models import models
 from arches.app import datatypes
 
+from bcap.util.aliases.archaeological_site import ArchaeologicalSiteAliases
+from bcap.util.bcap_aliases import GraphSlugs
+from bcap.util.graph import GraphRegistry
+
 borden_number_node = None
 datatype_factory = None
 borden_number_datatype = None
@@ -15,23 +19,21 @@ def generate_filename(instance, filename):
     # print("GraphID: %s (%s)" % (instance.tile.resourceinstance.graph.graphid, type(instance.tile.resourceinstance.graph.graphid)))
     # print("Graph Slug: %s (%s)" % (instance.tile.resourceinstance.graph.slug, type(instance.tile.resourceinstance.graph.graphid)))
     # return os.sep.join(["images",str(instance.tile.resourceinstance.resourceinstanceid), f"%s__%s" % (instance.fileid, filename)])
-    if not hasattr(generate_filename, "borden_number_node"):
-        generate_filename.borden_number_node = models.Node.objects.filter(
-            alias="borden_number"
-        ).first()
-        # print("Got borden number node: %s" % str(generate_filename.borden_number_node))
+    borden_number_node = GraphRegistry.get_node(
+        GraphSlugs.ARCHAEOLOGICAL_SITE, ArchaeologicalSiteAliases.BORDEN_NUMBER
+    )
 
     if not hasattr(generate_filename, "borden_number_datatype"):
         generate_filename.borden_number_datatype = (
             datatypes.datatypes.DataTypeFactory().get_instance(
-                generate_filename.borden_number_node.datatype
+                borden_number_node.datatype
             )
         )
         # print("Got borden number datatype: %s" % str(generate_filename.borden_number_datatype))
 
     borden_number_tile = models.TileModel.objects.filter(
         resourceinstance=instance.tile.resourceinstance,
-        nodegroup=generate_filename.borden_number_node.nodegroup,
+        nodegroup_id=borden_number_node.nodegroup_id,
     ).first()
     # print("Got borden number tile: %s" % str(borden_number_tile))
     borden_number = None
@@ -39,7 +41,7 @@ def generate_filename(instance, filename):
     paths = []
     if borden_number_tile:
         borden_number = generate_filename.borden_number_datatype.get_display_value(
-            borden_number_tile, generate_filename.borden_number_node
+            borden_number_tile, borden_number_node
         )
         paths = (
             borden_number.split("-")
@@ -27,6 +27,8 @@ from bcap.util.borden_number_api import BordenNumberApi, MissingGeometryError
 from bcap.util.register_type_api import RegisterTypeApi
 from bcap.util.business_data_proxy import LegislativeActDataProxy
 from bcap.util.mvt_tiler import MVTTiler
+from bcap.util.mvt_cache import get_tile
+from bcap.util.permission_snapshot import get_permission_snapshot
 from arches.app.models.system_settings import settings
 from arches.app.search.components.base import SearchFilterFactory
 from arches.app.search.mappings import RESOURCES_INDEX
@@ -52,6 +54,9 @@ class ArchesSiteVisitSerializer(ArchesResourceSerializer):
 class BordenNumberBase:
     api = BordenNumberApi()
 
+    # Largest number of site boundaries accepted by the batch endpoint
+    max_batch_size = 500
+
     # Generate a new borden number and return it -- NB - this doesn't reserve it at this point
     def _get_impl(self, request, resourceinstanceid=None):
         try:
@@ -83,7 +88,33 @@ class BordenNumberBase:
             else "false"
         )
 
+        # Number of consecutive Borden numbers to reserve in the site's grid
+        try:
+            count = int(request.POST.get("count", 1))
+        except (TypeError, ValueError):
+            count = None
+        if count is None or not 1 <= count <= settings.BORDEN_NUMBER_MAX_RESERVE_COUNT:
+            return JSONResponse(
+                {
+                    "status": "error",
+                    "message": "count must be a whole number from 1 to %s"
+                    % settings.BORDEN_NUMBER_MAX_RESERVE_COUNT,
+                },
+                status=400,
+            )
+
         new_borden_number = self.api.get_next_borden_number(geometry=geometry)
+        if reserve == "true" and count > 1:
+            new_borden_numbers = self.api.reserve_borden_numbers(
+                re.sub("-.*", "", new_borden_number), count
+            )
+            return JSONResponse(
+                {
+                    "status": "success",
+                    "borden_number": new_borden_numbers[0],
+                    "borden_numbers": new_borden_numbers,
+                }
+            )
         if reserve == "true":
             new_borden_number = self.api.reserve_borden_number(
                 re.sub("-.*", "", new_borden_number)
@@ -94,6 +125,49 @@ class BordenNumberBase:
         return_bytes = return_data.encode("utf-8")
         return JSONResponse(return_bytes, content_type="application/json")
 
+    # Get (and optionally reserve) Borden numbers for many site boundaries at once.
+    # Expects a JSON body: {"site_boundaries": [<geojson>, ...], "reserve_borden_number": bool}
+    def _post_batch_impl(self, request):
+        try:
+            body = json.loads(request.body)
+            geometries = body["site_boundaries"]
+        except (ValueError, KeyError, TypeError):
+            return JSONResponse(
+                {"status": "error", "message": "site_boundaries is required"},
+                status=400,
+            )
+        if not isinstance(geometries, list) or not geometries:
+            return JSONResponse(
+                {"status": "error", "message": "site_boundaries must be a list"},
+                status=400,
+            )
+        if len(geometries) > self.max_batch_size:
+            return JSONResponse(
+                {
+                    "status": "error",
+                    "message": "At most %s site_boundaries may be requested at once"
+                    % self.max_batch_size,
+                },
+                status=400,
+            )
+
+        reserve = str(body.get("reserve_borden_number", False)).lower() == "true"
+        try:
+            results = self.api.get_borden_numbers_for_geometries(
+                geometries, reserve=reserve
+            )
+        except Exception as e:
+            logger.error("Unable to generate borden numbers: %s", e)
+            print_exception(e)
+            return JSONResponse(
+                {
+                    "status": "error",
+                    "message": "An unexpected error occurred. Please contact system support.",
+                },
+                status=500,
+            )
+        return JSONResponse({"status": "success", "results": results})
+
 
 @method_decorator(csrf_exempt, name="dispatch")
 class BordenNumber(APIBase, BordenNumberBase):
@@ -112,6 +186,13 @@ class BordenNumberExternal(ProtectedResourceView, BordenNumberBase):
         return self._post_impl(request)
 
 
+@method_decorator(csrf_exempt, name="dispatch")
+class BordenNumberBatchExternal(ProtectedResourceView, BordenNumberBase):
+
+    def post(self, request, *args, **kwargs):
+        return self._post_batch_impl(request)
+
+
 class ControlledListHierarchy(APIBase):
     def get(self, request, list_item_id):
         try:
@@ -150,13 +231,20 @@ class LegislativeAct(APIBase):
 
 class MVT(MVTBase):
     def get(self, request, nodeid, zoom, x, y):
-        if hasattr(request.user, "userprofile") is not True:
-            models.UserProfile.objects.create(user=request.user)
-
-        viewable_nodegroups = request.user.userprofile.viewable_nodegroups
         user = request.user
-
-        tile = MVTTiler().createTile(nodeid, viewable_nodegroups, user, zoom, x, y)
+        snapshot = get_permission_snapshot(user)
+        viewable_nodegroups = snapshot["viewable_nodegroups"]
+
+        tile = get_tile(
+            nodeid,
+            zoom,
+            x,
+            y,
+            snapshot["mvt_scope"],
+            lambda: MVTTiler().createTile(
+                nodeid, viewable_nodegroups, user, zoom, x, y
+            ),
+        )
 
         if not tile or not len(tile):
             raise Http404()
@@ -0,0 +1,120 @@
+import logging
+import time
+from contextlib import ExitStack
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+from uuid import uuid4
+
+from django.test import SimpleTestCase
+
+from bcap.datatypes.borden_number_datatype import BordenNumberDataType
+from bcap.util.borden_number_blocks import BordenNumberBlocks
+
+logger = logging.getLogger(__name__)
+
+BORDEN_NUMBER_NODE = "borden-number-node"
+ISSUANCE_DATE_NODE = "issuance-date-node"
+
+
+class BordenNumberDataTypeSaveTests(SimpleTestCase):
+    tile_count = 500
+
+    def setUp(self):
+        self.stack = ExitStack()
+        self.exists_query_count = 0
+
+        def filter_tiles(pk):
+            self.exists_query_count += 1
+            result = MagicMock()
+            result.exists.return_value = True
+            return result
+
+        self.stack.enter_context(
+            patch(
+                "bcap.datatypes.borden_number_datatype.models.Tile.objects.filter",
+                side_effect=filter_tiles,
+            )
+        )
+        self.stack.enter_context(
+            patch(
+                "bcap.datatypes.borden_number_datatype.GraphRegistry.get_nodegroup_node",
+                return_value=SimpleNamespace(nodeid=ISSUANCE_DATE_NODE),
+            )
+        )
+        self.allocate = self.stack.enter_context(
+            patch(
+                "bcap.datatypes.borden_number_datatype.BordenNumberCounter.allocate_next_borden_number"
+            )
+        )
+        self.datatype = BordenNumberDataType.__new__(BordenNumberDataType)
+
+    def tearDown(self):
+        self.stack.close()
+
+    def _tiles(self, adding, value="DhRs-1"):
+        return [
+            SimpleNamespace(
+                pk=uuid4(),
+                resourceinstance_id=uuid4(),
+                nodegroup_id="site-ng",
+                _state=SimpleNamespace(adding=adding),
+                data={BORDEN_NUMBER_NODE: value, ISSUANCE_DATE_NODE: "2024-01-01"},
+            )
+            for _ in range(self.tile_count)
+        ]
+
+    def _save_all(self, tiles):
+        start = time.perf_counter()
+        for tile in tiles:
+            self.datatype.pre_tile_save(tile, BORDEN_NUMBER_NODE)
+        return time.perf_counter() - start
+
+    def test_bulk_saves_of_existing_tiles_skip_the_existence_query(self):
+        request_elapsed = self._save_all(self._tiles(adding=True))
+        request_queries = self.exists_query_count
+
+        self.exists_query_count = 0
+        loaded_elapsed = self._save_all(self._tiles(adding=False))
+
+        logger.info(
+            "%s tile saves: %s queries in %.3fs from request data, %s in %.3fs loaded",
+            self.tile_count,
+            request_queries,
+            request_elapsed,
+            self.exists_query_count,
+            loaded_elapsed,
+        )
+
+        self.assertEqual(request_queries, self.tile_count)
+        self.assertEqual(self.exists_query_count, 0)
+        self.allocate.assert_not_called()
+
+    @patch(
+        "bcap.util.borden_number_blocks.BordenNumberCounter.allocate_borden_number_blocks"
+    )
+    def test_import_of_new_sites_takes_numbers_without_queries(self, mock_allocate):
+        mock_allocate.return_value = {
+            "DhRs": ["DhRs-%s" % seq for seq in range(7, 7 + self.tile_count)]
+        }
+        tiles = self._tiles(adding=True)
+
+        with BordenNumberBlocks.for_borden_numbers(
+            [tile.data[BORDEN_NUMBER_NODE] for tile in tiles], new_tiles=True
+        ):
+            self._save_all(tiles)
+
+        self.assertEqual(self.exists_query_count, 0)
+        self.allocate.assert_not_called()
+        self.assertEqual(tiles[0].data[BORDEN_NUMBER_NODE], "DhRs-7")
+        self.assertEqual(
+            tiles[-1].data[BORDEN_NUMBER_NODE], "DhRs-%s" % (6 + self.tile_count)
+        )
+
+    def test_empty_value_is_allocated_without_checking_the_tile(self):
+        self.allocate.return_value = "-1"
+        tile = self._tiles(adding=True, value="")[0]
+
+        self.datatype.pre_tile_save(tile, BORDEN_NUMBER_NODE)
+
+        self.assertEqual(self.exists_query_count, 0)
+        self.allocate.assert_called_once_with("")
@@ -0,0 +1,25 @@
+from unittest.mock import MagicMock
+
+
+class FakeTileQuerySet:
+    """
+    Filters a synthetic tile set the way TileModel.objects.filter(...) is used
+    by the tile bundle helpers, counting each query.
+    """
+
+    def __init__(self, tiles):
+        self.tiles = tiles
+        self.query_count = 0
+
+    def filter(self, resourceinstance_id__in, nodegroup_id__in):
+        self.query_count += 1
+        resource_ids = set(resourceinstance_id__in)
+        nodegroup_ids = {str(nodegroup_id) for nodegroup_id in nodegroup_id__in}
+        result = MagicMock()
+        result.order_by.return_value = [
+            tile
+            for tile in self.tiles
+            if tile.resourceinstance_id in resource_ids
+            and tile.nodegroup_id in nodegroup_ids
+        ]
+        return result
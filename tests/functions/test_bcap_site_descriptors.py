@@ -0,0 +1,164 @@
+from contextlib import ExitStack
+from types import SimpleNamespace
+from unittest.mock import patch
+from uuid import uuid4
+
+from django.test import SimpleTestCase
+
+from bcap.functions.bcap_site_descriptors import BCAPSiteDescriptors
+from bcap.util.aliases.archaeological_site import ArchaeologicalSiteAliases as aliases
+from tests.functions.fake_tiles import FakeTileQuerySet
+
+BORDEN_NODEGROUP = "borden-ng"
+STATUS_NODEGROUP = "status-ng"
+TYPOLOGY_NODEGROUP = "typology-ng"
+
+DESCRIPTOR_CONFIGS = {
+    "name": {"type": "name", "first_only": True, "show_name": False},
+    "description": {
+        "type": "description",
+        "first_only": False,
+        "delimiter": "<br>",
+        "show_name": True,
+    },
+    "map_popup": {
+        "type": "map_popup",
+        "first_only": False,
+        "delimiter": "<br>",
+        "show_name": True,
+    },
+}
+
+
+class _FakeDatatype:
+    def get_display_value(self, tile, node):
+        return tile.data[node.nodeid]
+
+    def to_python(self, value):
+        return [SimpleNamespace(labels=[SimpleNamespace(list_item_id=value)])]
+
+
+def _tile(resource_id, nodegroup_id, node_alias, value):
+    return SimpleNamespace(
+        tileid=str(uuid4()),
+        resourceinstance_id=resource_id,
+        nodegroup_id=nodegroup_id,
+        data={node_alias: value},
+    )
+
+
+class BCAPSiteDescriptorsTests(SimpleTestCase):
+    def setUp(self):
+        self.resource_ids = [str(uuid4()) for _ in range(4)]
+        self.tiles = []
+        for idx, resource_id in enumerate(self.resource_ids):
+            # The last site has no tiles at all
+            if idx == 3:
+                continue
+            self.tiles.append(
+                _tile(
+                    resource_id,
+                    BORDEN_NODEGROUP,
+                    aliases.BORDEN_NUMBER,
+                    "DcRu-%s" % idx,
+                )
+            )
+            self.tiles.append(
+                _tile(
+                    resource_id,
+                    STATUS_NODEGROUP,
+                    aliases.REGISTRATION_STATUS,
+                    "Registered",
+                )
+            )
+            for typology in ("Shell Midden", "Cache Pit")[: idx + 1]:
+                self.tiles.append(
+                    _tile(
+                        resource_id,
+                        TYPOLOGY_NODEGROUP,
+                        aliases.TYPOLOGY_CLASS,
+                        typology,
+                    )
+                )
+        self.tile_queryset = FakeTileQuerySet(self.tiles)
+
+        nodes = {
+            alias: SimpleNamespace(
+                nodeid=alias, name=alias.title(), nodegroup_id=nodegroup_id
+            )
+            for alias, nodegroup_id in (
+                (aliases.BORDEN_NUMBER, BORDEN_NODEGROUP),
+                (aliases.REGISTRATION_STATUS, STATUS_NODEGROUP),
+                (aliases.TYPOLOGY_CLASS, TYPOLOGY_NODEGROUP),
+            )
+        }
+
+        self.stack = ExitStack()
+        self.stack.enter_context(patch.object(BCAPSiteDescriptors, "_nodes", nodes))
+        self.stack.enter_context(
+            patch.object(
+                BCAPSiteDescriptors,
+                "_datatypes",
+                {alias: _FakeDatatype() for alias in nodes},
+            )
+        )
+        self.stack.enter_context(
+            patch.object(BCAPSiteDescriptors, "_initialized", True)
+        )
+        self.stack.enter_context(
+            patch.object(
+                BCAPSiteDescriptors,
+                "_get_typology_hierarchy",
+                new=staticmethod(
+                    lambda list_item_id: [
+                        "Habitation" if list_item_id == "Cache Pit" else "Midden"
+                    ]
+                ),
+            )
+        )
+        self.stack.enter_context(
+            patch(
+                "bcap.util.bulk_descriptors.models.TileModel",
+                new=SimpleNamespace(objects=self.tile_queryset),
+            )
+        )
+        self.descriptors = BCAPSiteDescriptors.__new__(BCAPSiteDescriptors)
+
+    def tearDown(self):
+        self.stack.close()
+
+    def test_batch_descriptors_match_per_resource_descriptors(self):
+        per_resource = {
+            resource_id: {
+                descriptor: self.descriptors.get_primary_descriptor_from_nodes(
+                    SimpleNamespace(resourceinstanceid=resource_id), config
+                )
+                for descriptor, config in DESCRIPTOR_CONFIGS.items()
+            }
+            for resource_id in self.resource_ids
+        }
+        per_resource_queries = self.tile_queryset.query_count
+
+        self.tile_queryset.query_count = 0
+        batch = self.descriptors.get_primary_descriptors_for_resources(
+            self.resource_ids, DESCRIPTOR_CONFIGS
+        )
+
+        self.assertEqual(batch, per_resource)
+        self.assertEqual(self.tile_queryset.query_count, 1)
+        self.assertEqual(
+            per_resource_queries, len(self.resource_ids) * len(DESCRIPTOR_CONFIGS)
+        )
+
+    def test_batch_descriptor_values(self):
+        batch = self.descriptors.get_primary_descriptors_for_resources(
+            self.resource_ids, DESCRIPTOR_CONFIGS
+        )
+
+        first, second, _, empty = [batch[id] for id in self.resource_ids]
+        self.assertEqual(first["name"], "DcRu-0")
+        self.assertIn("Shell Midden", first["description"])
+        self.assertIn("Cache Pit, Shell Midden", second["map_popup"])
+        self.assertIn("Habitation, Midden", second["map_popup"])
+        self.assertEqual(empty["name"], BCAPSiteDescriptors._empty_name_value)
+        self.assertEqual(empty["description"], "")
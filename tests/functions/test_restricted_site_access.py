@@ -0,0 +1,72 @@
+from contextlib import ExitStack
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from django.test import SimpleTestCase
+
+from bcap.functions.restricted_site_access import RestrictedSiteAccess
+
+SITE = "7d0e9a52-0000-4000-8000-000000000001"
+STATUS_NODEGROUP = "0684fec8-0d07-11ed-8804-5254008afee6"
+OTHER_NODEGROUP = "0684fec8-0d07-11ed-8804-000000000000"
+
+
+class RestrictedSiteAccessTests(SimpleTestCase):
+    def setUp(self):
+        self.stack = ExitStack()
+        self.proxy = MagicMock()
+        self.proxy.get_public_status_nodegroup_ids.return_value = {STATUS_NODEGROUP}
+        self.proxy.get_public_site_ids.return_value = set()
+        for name, value in (
+            ("get_site_proxy", self.proxy),
+            ("get_guest_group", "guest"),
+            ("get_anonymous_user", "anonymous"),
+        ):
+            self.stack.enter_context(
+                patch.object(RestrictedSiteAccess, name, return_value=value)
+            )
+        self.restriction_count = self.stack.enter_context(
+            patch.object(RestrictedSiteAccess, "get_restriction_count")
+        )
+        self.assign_perm = self.stack.enter_context(
+            patch("bcap.functions.restricted_site_access.assign_perm")
+        )
+        self.remove_perm = self.stack.enter_context(
+            patch("bcap.functions.restricted_site_access.remove_perm")
+        )
+
+    def tearDown(self):
+        self.stack.close()
+
+    def _post_save(self, nodegroup_id):
+        tile = SimpleNamespace(
+            nodegroup_id=nodegroup_id,
+            resourceinstance=SimpleNamespace(resourceinstanceid=SITE),
+        )
+        RestrictedSiteAccess().post_save(tile, None, None)
+
+    def test_unrelated_tile_on_restricted_site_is_ignored(self):
+        self.restriction_count.return_value = 2
+
+        self._post_save(OTHER_NODEGROUP)
+
+        self.proxy.get_public_site_ids.assert_not_called()
+        self.assign_perm.assert_not_called()
+        self.remove_perm.assert_not_called()
+
+    def test_permissions_are_only_written_on_a_transition(self):
+        self.restriction_count.return_value = 2
+        self._post_save(STATUS_NODEGROUP)
+        self.assign_perm.assert_not_called()
+
+        self.proxy.get_public_site_ids.return_value = {SITE}
+        self._post_save(STATUS_NODEGROUP)
+        self.assertEqual(self.remove_perm.call_count, 2)
+
+    def test_new_site_is_restricted_from_any_tile(self):
+        self.restriction_count.return_value = 0
+
+        self._post_save(OTHER_NODEGROUP)
+
+        self.proxy.get_public_site_ids.assert_called_once_with([SITE])
+        self.assertEqual(self.assign_perm.call_count, 2)
@@ -0,0 +1,166 @@
+import logging
+import time
+from contextlib import ExitStack
+from types import SimpleNamespace
+from unittest.mock import patch
+from uuid import uuid4
+
+from django.test import SimpleTestCase
+
+from bcap.functions.site_visit_descriptors import (
+    AbstractDescriptors,
+    SiteVisitDescriptors,
+)
+from bcap.util.aliases.site_visit import SiteVisitAliases as aliases
+from bcap.util.bulk_descriptors import clear_shared_tile_bundle
+from tests.functions.fake_tiles import FakeTileQuerySet
+
+logger = logging.getLogger(__name__)
+
+PERMIT_NODEGROUP = "permit-ng"
+VISIT_TYPE_NODEGROUP = "visit-type-ng"
+
+
+class SiteVisitDescriptorsBenchmark(SimpleTestCase):
+    site_visit_count = 500
+
+    def setUp(self):
+        self.resource_ids = [str(uuid4()) for _ in range(self.site_visit_count)]
+        self.tiles = []
+        for idx, resource_id in enumerate(self.resource_ids):
+            self.tiles.append(
+                SimpleNamespace(
+                    tileid=str(uuid4()),
+                    resourceinstance_id=resource_id,
+                    nodegroup_id=PERMIT_NODEGROUP,
+                    data={
+                        aliases.ASSOCIATED_PERMIT: "2024-%04d" % idx,
+                        aliases.LAST_DATE_OF_SITE_VISIT: "2024-05-01",
+                        aliases.AFFILIATION: "Consultant",
+                    },
+                )
+            )
+            self.tiles.append(
+                SimpleNamespace(
+                    tileid=str(uuid4()),
+                    resourceinstance_id=resource_id,
+                    nodegroup_id=VISIT_TYPE_NODEGROUP,
+                    data={aliases.SITE_VISIT_TYPE: "Inventory"},
+                )
+            )
+        self.tile_queryset = FakeTileQuerySet(self.tiles)
+
+        nodes = {
+            aliases.ASSOCIATED_PERMIT: SimpleNamespace(nodegroup_id=PERMIT_NODEGROUP),
+            aliases.LAST_DATE_OF_SITE_VISIT: SimpleNamespace(
+                nodegroup_id=PERMIT_NODEGROUP
+            ),
+            aliases.AFFILIATION: SimpleNamespace(nodegroup_id=PERMIT_NODEGROUP),
+            aliases.SITE_VISIT_TYPE: SimpleNamespace(nodegroup_id=VISIT_TYPE_NODEGROUP),
+        }
+
+        self.stack = ExitStack()
+        self.stack.enter_context(patch.object(AbstractDescriptors, "_nodes", nodes))
+        self.stack.enter_context(
+            patch(
+                "bcap.util.bulk_descriptors.models.TileModel",
+                new=SimpleNamespace(objects=self.tile_queryset),
+            )
+        )
+        self.stack.enter_context(
+            patch.object(
+                AbstractDescriptors,
+                "_get_value_from_node",
+                new=staticmethod(
+                    lambda node_alias, resourceinstanceid=None, data_tile=None: (
+                        data_tile.data.get(node_alias) if data_tile else None
+                    )
+                ),
+            )
+        )
+        self.stack.enter_context(
+            patch.object(
+                AbstractDescriptors,
+                "get_values_in_order",
+                new=lambda self, aliases, resource, config, tile_data: ", ".join(
+                    tile.data.get(alias)
+                    for tile in tile_data
+                    for alias in aliases
+                    if tile.data.get(alias)
+                ),
+                create=True,
+            )
+        )
+        self.descriptors = SiteVisitDescriptors.__new__(SiteVisitDescriptors)
+        clear_shared_tile_bundle()
+
+    def tearDown(self):
+        self.stack.close()
+        clear_shared_tile_bundle()
+
+    def _describe_all(self):
+        return {
+            resource_id: (
+                self.descriptors.get_name_descriptor(resource_id, {}, None),
+                self.descriptors.get_search_card_descriptor(resource_id, {}, None),
+            )
+            for resource_id in self.resource_ids
+        }
+
+    def test_prefetched_descriptors_use_one_tile_query(self):
+        start = time.perf_counter()
+        per_resource = self._describe_all()
+        per_resource_elapsed = time.perf_counter() - start
+        per_resource_queries = self.tile_queryset.query_count
+
+        self.tile_queryset.query_count = 0
+        start = time.perf_counter()
+        with SiteVisitDescriptors.prefetched_tiles(self.resource_ids):
+            prefetched = self._describe_all()
+        prefetched_elapsed = time.perf_counter() - start
+
+        logger.info(
+            "%s site visits: %s queries in %.3fs per resource, %s query in %.3fs prefetched",
+            self.site_visit_count,
+            per_resource_queries,
+            per_resource_elapsed,
+            self.tile_queryset.query_count,
+            prefetched_elapsed,
+        )
+
+        self.assertEqual(per_resource_queries, self.site_visit_count)
+        self.assertEqual(self.tile_queryset.query_count, 1)
+        self.assertEqual(prefetched, per_resource)
+        self.assertEqual(
+            prefetched[self.resource_ids[0]],
+            ("2024-0000 - 2024/05/01 - Consultant", "Inventory"),
+        )
+
+    def test_site_visit_without_permit_tile(self):
+        self.tiles[:] = [
+            tile for tile in self.tiles if tile.nodegroup_id != PERMIT_NODEGROUP
+        ]
+
+        with SiteVisitDescriptors.prefetched_tiles(self.resource_ids):
+            name = self.descriptors.get_name_descriptor(self.resource_ids[0], {}, None)
+
+        self.assertEqual(name, SiteVisitDescriptors.NON_PERMITTED_STRING)
+
+    def test_recalculated_descriptor_refetches_the_bundle(self):
+        resource_id = self.resource_ids[0]
+        self.descriptors.get_name_descriptor(resource_id, {}, None)
+        self.tiles[0].data[aliases.ASSOCIATED_PERMIT] = "2025-0001"
+
+        name = self.descriptors.get_name_descriptor(resource_id, {}, None)
+
+        self.assertEqual(self.tile_queryset.query_count, 2)
+        self.assertEqual(name, "2025-0001 - 2024/05/01 - Consultant")
+
+    def test_tile_change_drops_the_shared_bundle(self):
+        resource_id = self.resource_ids[0]
+        self.descriptors.get_name_descriptor(resource_id, {}, None)
+
+        clear_shared_tile_bundle(resource_id)
+        self.descriptors.get_search_card_descriptor(resource_id, {}, None)
+
+        self.assertEqual(self.tile_queryset.query_count, 2)
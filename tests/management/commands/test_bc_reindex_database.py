@@ -0,0 +1,123 @@
+import subprocess
+from unittest.mock import patch
+
+from django.core.management.base import CommandError
+from django.test import SimpleTestCase
+
+from bcap.management.commands.bc_reindex_database import BaseCommand, Command
+
+
+@patch("bcap.management.commands.bc_reindex_database.get_current_graph")
+@patch("bcap.management.commands.bc_reindex_database.index_resources_by_type")
+@patch.object(Command, "recalculate_descriptors")
+@patch.object(BaseCommand, "handle", autospec=True)
+class BatchDescriptorsTests(SimpleTestCase):
+    def setUp(self):
+        self.index_orders = []
+
+    def _record_index_order(self, command, *args, **options):
+        self.index_orders.append(command.get_index_order())
+
+    def test_batch_graphs_are_indexed_without_recalculating(
+        self, mock_handle, mock_recalculate, mock_index, mock_graph
+    ):
+        mock_handle.side_effect = self._record_index_order
+
+        Command().handle(batch_descriptors=True, recalculate_descriptors=True)
+
+        self.assertEqual(mock_recalculate.call_count, 2)
+        [index_order] = self.index_orders
+        self.assertNotIn("archaeological_site", index_order)
+        self.assertNotIn("site_visit", index_order)
+        self.assertEqual(mock_index.call_count, 2)
+        for call in mock_index.call_args_list:
+            self.assertFalse(call.kwargs["recalculate_descriptors"])
+
+    def test_graphs_outside_the_batch_still_recalculate_descriptors(
+        self, mock_handle, mock_recalculate, mock_index, mock_graph
+    ):
+        mock_handle.side_effect = self._record_index_order
+        command = Command()
+
+        command.handle(batch_descriptors=True, recalculate_descriptors=True)
+
+        [index_order] = self.index_orders
+        self.assertIn("legislative_act", index_order)
+        self.assertTrue(mock_handle.call_args.kwargs["recalculate_descriptors"])
+        # The whole order is restored once the base reindex is done
+        self.assertIn("archaeological_site", command.get_index_order())
+
+    def test_descriptors_are_recalculated_per_resource_by_default(
+        self, mock_handle, mock_recalculate, mock_index, mock_graph
+    ):
+        Command().handle(recalculate_descriptors=True)
+
+        mock_recalculate.assert_not_called()
+        mock_index.assert_not_called()
+        self.assertTrue(mock_handle.call_args.kwargs["recalculate_descriptors"])
+
+
+class BlueGreenTests(SimpleTestCase):
+    def test_build_args_are_built_from_the_options(self):
+        command = Command()
+        options = vars(
+            command.create_parser("manage.py", "bc_reindex_database").parse_args(
+                ["--blue-green", "--keep-previous", "--resumable", "--workers", "3"]
+            )
+        )
+
+        build_args = command.get_build_args(options)
+
+        self.assertEqual(
+            build_args, ["--resumable", "--workers", "3", "--blue-green-build"]
+        )
+
+    @patch("bcap.management.commands.bc_reindex_database.index_recorded_changes")
+    @patch("bcap.management.commands.bc_reindex_database.subprocess.run")
+    @patch("bcap.management.commands.bc_reindex_database.BlueGreenIndexBuild")
+    def test_changes_are_recorded_until_the_swap(
+        self, mock_build, mock_run, mock_index_changes
+    ):
+        build = mock_build.return_value
+        build.swap.return_value = []
+        mock_index_changes.return_value = 2
+
+        Command().handle(blue_green=True, keep_previous=False, workers=1)
+
+        build.start_recording_changes.assert_called_once_with()
+        self.assertEqual(mock_run.call_args.args[0][-1], "--blue-green-build")
+        self.assertEqual(
+            mock_run.call_args.kwargs["env"]["ES_INDEX_VERSION"], build.version
+        )
+        build.swap.assert_called_once_with(False)
+        build.stop_recording_changes.assert_called_once_with()
+        mock_index_changes.assert_called_once_with()
+
+    @patch("bcap.management.commands.bc_reindex_database.index_recorded_changes")
+    @patch(
+        "bcap.management.commands.bc_reindex_database.subprocess.run",
+        side_effect=subprocess.CalledProcessError(1, "bc_reindex_database"),
+    )
+    @patch("bcap.management.commands.bc_reindex_database.BlueGreenIndexBuild")
+    def test_failed_build_is_discarded(self, mock_build, _run, mock_index_changes):
+        build = mock_build.return_value
+
+        with self.assertRaises(CommandError):
+            Command().handle(blue_green=True, keep_previous=False)
+
+        build.discard.assert_called_once_with()
+        build.swap.assert_not_called()
+        build.stop_recording_changes.assert_called_once_with()
+        mock_index_changes.assert_not_called()
+
+    @patch("bcap.management.commands.bc_reindex_database.index_recorded_changes")
+    @patch.object(Command, "reindex")
+    def test_build_subprocess_indexes_the_recorded_changes(
+        self, mock_reindex, mock_index_changes
+    ):
+        mock_index_changes.return_value = 0
+
+        Command().handle(blue_green_build=True)
+
+        mock_reindex.assert_called_once_with(blue_green_build=True)
+        mock_index_changes.assert_called_once_with()
@@ -0,0 +1,57 @@
+from unittest.mock import patch
+
+from django.core.management.base import CommandError
+from django.test import SimpleTestCase
+
+from bcap.management.commands.reset_permissions import Command
+
+
+def _result(changed, failed=0):
+    return {
+        "resources": 10,
+        "restricted": 10,
+        "add": set(),
+        "remove": {},
+        "changed": changed,
+        "shards": 2,
+        "done": 2 - failed,
+        "failed": failed,
+        "duration": 1,
+    }
+
+
+@patch("bcap.management.commands.reset_permissions.HeritageSitePermissionManager")
+@patch("bcap.management.commands.reset_permissions.AdminOnlyPermissionManager")
+@patch.object(Command, "_reindex")
+@patch("bcap.management.commands.reset_permissions.reset_permissions_in_parallel")
+class ResetPermissionsCommandTests(SimpleTestCase):
+    def _handle(self, **options):
+        Command().handle(
+            slugs=None,
+            clear_existing=False,
+            batch_size=1000,
+            workers=4,
+            shard_size=10000,
+            verbosity=0,
+            **options,
+        )
+
+    def test_written_shards_are_reindexed_before_a_failure_is_raised(
+        self, mock_reset, mock_reindex, _admin, _site
+    ):
+        mock_reset.return_value = {
+            "lg_person": _result({"2", "1"}, failed=1),
+            "heritage_site": _result({"3"}),
+        }
+
+        with self.assertRaises(CommandError):
+            self._handle(dry_run=False)
+
+        mock_reindex.assert_called_once_with(["1", "2", "3"])
+
+    def test_dry_run_reindexes_nothing(self, mock_reset, mock_reindex, _admin, _site):
+        mock_reset.return_value = {"lg_person": _result({"1"})}
+
+        self._handle(dry_run=True)
+
+        mock_reindex.assert_not_called()
@@ -0,0 +1,49 @@
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from django.test import SimpleTestCase, override_settings
+
+from bcap.search_components.standard_search_view import StandardSearchView
+
+
+def _results(value, relation="eq"):
+    return {"hits": {"hits": [], "total": {"value": value, "relation": relation}}}
+
+
+@patch(
+    "bcap.search_components.standard_search_view.user_is_resource_reviewer",
+    return_value=False,
+)
+class StandardSearchViewTests(SimpleTestCase):
+    def setUp(self):
+        self.view = StandardSearchView.__new__(StandardSearchView)
+        self.view.request = SimpleNamespace(user=SimpleNamespace(id=1), GET={})
+
+    def test_total_comes_from_the_main_query(self, _reviewer):
+        dsl = MagicMock()
+        response_object = {"results": _results(1234)}
+
+        self.view.post_search_hook({"query": dsl}, response_object)
+
+        dsl.count.assert_not_called()
+        self.assertEqual(response_object["total_results"], 1234)
+        self.assertFalse(response_object["total_results_approximate"])
+
+    def test_capped_totals_are_approximate(self, _reviewer):
+        response_object = {"results": _results(10000, relation="gte")}
+
+        self.view.post_search_hook({"query": MagicMock()}, response_object)
+
+        self.assertEqual(response_object["total_results"], 10000)
+        self.assertTrue(response_object["total_results_approximate"])
+
+    @override_settings(SEARCH_TRACK_TOTAL_HITS=50000)
+    def test_main_query_tracks_total_hits(self, _reviewer):
+        dsl = MagicMock(dsl={})
+        dsl.search.return_value = _results(3)
+        response_object = {}
+
+        self.view.execute_query({"query": dsl}, response_object)
+
+        self.assertEqual(dsl.dsl["track_total_hits"], 50000)
+        self.assertEqual(response_object["results"]["hits"]["total"]["value"], 3)
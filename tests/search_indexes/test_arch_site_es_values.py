@@ -0,0 +1,93 @@
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from django.test import SimpleTestCase
+
+from bcap.search.arch_site_es_values import CustomSearchValue
+from bcap.util.aliases.site_visit import SiteVisitAliases as sva
+from bcap.util.bcap_aliases import GraphSlugs
+
+
+def _related_resource_ids(resourceinstanceids, graph_slugs):
+    return {
+        str(rid): {
+            GraphSlugs.HRIA_DISCONTINUED_DATA: [],
+            GraphSlugs.SITE_VISIT: ["visit-%s" % rid],
+        }
+        for rid in resourceinstanceids
+    }
+
+
+@patch.object(CustomSearchValue, "custom_search_path", "custom_values", create=True)
+class CustomSearchValueBatchTests(SimpleTestCase):
+    def setUp(self):
+        CustomSearchValue.clear_prefetched()
+        self.patches = [
+            patch.object(CustomSearchValue, "initialized", True),
+            patch.object(CustomSearchValue, "arch_site_proxy", MagicMock()),
+            patch.object(CustomSearchValue, "site_visit_proxy", MagicMock()),
+            patch.object(CustomSearchValue, "hria_discontinued_proxy", MagicMock()),
+        ]
+        for p in self.patches:
+            p.start()
+        CustomSearchValue.arch_site_proxy.get_related_resource_ids.side_effect = (
+            _related_resource_ids
+        )
+        CustomSearchValue.site_visit_proxy.get_nodegroup_ids.return_value = {"ng"}
+        CustomSearchValue.hria_discontinued_proxy.get_nodegroup_ids.return_value = set()
+        CustomSearchValue.site_visit_proxy.get_value_from_node.side_effect = (
+            lambda attribute, tile_bundle: (
+                "2024-0001" if attribute == sva.ASSOCIATED_PERMIT else None
+            )
+        )
+
+    def tearDown(self):
+        for p in self.patches:
+            p.stop()
+        CustomSearchValue.clear_prefetched()
+
+    def _index(self, resourceinstanceid):
+        document = {}
+        CustomSearchValue.add_search_terms(
+            SimpleNamespace(
+                resourceinstanceid=resourceinstanceid,
+                graph=SimpleNamespace(slug=GraphSlugs.ARCHAEOLOGICAL_SITE),
+            ),
+            document,
+            [],
+        )
+        return document
+
+    @patch("bcap.search.arch_site_es_values.get_tile_bundles")
+    def test_registered_sites_are_enriched_once_per_batch(self, mock_bundles):
+        mock_bundles.side_effect = lambda ids, nodegroup_ids: {rid: {} for rid in ids}
+        site_ids = ["site-%s" % idx for idx in range(5)]
+        CustomSearchValue.register_batches(site_ids, 2)
+
+        documents = [self._index(site_id) for site_id in site_ids]
+
+        self.assertEqual(
+            CustomSearchValue.arch_site_proxy.get_related_resource_ids.call_count, 3
+        )
+        self.assertEqual(mock_bundles.call_count, 3)
+        for document in documents:
+            self.assertEqual(
+                document["custom_values"],
+                [{"custom_value": "%s:2024-0001" % sva.ASSOCIATED_PERMIT}],
+            )
+
+    @patch("bcap.search.arch_site_es_values.get_tile_bundles")
+    def test_unregistered_site_is_enriched_on_its_own(self, mock_bundles):
+        mock_bundles.side_effect = lambda ids, nodegroup_ids: {rid: {} for rid in ids}
+
+        self._index("site-1")
+        self._index("site-1")
+
+        # values are consumed by the first index so later edits are recalculated
+        CustomSearchValue.arch_site_proxy.get_related_resource_ids.assert_called_with(
+            ("site-1",),
+            [GraphSlugs.HRIA_DISCONTINUED_DATA, GraphSlugs.SITE_VISIT],
+        )
+        self.assertEqual(
+            CustomSearchValue.arch_site_proxy.get_related_resource_ids.call_count, 2
+        )
@@ -0,0 +1,5 @@
+# The test settings use a dummy cache, which never returns anything, so tests
+# of cached code override CACHES with this
+LOCMEM_CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+}
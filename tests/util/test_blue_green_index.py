@@ -0,0 +1,77 @@
+from unittest.mock import MagicMock, patch
+
+from django.test import SimpleTestCase
+
+from bcap.util.blue_green_index import BlueGreenIndexBuild, index_recorded_changes
+
+
+class BlueGreenIndexBuildTests(SimpleTestCase):
+    def setUp(self):
+        self.es = MagicMock()
+        self.build = BlueGreenIndexBuild(version="2", es=self.es)
+        self.live = "%s_resources" % self.build.live_prefix
+        self.built = "%s_v2_resources" % self.build.live_prefix
+
+    def test_live_name_strips_the_version(self):
+        self.assertEqual(self.build.live_name(self.built), self.live)
+
+    def test_first_swap_replaces_the_concrete_index(self):
+        self.es.indices.exists_alias.return_value = False
+        self.es.indices.exists.return_value = True
+
+        actions, previous = self.build.get_alias_actions([self.built])
+
+        self.assertEqual(
+            actions,
+            [
+                {"remove_index": {"index": self.live}},
+                {"add": {"index": self.built, "alias": self.live}},
+            ],
+        )
+        self.assertEqual(previous, [])
+
+    def test_later_swaps_move_the_alias_and_delete_the_previous_version(self):
+        previous_index = "%s_v1_resources" % self.build.live_prefix
+        self.es.indices.get.return_value = {self.built: {}}
+        self.es.indices.exists_alias.return_value = True
+        self.es.indices.get_alias.return_value = {previous_index: {}}
+        self.es.indices.get_settings.return_value = {
+            previous_index: {"settings": {"index": {"number_of_replicas": "2"}}}
+        }
+
+        self.build.swap()
+
+        self.es.indices.put_settings.assert_called_once_with(
+            index=self.built,
+            settings={"index": {"refresh_interval": None, "number_of_replicas": "2"}},
+        )
+        self.es.indices.update_aliases.assert_called_once_with(
+            actions=[
+                {"remove": {"index": previous_index, "alias": self.live}},
+                {"add": {"index": self.built, "alias": self.live}},
+            ]
+        )
+        self.es.indices.delete.assert_called_once_with(index=previous_index)
+
+
+@patch("bcap.util.blue_green_index.transaction", MagicMock())
+@patch("bcap.util.blue_green_index.index_resources_using_singleprocessing")
+@patch("bcap.util.blue_green_index.Resource")
+@patch("bcap.util.blue_green_index.models")
+@patch("bcap.util.blue_green_index.IndexBuildChange")
+class IndexRecordedChangesTests(SimpleTestCase):
+    def test_changed_resources_are_indexed_and_deleted_ones_removed(
+        self, mock_changes, mock_models, mock_resource, mock_index
+    ):
+        mock_changes.pop.side_effect = [["site-1", "deleted-site"], ["site-2"], []]
+        mock_models.ResourceInstance.objects.filter.return_value.values_list.side_effect = [
+            ["site-1"],
+            ["site-2"],
+        ]
+
+        self.assertEqual(index_recorded_changes(batch_size=2), 3)
+
+        self.assertEqual(mock_index.call_count, 2)
+        mock_resource.objects.filter.assert_any_call(pk__in={"site-1"})
+        mock_resource.assert_called_once_with(resourceinstanceid="deleted-site")
+        mock_resource.return_value.delete_index.assert_called_once_with()
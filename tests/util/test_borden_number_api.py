@@ -7,6 +7,7 @@ from contextlib import ExitStack
 from types import SimpleNamespace
 from unittest.mock import MagicMock, patch
 
+from django.core.cache import cache
 from django.db import close_old_connections, connection, connections
 from django.test import TestCase, TransactionTestCase, override_settings
 
@@ -14,6 +15,7 @@ from bcap.util.borden_number_api import (
     BordenNumberApi,
     MissingGeometryError,
 )
+from tests.util.caches import LOCMEM_CACHES
 
 
 class _FakePoint:
@@ -44,6 +46,7 @@ class _FakePoint:
 @override_settings(ROOT_URLCONF="bcap.tests.test_urls")
 class BordenNumberApiTests(TestCase):
     def setUp(self):
+        cache.clear()
         self.api = BordenNumberApi()
 
         # Fake Arches ORM accessors
@@ -116,6 +119,13 @@ class BordenNumberApiTests(TestCase):
             patch("bcap.util.borden_number_api.models.TileModel", new=tile_model)
         )
 
+        stack.enter_context(
+            patch(
+                "bcap.util.borden_number_api.GraphRegistry.get_node",
+                return_value=self.geom_node,
+            )
+        )
+
         # DataTypeFactory returns our mock factory
         dtf_patch = stack.enter_context(
             patch(
@@ -131,7 +141,8 @@ class BordenNumberApiTests(TestCase):
         # Point class
         stack.enter_context(patch("bcap.util.borden_number_api.Point", new=_FakePoint))
 
-        # HTTP managers
+        # HTTP managers, with no shared client created yet
+        stack.enter_context(patch("bcap.util.borden_number_api._http_client", None))
         pool_mgr_cls = stack.enter_context(
             patch("bcap.util.borden_number_api.urllib3.PoolManager")
         )
@@ -139,6 +150,14 @@ class BordenNumberApiTests(TestCase):
             patch("bcap.util.borden_number_api.urllib3.ProxyManager")
         )
 
+        # Local grid lookup; empty unless a test loads it, so the WFS is used
+        local_grid = stack.enter_context(
+            patch(
+                "bcap.util.borden_number_api.BordenGrid.get_borden_grid_for_point",
+                return_value=None,
+            )
+        )
+
         # Counter
         counter_cls = stack.enter_context(
             patch("bcap.util.borden_number_api.BordenNumberCounter")
@@ -150,6 +169,7 @@ class BordenNumberApiTests(TestCase):
             "pool_mgr_cls": pool_mgr_cls,
             "proxy_mgr_cls": proxy_mgr_cls,
             "counter_cls": counter_cls,
+            "local_grid": local_grid,
         }
 
     def test_get_next_borden_number_with_resourceinstanceid_calls_peek(self):
@@ -206,6 +226,24 @@ class BordenNumberApiTests(TestCase):
             )
             p["proxy_mgr_cls"].assert_not_called()
 
+    def test_local_borden_grid_is_used_without_wfs_request(self):
+        with ExitStack() as stack:
+            p = self._enter_patches(stack)
+
+            geometry = {"type": "Point", "coordinates": [-123.2, 49.2]}
+            p["geo_utils_cls"].return_value.get_centroid.return_value = self.centroid
+            p["local_grid"].return_value = "DhRs"
+            p["counter_cls"].peek_next_borden_number.return_value = "DhRs-004"
+
+            result = self.api.get_next_borden_number(geometry=geometry)
+            self.assertEqual(result, "DhRs-004")
+
+            point = p["local_grid"].call_args.args[0]
+            self.assertEqual((point.x, point.y, point.srid), (100.0, 200.0, 3005))
+            p["counter_cls"].peek_next_borden_number.assert_called_once_with("DhRs")
+            p["pool_mgr_cls"].assert_not_called()
+            p["proxy_mgr_cls"].assert_not_called()
+
     def test_get_next_borden_number_raises_when_missing_params(self):
         with ExitStack() as stack:
             self._enter_patches(stack)
@@ -243,9 +281,93 @@ class BordenNumberApiTests(TestCase):
             self.assertEqual(result, "EhRa-003")
 
             # Ensure proxy used; direct pool unused
-            p["proxy_mgr_cls"].assert_called_once_with("http://proxy.local:8080")
+            p["proxy_mgr_cls"].assert_called_once()
+            self.assertEqual(
+                p["proxy_mgr_cls"].call_args.args[0], "http://proxy.local:8080"
+            )
             p["pool_mgr_cls"].assert_not_called()
 
+    @override_settings(CACHES=LOCMEM_CACHES)
+    def test_remote_lookups_reuse_the_pool_and_cache_nearby_points(self):
+        with ExitStack() as stack:
+            p = self._enter_patches(stack)
+
+            geometry = {"type": "Point", "coordinates": [-123.2, 49.2]}
+            p["geo_utils_cls"].return_value.get_centroid.return_value = self.centroid
+
+            pool = MagicMock()
+            pool.request.return_value = self.mock_http_resp
+            p["pool_mgr_cls"].return_value = pool
+            p["counter_cls"].peek_next_borden_number.return_value = "EhRa-005"
+
+            for _ in range(3):
+                self.api.get_next_borden_number(geometry=geometry)
+            BordenNumberApi().get_next_borden_number(geometry=geometry)
+
+            p["pool_mgr_cls"].assert_called_once()
+            pool.request.assert_called_once()
+            self.assertEqual(p["counter_cls"].peek_next_borden_number.call_count, 4)
+
+    def test_batch_numbers_resolve_grids_together_and_number_in_order(self):
+        with ExitStack() as stack:
+            p = self._enter_patches(stack)
+            local_grids = stack.enter_context(
+                patch(
+                    "bcap.util.borden_number_api.BordenGrid.get_borden_grids_for_points",
+                    return_value=["DhRs", None, "DhRs"],
+                )
+            )
+
+            geometry = {"type": "Point", "coordinates": [-123.2, 49.2]}
+            p["geo_utils_cls"].return_value.get_centroid.return_value = self.centroid
+            pool = MagicMock()
+            pool.request.return_value = self.mock_http_resp
+            p["pool_mgr_cls"].return_value = pool
+            p["counter_cls"].get_grid_sequences.return_value = {"DhRs": 3, "EhRa": 0}
+
+            results = self.api.get_borden_numbers_for_geometries([geometry] * 3)
+
+            self.assertEqual(
+                results,
+                [
+                    {"borden_number": "DhRs-4"},
+                    {"borden_number": "EhRa-1"},
+                    {"borden_number": "DhRs-5"},
+                ],
+            )
+            local_grids.assert_called_once()
+            self.assertEqual(len(local_grids.call_args.args[0]), 3)
+            # Only the point outside the local grid goes to the WFS
+            pool.request.assert_called_once()
+            p["counter_cls"].allocate_borden_number_blocks.assert_not_called()
+
+    def test_batch_reserve_allocates_one_block_per_grid(self):
+        with ExitStack() as stack:
+            p = self._enter_patches(stack)
+            stack.enter_context(
+                patch(
+                    "bcap.util.borden_number_api.BordenGrid.get_borden_grids_for_points",
+                    return_value=["DhRs", "DhRs"],
+                )
+            )
+
+            geometry = {"type": "Point", "coordinates": [-123.2, 49.2]}
+            p["geo_utils_cls"].return_value.get_centroid.return_value = self.centroid
+            p["counter_cls"].allocate_borden_number_blocks.return_value = {
+                "DhRs": ["DhRs-7", "DhRs-8"]
+            }
+
+            results = self.api.get_borden_numbers_for_geometries(
+                [geometry] * 2, reserve=True
+            )
+
+            self.assertEqual(
+                results, [{"borden_number": "DhRs-7"}, {"borden_number": "DhRs-8"}]
+            )
+            p["counter_cls"].allocate_borden_number_blocks.assert_called_once_with(
+                {"DhRs": 2}
+            )
+
 
 class BordenNumberApiReserveDbTests(TransactionTestCase):
     """
@@ -314,3 +436,44 @@ class BordenNumberApiReserveDbTests(TransactionTestCase):
         # Stronger property: because we reset to empty, sequences should be 1..n_calls.
         seqs = sorted(self._seq_from_borden_number(r) for r in results)
         self.assertEqual(seqs, list(range(1, n_calls + 1)))
+
+    def test_reserve_borden_numbers_allocates_contiguous_blocks(self):
+        borden_grid = self._fake_grid()
+        self._reset_grid(borden_grid)
+
+        first = BordenNumberApi.reserve_borden_numbers(borden_grid, 3)
+        single = BordenNumberApi.reserve_borden_number(borden_grid)
+        second = BordenNumberApi.reserve_borden_numbers(borden_grid, 2)
+
+        self.assertEqual(
+            [self._seq_from_borden_number(n) for n in first + [single] + second],
+            [1, 2, 3, 4, 5, 6],
+        )
+
+    def test_concurrent_block_allocations_do_not_overlap(self):
+        borden_grid = self._fake_grid()
+        self._reset_grid(borden_grid)
+
+        n_calls = 20
+        block_size = 5
+        barrier = threading.Barrier(n_calls)
+
+        def worker() -> list[str]:
+            close_old_connections()
+            try:
+                barrier.wait()
+                return BordenNumberApi.reserve_borden_numbers(borden_grid, block_size)
+            finally:
+                connections["default"].close()
+
+        with ThreadPoolExecutor(max_workers=n_calls) as pool:
+            blocks = list(pool.map(lambda _: worker(), range(n_calls)))
+
+        # Each block is contiguous, and together they cover 1..n without duplicates
+        for block in blocks:
+            seqs = [self._seq_from_borden_number(n) for n in block]
+            self.assertEqual(seqs, list(range(seqs[0], seqs[0] + block_size)))
+        seqs = sorted(
+            self._seq_from_borden_number(n) for block in blocks for n in block
+        )
+        self.assertEqual(seqs, list(range(1, n_calls * block_size + 1)))
@@ -0,0 +1,28 @@
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+
+from bcap.util.borden_number_blocks import BordenNumberBlocks, get_active_blocks
+
+
+class BordenNumberBlocksTests(SimpleTestCase):
+    @patch(
+        "bcap.util.borden_number_blocks.BordenNumberCounter.allocate_borden_number_blocks"
+    )
+    def test_blocks_are_reserved_once_and_handed_out_in_order(self, mock_allocate):
+        mock_allocate.return_value = {
+            "DhRs": ["DhRs-7", "DhRs-8"],
+            "EeRb": ["EeRb-3"],
+        }
+
+        with BordenNumberBlocks.for_borden_numbers(
+            ["DhRs-1", "DhRs-1", "EeRb-1", None]
+        ) as blocks:
+            self.assertIs(get_active_blocks(), blocks)
+            self.assertEqual(blocks.take("DhRs"), "DhRs-7")
+            self.assertEqual(blocks.take("EeRb"), "EeRb-3")
+            self.assertIsNone(blocks.take("EeRb"))
+            self.assertEqual(blocks.remaining(), {"DhRs": ["DhRs-8"], "EeRb": []})
+
+        mock_allocate.assert_called_once_with({"DhRs": 2, "EeRb": 1})
+        self.assertIsNone(get_active_blocks())
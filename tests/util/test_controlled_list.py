@@ -2,7 +2,10 @@ from django.test import TestCase
 from unittest.mock import patch, MagicMock
 
 from arches_controlled_lists.models import ListItem, ListItemValue
-from bcap.util.controlled_list import get_hierarchy_for_list_item
+from bcap.util.controlled_list import (
+    ControlledListCache,
+    get_hierarchy_for_list_item,
+)
 
 
 class ControlledListTests(TestCase):
@@ -100,3 +103,92 @@ class ControlledListTests(TestCase):
         # Assertions
         self.assertEqual(result, [])
         mock_get.assert_called_once_with(id="non-existent-id")
+
+
+class ControlledListCacheTests(TestCase):
+    def setUp(self):
+        ControlledListCache.clear()
+
+        self.items = [
+            {
+                "id": "parent-id",
+                "uri": "http://x/parent-id",
+                "list_id": "list-1",
+                "parent_id": None,
+            },
+            {
+                "id": "child-id",
+                "uri": "http://x/child-id",
+                "list_id": "list-1",
+                "parent_id": "parent-id",
+            },
+        ]
+        self.values = [
+            {
+                "id": "v1",
+                "value": "Parent Label",
+                "language_id": "en",
+                "list_item_id": "parent-id",
+                "valuetype_id": "prefLabel",
+            },
+            {
+                "id": "v2",
+                "value": "Child Label",
+                "language_id": "en",
+                "list_item_id": "child-id",
+                "valuetype_id": "prefLabel",
+            },
+            {
+                "id": "v3",
+                "value": "Child Alt",
+                "language_id": "en",
+                "list_item_id": "child-id",
+                "valuetype_id": "altLabel",
+            },
+        ]
+
+    def _patch_queries(self, mock_item_filter, mock_value_filter):
+        mock_item_filter.return_value.values.return_value = self.items
+        mock_value_filter.return_value.values.return_value = self.values
+
+    @patch("bcap.util.controlled_list.get_controlled_list_version", return_value=0)
+    @patch("arches_controlled_lists.models.ListItemValue.objects.filter")
+    @patch("arches_controlled_lists.models.ListItem.objects.filter")
+    def test_lookups_are_served_from_a_single_load(
+        self, mock_item_filter, mock_value_filter, _mock_version
+    ):
+        self._patch_queries(mock_item_filter, mock_value_filter)
+
+        self.assertEqual(
+            ControlledListCache.get_hierarchy("list-1", "child-id"),
+            ["Parent Label", "Child Label"],
+        )
+        self.assertEqual(
+            ControlledListCache.get_item_ids_by_label("list-1"),
+            {"Parent Label": "parent-id", "Child Label": "child-id"},
+        )
+        reference_value = ControlledListCache.get_reference_value("list-1", "child-id")
+        self.assertEqual(reference_value["uri"], "http://x/child-id")
+        self.assertEqual(reference_value["list_id"], "list-1")
+        self.assertEqual(len(reference_value["labels"]), 2)
+        self.assertIsNone(ControlledListCache.get_reference_value("list-1", "missing"))
+
+        mock_item_filter.assert_called_once_with(list_id="list-1")
+        mock_value_filter.assert_called_once_with(list_item__list_id="list-1")
+
+    @patch("bcap.util.controlled_list.get_controlled_list_version")
+    @patch("arches_controlled_lists.models.ListItemValue.objects.filter")
+    @patch("arches_controlled_lists.models.ListItem.objects.filter")
+    def test_version_change_reloads_list(
+        self, mock_item_filter, mock_value_filter, mock_version
+    ):
+        self._patch_queries(mock_item_filter, mock_value_filter)
+
+        mock_version.return_value = 0
+        ControlledListCache.get_items("list-1")
+        ControlledListCache.get_items("list-1")
+        self.assertEqual(mock_item_filter.call_count, 1)
+
+        mock_version.return_value = 1
+        ControlledListCache.get_items("list-1")
+        self.assertEqual(mock_item_filter.call_count, 2)
@@ -0,0 +1,90 @@
+from types import SimpleNamespace
+
+from django.test import SimpleTestCase
+
+from bcap.util.descriptor_dependencies import (
+    DescriptorDependencyMixin,
+    clear_changed_nodegroups,
+    get_changed_nodegroups,
+    record_tile_change,
+)
+
+
+class _FakeDescriptors(DescriptorDependencyMixin):
+    dependencies = {
+        "name": {"ng-name"},
+        "description": {"ng-name", "ng-typology"},
+        "map_popup": None,
+    }
+
+    def get_descriptor_nodegroup_ids(self, descriptor):
+        return self.dependencies.get(descriptor)
+
+
+class DescriptorDependencyTests(SimpleTestCase):
+    def setUp(self):
+        clear_changed_nodegroups()
+        self.descriptors = _FakeDescriptors()
+        self.resource = SimpleNamespace(
+            resourceinstanceid="ri-1",
+            descriptors={
+                "en": {
+                    "name": "DcRu-1",
+                    "description": "Stored description",
+                    "map_popup": "Stored popup",
+                }
+            },
+        )
+
+    def tearDown(self):
+        clear_changed_nodegroups()
+
+    def _save_tile(self, nodegroup_id, resourceinstanceid="ri-1"):
+        record_tile_change(
+            SimpleNamespace(
+                resourceinstance_id=resourceinstanceid, nodegroup_id=nodegroup_id
+            )
+        )
+
+    def _reusable(self, descriptor):
+        return self.descriptors.get_reusable_descriptor(
+            self.resource, {"type": descriptor}, context={"language": "en"}
+        )
+
+    def test_recalculates_when_no_tile_change_recorded(self):
+        self.assertIsNone(get_changed_nodegroups("ri-1"))
+        self.assertIsNone(self._reusable("name"))
+
+    def test_reuses_descriptor_when_unrelated_nodegroup_changes(self):
+        self._save_tile("ng-remarks")
+
+        self.assertEqual(self._reusable("name"), "DcRu-1")
+        self.assertEqual(self._reusable("description"), "Stored description")
+
+    def test_recalculates_when_dependent_nodegroup_changes(self):
+        self._save_tile("ng-typology")
+
+        self.assertEqual(self._reusable("name"), "DcRu-1")
+        self.assertIsNone(self._reusable("description"))
+
+    def test_recalculates_when_dependencies_unknown(self):
+        self._save_tile("ng-remarks")
+
+        self.assertIsNone(self._reusable("map_popup"))
+
+    def test_recalculates_when_nothing_stored(self):
+        self._save_tile("ng-remarks")
+        self.resource.descriptors = {}
+
+        self.assertIsNone(self._reusable("name"))
+
+    def test_changes_are_tracked_per_resource(self):
+        self._save_tile("ng-name", resourceinstanceid="ri-2")
+        self._save_tile("ng-remarks")
+
+        self.assertEqual(get_changed_nodegroups("ri-2"), {"ng-name"})
+        self.assertEqual(self._reusable("name"), "DcRu-1")
+
+        clear_changed_nodegroups("ri-1")
+        self.assertIsNone(get_changed_nodegroups("ri-1"))
+        self.assertEqual(get_changed_nodegroups("ri-2"), {"ng-name"})
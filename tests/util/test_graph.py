@@ -0,0 +1,158 @@
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from django.test import SimpleTestCase
+
+from bcap.util import register_type_api
+from bcap.util.aliases.archaeological_site import ArchaeologicalSiteAliases
+from bcap.util.bcap_aliases import GraphSlugs
+from bcap.util.borden_number_api import BordenNumberApi
+from bcap.util.graph import (
+    VERSION_CHECK_SECONDS,
+    GraphRegistry,
+    get_current_graph,
+    invalidate_graph_registry,
+)
+
+
+class _CountingManager:
+    def __init__(self, filter_fn):
+        self.filter_fn = filter_fn
+        self.query_count = 0
+
+    def filter(self, **kwargs):
+        self.query_count += 1
+        result = MagicMock()
+        rows = self.filter_fn(**kwargs)
+        result.first.return_value = rows[0] if rows else None
+        result.__iter__.return_value = iter(rows)
+        return result
+
+
+class GraphRegistryTests(SimpleTestCase):
+    def setUp(self):
+        GraphRegistry.clear()
+        self.graph = SimpleNamespace(
+            graphid="site-graph", slug=GraphSlugs.ARCHAEOLOGICAL_SITE
+        )
+        self.nodes = [
+            SimpleNamespace(
+                nodeid="boundary",
+                alias=ArchaeologicalSiteAliases.SITE_BOUNDARY,
+                nodegroup_id="boundary-ng",
+                datatype="geojson-feature-collection",
+            ),
+            SimpleNamespace(
+                nodeid="borden",
+                alias=ArchaeologicalSiteAliases.BORDEN_NUMBER,
+                nodegroup_id="borden-ng",
+                datatype="borden-number-datatype",
+            ),
+            SimpleNamespace(
+                nodeid="issuance",
+                alias=ArchaeologicalSiteAliases.BORDEN_NUMBER_ISSUANCE_DATE,
+                nodegroup_id="borden-ng",
+                datatype="date",
+            ),
+        ]
+        self.graphs = _CountingManager(
+            lambda slug, source_identifier_id__isnull: (
+                [self.graph] if slug == self.graph.slug else []
+            )
+        )
+        self.node_manager = _CountingManager(
+            lambda graph_id=None, nodegroup_id=None: [
+                node
+                for node in self.nodes
+                if graph_id == self.graph.graphid or node.nodegroup_id == nodegroup_id
+            ]
+        )
+
+    def tearDown(self):
+        GraphRegistry.clear()
+
+    def _hot_paths(self):
+        get_current_graph(GraphSlugs.ARCHAEOLOGICAL_SITE)
+        register_type_api._get_node(
+            GraphSlugs.ARCHAEOLOGICAL_SITE, ArchaeologicalSiteAliases.BORDEN_NUMBER
+        )
+        BordenNumberApi()._initialize_models()
+        return GraphRegistry.get_nodegroup_node(
+            "borden-ng", ArchaeologicalSiteAliases.BORDEN_NUMBER_ISSUANCE_DATE
+        )
+
+    @patch("bcap.util.borden_number_api.DataTypeFactory")
+    @patch("bcap.util.graph.get_graph_registry_version", return_value=0)
+    def test_no_metadata_queries_after_warm_up(self, mock_version, _factory):
+        with (
+            patch(
+                "bcap.util.graph.models.GraphModel",
+                SimpleNamespace(objects=self.graphs),
+            ),
+            patch(
+                "bcap.util.graph.models.Node",
+                SimpleNamespace(objects=self.node_manager),
+            ),
+        ):
+            self.assertEqual(self._hot_paths().nodeid, "issuance")
+            warm_up_queries = self.graphs.query_count + self.node_manager.query_count
+
+            for _ in range(10):
+                self._hot_paths()
+
+        self.assertEqual(warm_up_queries, 2)
+        self.assertEqual(
+            self.graphs.query_count + self.node_manager.query_count, warm_up_queries
+        )
+        # The shared version is only read from the cache once
+        self.assertEqual(mock_version.call_count, 1)
+
+    @patch("bcap.util.graph.time.monotonic")
+    @patch("bcap.util.graph.get_graph_registry_version")
+    def test_version_change_reloads_graphs(self, mock_version, mock_monotonic):
+        with patch(
+            "bcap.util.graph.models.GraphModel", SimpleNamespace(objects=self.graphs)
+        ):
+            mock_monotonic.return_value = 100
+            mock_version.return_value = 0
+            get_current_graph(GraphSlugs.ARCHAEOLOGICAL_SITE)
+            get_current_graph(GraphSlugs.ARCHAEOLOGICAL_SITE)
+            self.assertEqual(self.graphs.query_count, 1)
+
+            # Another process changed a graph, which is seen once the version
+            # is read again
+            mock_version.return_value = 1
+            get_current_graph(GraphSlugs.ARCHAEOLOGICAL_SITE)
+            self.assertEqual(self.graphs.query_count, 1)
+
+            mock_monotonic.return_value = 100 + VERSION_CHECK_SECONDS
+            get_current_graph(GraphSlugs.ARCHAEOLOGICAL_SITE)
+            self.assertEqual(self.graphs.query_count, 2)
+            self.assertEqual(mock_version.call_count, 2)
+
+    @patch("bcap.util.graph.cache")
+    @patch("bcap.util.graph.get_graph_registry_version", return_value=0)
+    def test_local_invalidation_reloads_graphs_immediately(self, _version, _cache):
+        with patch(
+            "bcap.util.graph.models.GraphModel", SimpleNamespace(objects=self.graphs)
+        ):
+            get_current_graph(GraphSlugs.ARCHAEOLOGICAL_SITE)
+            invalidate_graph_registry()
+            get_current_graph(GraphSlugs.ARCHAEOLOGICAL_SITE)
+
+        self.assertEqual(self.graphs.query_count, 2)
+
+    @patch("bcap.util.graph.get_graph_registry_version", return_value=0)
+    def test_registry_cleared_during_a_lookup(self, _version):
+        def clear_while_querying(**kwargs):
+            # Another thread replaces the registry while this one queries
+            GraphRegistry.clear()
+            return [self.graph]
+
+        with patch(
+            "bcap.util.graph.models.GraphModel",
+            SimpleNamespace(objects=_CountingManager(clear_while_querying)),
+        ):
+            graph = get_current_graph(GraphSlugs.ARCHAEOLOGICAL_SITE)
+
+        self.assertIs(graph, self.graph)
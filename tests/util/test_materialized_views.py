@@ -0,0 +1,153 @@
+import datetime
+import threading
+from contextlib import ExitStack
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+from django.utils import timezone
+
+from bcap.util import materialized_views
+from bcap.util.materialized_views import (
+    DEPENDENCY_FAILED,
+    FAILED,
+    REFRESHED,
+    UNCHANGED,
+    is_view_changed,
+    refresh_views,
+)
+
+VIEWS = [
+    "mv_site_protection_event",
+    "mv_government",
+    "mv_protection_event",
+    "mv_site_names",
+]
+DEPENDENCIES = {
+    "mv_site_protection_event": {"mv_government", "mv_protection_event"},
+    "mv_government": set(),
+    "mv_protection_event": set(),
+    "mv_site_names": set(),
+}
+SCHEMAS = {
+    "mv_site_protection_event": {"legislative_act"},
+    "mv_government": {"government"},
+    "mv_protection_event": {"heritage_site", "legislative_act"},
+    "mv_site_names": {"heritage_site"},
+}
+
+
+class RefreshViewsTests(SimpleTestCase):
+    def setUp(self):
+        self.stack = ExitStack()
+        self.refreshed = []
+        self.lock = threading.Lock()
+        self.changed = set(VIEWS)
+        self.failing = set()
+
+        def refresh_view(view_name, concurrently):
+            with self.lock:
+                # Views only start once the views they read from are done
+                for dependency in DEPENDENCIES[view_name]:
+                    assert dependency in self.refreshed, dependency
+                self.refreshed.append(view_name)
+            if view_name in self.failing:
+                raise Exception("refresh failed")
+            return 0.5
+
+        for name, value in (
+            ("get_existing_views", lambda view_names: list(view_names)),
+            ("get_view_sources", lambda view_names: (DEPENDENCIES, SCHEMAS)),
+            ("get_concurrent_views", lambda view_names: {"mv_site_names"}),
+            ("refresh_view", refresh_view),
+        ):
+            self.stack.enter_context(
+                patch.object(materialized_views, name, side_effect=value)
+            )
+        self.stack.enter_context(
+            patch.object(
+                materialized_views,
+                "is_view_changed",
+                side_effect=lambda schemas, last_refresh, graph_ids, max_age: any(
+                    SCHEMAS[view_name] == schemas for view_name in self.changed
+                ),
+            )
+        )
+        self.refresh_model = self.stack.enter_context(
+            patch.object(materialized_views, "MaterializedViewRefresh")
+        )
+        self.refresh_model.objects.in_bulk.return_value = {}
+        self.stack.enter_context(patch.object(materialized_views.models, "GraphModel"))
+
+    def tearDown(self):
+        self.stack.close()
+
+    def test_views_are_refreshed_after_their_dependencies(self):
+        results = refresh_views(VIEWS, workers=3)
+
+        self.assertEqual(sorted(self.refreshed), sorted(VIEWS))
+        self.assertTrue(all(r["status"] == REFRESHED for r in results.values()))
+        self.assertTrue(results["mv_site_names"]["concurrently"])
+        self.assertFalse(results["mv_government"]["concurrently"])
+        self.assertEqual(self.refresh_model.objects.update_or_create.call_count, 4)
+
+    def test_unchanged_views_are_skipped_unless_a_dependency_was_refreshed(self):
+        self.changed = {"mv_government"}
+
+        results = refresh_views(VIEWS)
+
+        self.assertEqual(results["mv_government"]["status"], REFRESHED)
+        self.assertEqual(results["mv_protection_event"]["status"], UNCHANGED)
+        self.assertEqual(results["mv_site_names"]["status"], UNCHANGED)
+        self.assertEqual(results["mv_site_protection_event"]["status"], REFRESHED)
+
+        self.changed = set()
+        results = refresh_views(VIEWS)
+        self.assertTrue(all(r["status"] == UNCHANGED for r in results.values()))
+
+        results = refresh_views(VIEWS, force=True)
+        self.assertTrue(all(r["status"] == REFRESHED for r in results.values()))
+
+    def test_failures_skip_dependent_views(self):
+        self.failing = {"mv_government"}
+
+        results = refresh_views(VIEWS)
+
+        self.assertEqual(results["mv_government"]["status"], FAILED)
+        self.assertEqual(
+            results["mv_site_protection_event"]["status"], DEPENDENCY_FAILED
+        )
+        self.assertEqual(results["mv_site_names"]["status"], REFRESHED)
+
+
+@patch.object(materialized_views.models, "EditLog")
+class IsViewChangedTests(SimpleTestCase):
+    graph_ids = {"heritage_site": "site-graph"}
+
+    def _last_refresh(self, hours_ago):
+        return SimpleNamespace(
+            refreshed=timezone.now() - datetime.timedelta(hours=hours_ago)
+        )
+
+    def test_edits_are_read_from_the_edit_log(self, mock_edit_log):
+        mock_edit_log.objects.filter.return_value.exists.return_value = False
+
+        self.assertFalse(
+            is_view_changed(
+                {"heritage_site"}, self._last_refresh(1), self.graph_ids, 3600 * 24
+            )
+        )
+        mock_edit_log.objects.filter.assert_called_once()
+
+    def test_views_past_their_max_age_are_refreshed_without_logged_edits(
+        self, mock_edit_log
+    ):
+        mock_edit_log.objects.filter.return_value.exists.return_value = False
+
+        # e.g. tiles loaded in bulk, which the edit log doesn't record
+        self.assertTrue(
+            is_view_changed(
+                {"heritage_site"}, self._last_refresh(25), self.graph_ids, 3600 * 24
+            )
+        )
+        mock_edit_log.objects.filter.assert_not_called()
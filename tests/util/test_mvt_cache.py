@@ -0,0 +1,91 @@
+from unittest.mock import MagicMock, patch
+
+from django.test import SimpleTestCase, override_settings
+
+from bcap.util import mvt_cache
+from tests.util.caches import LOCMEM_CACHES
+
+NODEID = "1b6235b0-0d0f-11ed-98c2-5254008afee6"
+SCOPE = "guest-scope"
+SITE = "0b8a2b4e-6a43-4a5c-9bd1-3c4c0f0a7d21"
+
+
+@override_settings(CACHES=LOCMEM_CACHES, MVT_CACHE_ALIAS="default")
+class MVTCacheTests(SimpleTestCase):
+    def setUp(self):
+        mvt_cache.get_mvt_cache().clear()
+        self.create_tile = MagicMock(return_value=memoryview(b"tile"))
+
+    def _get_tile(self, zoom, x, y, scope=SCOPE):
+        return mvt_cache.get_tile(NODEID, zoom, x, y, scope, self.create_tile)
+
+    def test_tiles_are_rendered_once_per_permission_scope(self):
+        self.assertEqual(self._get_tile("14", "2590", "5600"), b"tile")
+        self.assertEqual(self._get_tile(14, 2590, 5600), b"tile")
+        self.assertEqual(self.create_tile.call_count, 1)
+
+        self._get_tile(14, 2590, 5600, scope="editor-scope")
+        self.assertEqual(self.create_tile.call_count, 2)
+
+    def test_empty_tiles_are_cached(self):
+        self.create_tile.return_value = None
+
+        self.assertEqual(self._get_tile(3, 1, 2), b"")
+        self.assertEqual(self._get_tile(3, 1, 2), b"")
+        self.create_tile.assert_called_once()
+
+    def test_edit_invalidates_only_the_tiles_it_touches(self):
+        # A site near Victoria, in web mercator
+        extent = (-13727000.0, 6177000.0, -13726900.0, 6177100.0)
+        tile_x, tile_y = mvt_cache.get_tile_range(extent, 16)[:2]
+        near = (16, tile_x, tile_y)
+        low_zoom = (4, *mvt_cache.get_tile_range(extent, 4)[:2])
+        far = (16, 0, 0)
+        for tile in (near, low_zoom, far):
+            self._get_tile(*tile)
+        self.assertEqual(self.create_tile.call_count, 3)
+
+        mvt_cache.invalidate_extent(NODEID, extent)
+        for tile in (near, low_zoom, far):
+            self._get_tile(*tile)
+
+        # The far away tile is still cached
+        self.assertEqual(self.create_tile.call_count, 5)
+
+    def test_large_edit_invalidates_the_layer(self):
+        self._get_tile(16, 0, 0)
+
+        mvt_cache.invalidate_extent(
+            NODEID, (-14000000.0, 6000000.0, -12000000.0, 8000000.0)
+        )
+        self._get_tile(16, 0, 0)
+
+        self.assertEqual(self.create_tile.call_count, 2)
+
+    def test_timeouts_depend_on_zoom(self):
+        with self.settings(MVT_CACHE_TIMEOUTS={0: 300, 9: 60}):
+            self.assertEqual(mvt_cache.get_timeout(3), 300)
+            self.assertEqual(mvt_cache.get_timeout(12), 60)
+
+    @patch("bcap.util.mvt_cache.transaction.on_commit", side_effect=lambda func: func())
+    @patch("bcap.util.mvt_cache.models")
+    def test_restricting_a_site_changes_the_guest_tile(self, mock_models, _on_commit):
+        extent = (-13727000.0, 6177000.0, -13726900.0, 6177100.0)
+        geometries = mock_models.GeoJSONGeometry.objects.filter.return_value
+        geometries.values.return_value.annotate.return_value = [
+            {"resourceinstance_id": SITE, "node_id": NODEID, "extent": extent}
+        ]
+        tile = (16, *mvt_cache.get_tile_range(extent, 16)[:2])
+        self.assertEqual(self._get_tile(*tile), b"tile")
+        restriction_version = mvt_cache.get_restriction_version()
+
+        # The site is restricted from the Guest group, so it's left out of the
+        # tile rendered for Guest from now on
+        self.create_tile.return_value = memoryview(b"restricted")
+        mvt_cache.invalidate_resource_tiles([SITE])
+
+        self.assertEqual(self._get_tile(*tile), b"restricted")
+        self.assertEqual(mvt_cache.get_restriction_version(), restriction_version + 1)
+        mock_models.GeoJSONGeometry.objects.filter.assert_called_once_with(
+            resourceinstance_id__in=[SITE]
+        )
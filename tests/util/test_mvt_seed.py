@@ -0,0 +1,81 @@
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from django.test import SimpleTestCase, override_settings
+
+from bcap.util import mvt_cache, mvt_seed
+from tests.util.caches import LOCMEM_CACHES
+
+NODEID = "1b6235b0-0d0f-11ed-98c2-5254008afee6"
+
+
+@override_settings(CACHES=LOCMEM_CACHES, MVT_CACHE_ALIAS="default")
+@patch("bcap.util.mvt_seed.MVTTiler")
+@patch(
+    "bcap.util.mvt_seed.get_seed_users",
+    return_value=[(SimpleNamespace(username="anonymous"), [], "guest-scope")],
+)
+class MVTSeedTests(SimpleTestCase):
+    max_zoom = 6
+
+    def setUp(self):
+        mvt_cache.get_mvt_cache().clear()
+
+    def _seed(self, **kwargs):
+        return mvt_seed.seed_tiles(
+            nodeids=[NODEID], max_zoom=self.max_zoom, usernames=["anonymous"], **kwargs
+        )
+
+    def test_seed_tiles_cover_bc(self, _users, _tiler):
+        tiles = mvt_seed.get_seed_tiles(self.max_zoom)
+
+        self.assertIn((0, 0, 0), tiles)
+        self.assertEqual(len([tile for tile in tiles if tile[0] == 0]), 1)
+        # Victoria
+        x, y = mvt_cache.get_tile_range((-13727000, 6177000, -13727000, 6177000), 6)[:2]
+        self.assertIn((6, x, y), tiles)
+
+    def test_only_uncached_tiles_are_rendered_again(self, _users, mock_tiler):
+        mock_tiler.return_value.createTile.return_value = b"tile"
+        total = len(mvt_seed.get_seed_tiles(self.max_zoom))
+
+        self.assertEqual(
+            self._seed(), {"tiles": total, "rendered": total, "skipped_scopes": 0}
+        )
+        self.assertEqual(
+            self._seed(), {"tiles": total, "rendered": 0, "skipped_scopes": 0}
+        )
+
+        # An edited site near Victoria only touches a few tiles per zoom
+        mvt_cache.invalidate_extent(
+            NODEID, (-13727000.0, 6177000.0, -13726900.0, 6177100.0)
+        )
+        rendered = self._seed()["rendered"]
+        self.assertGreaterEqual(rendered, self.max_zoom + 1)
+        self.assertLess(rendered, 4 * (self.max_zoom + 1))
+
+        self.assertEqual(self._seed(force=True)["rendered"], total)
+
+    @patch("bcap.util.mvt_cache.transaction.on_commit", side_effect=lambda func: func())
+    @patch("bcap.util.mvt_cache.models")
+    def test_scope_is_skipped_when_permissions_change_mid_run(
+        self, _models, _on_commit, _users, mock_tiler
+    ):
+        rendered = []
+
+        def create_tile(*args):
+            rendered.append(args)
+            if len(rendered) == 3:
+                # A site is restricted while its tile renders
+                mvt_cache.invalidate_resource_tiles(["site"])
+            return b"tile"
+
+        mock_tiler.return_value.createTile.side_effect = create_tile
+
+        counts = self._seed()
+
+        self.assertEqual(counts["rendered"], 2)
+        self.assertEqual(counts["skipped_scopes"], 1)
+        # The next run renders what wasn't cached, including the third tile
+        total = len(mvt_seed.get_seed_tiles(self.max_zoom))
+        self.assertEqual(self._seed()["rendered"], total - 2)
@@ -0,0 +1,72 @@
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+
+from bcap.util.mvt_tiler import MVTTiler
+
+NODEID = "1b6235b0-0d0f-11ed-98c2-5254008afee6"
+CONFIG = {"clusterMaxZoom": 5, "clusterMinPoints": 3, "clusterDistance": 20}
+
+
+@patch(
+    "bcap.util.mvt_tiler.get_filtered_instances", return_value=(False, ["restricted"])
+)
+@patch("bcap.util.mvt_tiler.models")
+@patch("bcap.util.mvt_tiler.connection")
+class MVTTilerTests(SimpleTestCase):
+    def setUp(self):
+        self.executed = []
+
+    def _cursor(self, mock_connection, fetched):
+        cursor = mock_connection.cursor.return_value.__enter__.return_value
+        cursor.execute.side_effect = lambda sql, params: self.executed.append(
+            (sql, params)
+        )
+        cursor.fetchall.return_value = [("site-1",), ("site-2",)]
+        cursor.fetchone.side_effect = fetched
+
+    def test_features_are_enriched_once_per_tile(
+        self, mock_connection, mock_models, _filtered
+    ):
+        mock_models.Node.objects.get.return_value = SimpleNamespace(config=CONFIG)
+        self._cursor(mock_connection, [(memoryview(b"tile"),)])
+
+        tile = MVTTiler().createTile(NODEID, [], SimpleNamespace(id=1), 14, 2590, 5600)
+
+        self.assertEqual(tile, b"tile")
+        sql, params = self.executed[-1]
+        self.assertEqual(sql.count("get_map_attribute_data_for_resources"), 1)
+        self.assertNotIn("get_map_attribute_data(", sql)
+        self.assertIn("a.attribute_data ->> 'borden_number' AS borden_number", sql)
+        self.assertIn("resourceinstanceid not in %s", sql)
+        self.assertEqual(params.count(NODEID), 3)
+        self.assertEqual(params[4], ("restricted",))
+        self.assertEqual(len(params), sql.count("%s"))
+
+    def test_clustered_tiles_enrich_the_unclustered_features(
+        self, mock_connection, mock_models, _filtered
+    ):
+        mock_models.Node.objects.get.return_value = SimpleNamespace(config=CONFIG)
+        # Enough geometries in the tile to cluster them
+        self._cursor(mock_connection, [(10,), (memoryview(b"tile"),)])
+
+        tile = MVTTiler().createTile(NODEID, [], SimpleNamespace(id=1), 4, 2, 5)
+
+        self.assertEqual(tile, b"tile")
+        sql, params = self.executed[-1]
+        self.assertIn("ST_ClusterDBSCAN", sql)
+        self.assertEqual(sql.count("get_map_attribute_data_for_resources"), 1)
+        self.assertIn("NULL AS authorities", sql)
+        self.assertEqual(len(params), sql.count("%s"))
+
+    def test_nodes_the_user_cannot_see_have_no_tile(
+        self, mock_connection, mock_models, _filtered
+    ):
+        mock_models.Node.DoesNotExist = Exception
+        mock_models.Node.objects.get.side_effect = Exception
+
+        self.assertIsNone(
+            MVTTiler().createTile(NODEID, [], SimpleNamespace(id=1), 14, 0, 0)
+        )
+        mock_connection.cursor.assert_not_called()
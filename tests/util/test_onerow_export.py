@@ -0,0 +1,114 @@
+from contextlib import ExitStack
+from unittest.mock import MagicMock, patch
+
+from django.test import SimpleTestCase
+
+from bcap.util import onerow_export
+
+SITE_1 = "2b1e7f2c-1111-4b8e-9a0e-000000000001"
+SITE_2 = "2b1e7f2c-1111-4b8e-9a0e-000000000002"
+DELETED_SITE = "2b1e7f2c-1111-4b8e-9a0e-000000000003"
+ACT = "2b1e7f2c-1111-4b8e-9a0e-000000000004"
+DELETED_ACT = "2b1e7f2c-1111-4b8e-9a0e-000000000005"
+
+
+class GetAffectedSitesTests(SimpleTestCase):
+    def setUp(self):
+        self.stack = ExitStack()
+        self.resources = self.stack.enter_context(
+            patch("arches.app.models.models.ResourceInstance.objects.filter")
+        )
+        self.resources.return_value.values_list.return_value = [
+            (SITE_1, "heritage_site"),
+            (ACT, "legislative_act"),
+        ]
+        self.stack.enter_context(
+            patch("arches.app.models.models.GraphModel.objects.filter")
+        )
+        self.relations = self.stack.enter_context(
+            patch("arches.app.models.models.ResourceXResource.objects.filter")
+        )
+        self.relations.return_value.values_list.return_value = [(SITE_2, ACT)]
+
+    def tearDown(self):
+        self.stack.close()
+
+    def test_sites_related_to_changed_acts_are_updated(self):
+        self.assertEqual(
+            onerow_export.get_affected_sites(
+                [
+                    (SITE_1, "heritage_site"),
+                    (ACT, "legislative_act"),
+                    (DELETED_SITE, "heritage_site"),
+                ]
+            ),
+            sorted([SITE_1, SITE_2, DELETED_SITE]),
+        )
+        self.resources.assert_not_called()
+
+    def test_deleted_acts_are_not_treated_as_sites(self):
+        # The act is gone along with its relationships, whose sites were
+        # logged when they were removed
+        self.relations.return_value.values_list.return_value = []
+
+        self.assertEqual(
+            onerow_export.get_affected_sites(
+                [(DELETED_ACT, "legislative_act"), (SITE_2, "heritage_site")]
+            ),
+            [SITE_2],
+        )
+
+    def test_entries_without_a_graph_are_looked_up(self):
+        self.assertEqual(
+            onerow_export.get_affected_sites(
+                [(SITE_1, None), (ACT, None), (DELETED_SITE, None)]
+            ),
+            sorted([SITE_1, SITE_2, DELETED_SITE]),
+        )
+        self.assertEqual(
+            self.resources.call_args.kwargs["pk__in"], {SITE_1, ACT, DELETED_SITE}
+        )
+
+    def test_relationships_are_only_read_for_changed_acts(self):
+        self.assertEqual(
+            onerow_export.get_affected_sites([(SITE_1, "heritage_site")]), [SITE_1]
+        )
+        self.relations.assert_not_called()
+
+
+@patch("bcap.util.onerow_export.connection")
+@patch("bcap.util.onerow_export.export_exists", return_value=True)
+@patch("bcap.util.onerow_export.update_sites")
+@patch(
+    "bcap.util.onerow_export.get_affected_sites",
+    side_effect=lambda changes: sorted(id for id, slug in changes),
+)
+@patch("bcap.util.onerow_export.ExportChangelog")
+@patch("bcap.util.onerow_export.transaction", MagicMock())
+class UpdateExportTests(SimpleTestCase):
+    def test_changelog_is_processed_in_batches(
+        self, mock_changelog, _sites, mock_update, _exists, _connection
+    ):
+        mock_changelog.pop.side_effect = [
+            [(SITE_1, "heritage_site"), (SITE_2, "heritage_site")],
+            [(ACT, "legislative_act")],
+            [],
+        ]
+
+        self.assertEqual(onerow_export.update_export(batch_size=2), 3)
+
+        mock_changelog.pop.assert_called_with(2)
+        self.assertEqual(
+            [call.args[0] for call in mock_update.call_args_list],
+            [[SITE_1, SITE_2], [ACT]],
+        )
+
+    def test_nothing_is_done_without_the_export_table(
+        self, mock_changelog, _sites, mock_update, mock_exists, _connection
+    ):
+        mock_exists.return_value = False
+
+        self.assertEqual(onerow_export.update_export(), 0)
+
+        mock_changelog.pop.assert_not_called()
+        mock_update.assert_not_called()
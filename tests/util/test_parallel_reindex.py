@@ -0,0 +1,115 @@
+from unittest.mock import MagicMock, patch
+from uuid import uuid4
+
+from django.test import SimpleTestCase, TestCase
+
+from bcap.models import ReindexCheckpoint
+from bcap.util.bcap_aliases import GraphSlugs
+from bcap.util.parallel_reindex import (
+    create_checkpoints,
+    delete_stale_documents,
+    index_shard,
+)
+
+
+class _ResourceIds(list):
+    def count(self):
+        return len(self)
+
+
+class CreateCheckpointsTests(TestCase):
+    def setUp(self):
+        self.resource_ids = _ResourceIds(sorted(uuid4() for _ in range(10)))
+
+    @patch("bcap.util.parallel_reindex._resource_ids")
+    def test_shards_cover_contiguous_id_ranges(self, mock_resource_ids):
+        mock_resource_ids.return_value = self.resource_ids
+
+        checkpoints = create_checkpoints("run", "site_visit", 3)
+
+        self.assertEqual(
+            [(c.lower_bound, c.upper_bound) for c in checkpoints],
+            [
+                (None, self.resource_ids[3]),
+                (self.resource_ids[3], self.resource_ids[7]),
+                (self.resource_ids[7], None),
+            ],
+        )
+
+    @patch("bcap.util.parallel_reindex._resource_ids")
+    def test_existing_checkpoints_are_resumed(self, mock_resource_ids):
+        mock_resource_ids.return_value = self.resource_ids
+        first = create_checkpoints("run", "site_visit", 3)
+        ReindexCheckpoint.objects.filter(pk=first[0].pk).update(
+            last_resourceinstanceid=self.resource_ids[1], indexed=2
+        )
+
+        resumed = create_checkpoints("run", "site_visit", 5)
+
+        self.assertEqual(len(resumed), 3)
+        self.assertEqual(resumed[0].last_resourceinstanceid, self.resource_ids[1])
+        self.assertEqual(
+            ReindexCheckpoint.objects.filter(run_name="run").count(), len(resumed)
+        )
+
+
+class IndexShardTests(TestCase):
+    @patch("bcap.search.arch_site_es_values.CustomSearchValue")
+    @patch(
+        "bcap.util.parallel_reindex.index_resources_using_singleprocessing",
+        side_effect=RuntimeError("Elasticsearch is unavailable"),
+    )
+    @patch("bcap.util.parallel_reindex.Resource")
+    @patch("bcap.util.parallel_reindex.custom_search_values_enabled", return_value=True)
+    @patch("bcap.util.parallel_reindex._resource_ids")
+    def test_prefetched_values_are_cleared_when_indexing_fails(
+        self, mock_resource_ids, _enabled, _resource, _index, mock_values
+    ):
+        mock_resource_ids.return_value.__getitem__.return_value = ["site-1"]
+        checkpoint = ReindexCheckpoint.objects.create(
+            run_name="run", graph_slug=GraphSlugs.ARCHAEOLOGICAL_SITE, shard=0
+        )
+
+        with self.assertRaises(RuntimeError):
+            index_shard(checkpoint.pk, 10)
+
+        mock_values.prefetch.assert_called_once_with(["site-1"])
+        mock_values.clear_prefetched.assert_called_once_with()
+        checkpoint.refresh_from_db()
+        self.assertIsNone(checkpoint.last_resourceinstanceid)
+
+
+class DeleteStaleDocumentsTests(SimpleTestCase):
+    @patch("bcap.util.parallel_reindex.Resource")
+    @patch("bcap.util.parallel_reindex.models")
+    @patch("bcap.util.parallel_reindex.get_indexed_resource_ids")
+    def test_documents_of_deleted_resources_are_deleted(
+        self, mock_indexed_ids, mock_models, mock_resource
+    ):
+        existing_ids = [uuid4(), uuid4(), uuid4()]
+        deleted_ids = [str(uuid4()), str(uuid4())]
+        mock_indexed_ids.return_value = {str(i) for i in existing_ids} | set(
+            deleted_ids
+        )
+        mock_models.ResourceInstance.objects.filter.side_effect = lambda **kwargs: (
+            MagicMock(
+                values_list=MagicMock(
+                    return_value=[
+                        i
+                        for i in existing_ids
+                        if str(i) in kwargs["resourceinstanceid__in"]
+                    ]
+                )
+            )
+        )
+
+        deleted = delete_stale_documents("site_visit", batch_size=2)
+
+        self.assertEqual(deleted, 2)
+        self.assertCountEqual(
+            [
+                call.kwargs["resourceinstanceid"]
+                for call in mock_resource.return_value.delete_index.call_args_list
+            ],
+            deleted_ids,
+        )
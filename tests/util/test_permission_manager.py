@@ -0,0 +1,277 @@
+from contextlib import ExitStack
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from django.test import SimpleTestCase
+
+from bcap.util import buisiness_permission_manager
+from bcap.util.buisiness_permission_manager import (
+    AdminOnlyPermissionManager,
+    HeritageSitePermissionManager,
+    reset_permissions_in_parallel,
+)
+from bcap.util.business_data_proxy import ArchaeologicalSiteDataProxy
+
+RESOURCE_1 = "6a2f3c1e-0000-4000-8000-000000000001"
+RESOURCE_2 = "6a2f3c1e-0000-4000-8000-000000000002"
+NO_ACCESS = 7
+OTHER_PERMISSION = 8
+ANONYMOUS = 2
+GUEST = 3
+EDITOR = 4
+
+
+class BulkResetPermissionsTests(SimpleTestCase):
+    def setUp(self):
+        self.stack = ExitStack()
+        self.stack.enter_context(
+            patch.object(AdminOnlyPermissionManager, "_populate_restricted_objects")
+        )
+        self.stack.enter_context(
+            patch.object(buisiness_permission_manager, "get_current_graph")
+        )
+        resources = self.stack.enter_context(
+            patch.object(buisiness_permission_manager, "models")
+        ).ResourceInstance.objects.filter.return_value
+        resources.values_list.return_value = [RESOURCE_1, RESOURCE_2]
+        resources.order_by.return_value.values_list.return_value = [
+            RESOURCE_1,
+            RESOURCE_2,
+        ]
+        self.stack.enter_context(
+            patch.object(buisiness_permission_manager, "ContentType")
+        ).objects.get_for_model.return_value = SimpleNamespace(pk=1)
+        self.stack.enter_context(
+            patch.object(buisiness_permission_manager, "Permission")
+        ).objects.get.return_value = SimpleNamespace(pk=NO_ACCESS)
+
+        self.user_model = MagicMock()
+        self.group_model = MagicMock()
+        self.stack.enter_context(
+            patch.dict(
+                buisiness_permission_manager.PRINCIPAL_MODELS,
+                {
+                    "user": (self.user_model, "user_id"),
+                    "group": (self.group_model, "group_id"),
+                },
+            )
+        )
+        self.stack.enter_context(
+            patch.object(buisiness_permission_manager, "transaction", MagicMock())
+        )
+        self.stack.enter_context(
+            patch.object(buisiness_permission_manager, "connection")
+        )
+        self.invalidate = self.stack.enter_context(
+            patch.object(
+                buisiness_permission_manager, "invalidate_permission_snapshots"
+            )
+        )
+        self.invalidate_tiles = self.stack.enter_context(
+            patch.object(buisiness_permission_manager, "invalidate_resource_tiles")
+        )
+
+        self.manager = AdminOnlyPermissionManager()
+        self.manager.admin_only_graph_slugs = ["lg_person"]
+        self.manager.restricted_users = [SimpleNamespace(pk=ANONYMOUS)]
+        self.manager.restricted_groups = [SimpleNamespace(pk=GUEST)]
+
+    def tearDown(self):
+        self.stack.close()
+
+    def _set_current(self, model, rows):
+        current = model.objects.filter.return_value
+        current.values_list.return_value = rows
+        current.filter.return_value.values_list.return_value = rows
+
+    def test_only_missing_permissions_are_added(self):
+        self._set_current(self.user_model, [(10, RESOURCE_1, ANONYMOUS, NO_ACCESS)])
+        self._set_current(self.group_model, [])
+
+        diff = self.manager.get_permission_diff("lg_person")
+
+        self.assertEqual(diff["resources"], 2)
+        self.assertEqual(diff["restricted"], 2)
+        self.assertEqual(
+            diff["add"],
+            {
+                ("user", RESOURCE_2, ANONYMOUS, NO_ACCESS),
+                ("group", RESOURCE_1, GUEST, NO_ACCESS),
+                ("group", RESOURCE_2, GUEST, NO_ACCESS),
+            },
+        )
+        self.assertEqual(diff["remove"], {})
+
+    def test_clearing_removes_other_permissions(self):
+        self._set_current(
+            self.user_model,
+            [
+                (10, RESOURCE_1, ANONYMOUS, NO_ACCESS),
+                (11, RESOURCE_1, EDITOR, OTHER_PERMISSION),
+            ],
+        )
+        self._set_current(self.group_model, [])
+
+        diff = self.manager.get_permission_diff("lg_person", clear_all_permissions=True)
+
+        self.assertEqual(
+            diff["remove"], {("user", RESOURCE_1, EDITOR, OTHER_PERMISSION): 11}
+        )
+
+    def test_dry_run_writes_nothing(self):
+        self._set_current(self.user_model, [(10, RESOURCE_1, ANONYMOUS, NO_ACCESS)])
+        self._set_current(self.group_model, [])
+
+        results = reset_permissions_in_parallel([self.manager], dry_run=True)
+        self.assertEqual(list(results.keys()), ["lg_person"])
+        self.user_model.objects.bulk_create.assert_not_called()
+
+        reset_permissions_in_parallel(
+            [self.manager], graph_slugs="lg_person", batch_size=50
+        )
+        created = self.user_model.objects.bulk_create.call_args
+        self.assertEqual(len(created.args[0]), 1)
+        self.assertEqual(created.kwargs["batch_size"], 50)
+        self.assertEqual(len(self.group_model.objects.bulk_create.call_args.args[0]), 2)
+        self.invalidate.assert_called_once_with({ANONYMOUS})
+        self.invalidate_tiles.assert_called_once_with({RESOURCE_1, RESOURCE_2})
+
+    def test_unmanaged_graphs_are_skipped(self):
+        self.assertEqual(
+            reset_permissions_in_parallel([self.manager], ["heritage_site"]), {}
+        )
+
+
+@patch.object(AdminOnlyPermissionManager, "_populate_restricted_objects")
+@patch("bcap.util.business_data_proxy.GraphLookup")
+class PublicSiteTests(SimpleTestCase):
+    @patch.object(
+        ArchaeologicalSiteDataProxy, "get_public_site_ids", return_value={RESOURCE_2}
+    )
+    def test_sites_are_evaluated_in_one_call(self, mock_public, _lookup, _populate):
+        manager = HeritageSitePermissionManager()
+
+        self.assertEqual(
+            manager._get_restricted_resource_ids(
+                "heritage_site", [RESOURCE_1, RESOURCE_2]
+            ),
+            {RESOURCE_1},
+        )
+        mock_public.assert_called_once_with([RESOURCE_1, RESOURCE_2])
+
+    @patch("bcap.util.business_data_proxy.connection")
+    def test_no_site_is_public_without_every_rule_node(
+        self, mock_connection, mock_lookup, _populate
+    ):
+        mock_lookup.return_value.get_node.side_effect = lambda alias: (
+            None if alias == "officially_recognized_site" else MagicMock()
+        )
+
+        self.assertEqual(
+            ArchaeologicalSiteDataProxy().get_public_site_ids([RESOURCE_1]), set()
+        )
+        mock_connection.cursor.assert_not_called()
+
+    @patch("bcap.util.business_data_proxy.connection")
+    def test_sites_with_several_admin_tiles_are_not_public(
+        self, mock_connection, mock_lookup, _populate
+    ):
+        # Every node of the rule is in the site record admin nodegroup
+        mock_lookup.return_value.get_node.side_effect = lambda alias: (
+            SimpleNamespace(nodeid=alias, nodegroup_id="admin-nodegroup")
+        )
+        cursor = mock_connection.cursor.return_value.__enter__.return_value
+        # (site, nodegroup, tiles, restricted, recognized, submission status,
+        # registration status)
+        cursor.fetchall.return_value = [
+            (RESOURCE_1, "admin-nodegroup", 2, False, True, True, True),
+            (RESOURCE_2, "admin-nodegroup", 1, False, True, True, True),
+        ]
+
+        # With two admin tiles each value is a list, as in is_site_public
+        self.assertEqual(
+            ArchaeologicalSiteDataProxy().get_public_site_ids([RESOURCE_1, RESOURCE_2]),
+            {RESOURCE_2},
+        )
+
+
+class _ShardManager:
+    """Restricts every resource, with the even numbered ones already restricted"""
+
+    def __init__(self, slug, resource_ids, failing_resource_id=None):
+        self.slug = slug
+        self.resource_ids = resource_ids
+        self.failing_resource_id = failing_resource_id
+        self.shards = []
+
+    def get_slugs_to_process(self, graph_slugs):
+        return [self.slug]
+
+    def get_resource_ids(self, slug):
+        return self.resource_ids
+
+    def reset_shard_permissions(
+        self, slug, resource_ids, clear_all_permissions, dry_run, batch_size
+    ):
+        self.shards.append(resource_ids)
+        if self.failing_resource_id in resource_ids:
+            raise Exception("shard failed")
+        return {
+            "resources": len(resource_ids),
+            "restricted": len(resource_ids),
+            "add": {
+                ("group", resource_id, GUEST, NO_ACCESS)
+                for resource_id in resource_ids
+                if int(resource_id) % 2
+            },
+            "remove": {},
+        }
+
+
+@patch.object(buisiness_permission_manager, "get_current_graph")
+class ResetPermissionsInParallelTests(SimpleTestCase):
+    def test_shards_are_merged_per_graph(self, _graph):
+        managers = [
+            _ShardManager("lg_person", [str(i) for i in range(25)]),
+            _ShardManager("heritage_site", [str(i) for i in range(5)]),
+        ]
+        progress = []
+
+        results = reset_permissions_in_parallel(
+            managers,
+            workers=3,
+            shard_size=10,
+            progress=lambda slug, result: progress.append(slug),
+        )
+
+        self.assertEqual([len(shard) for shard in managers[0].shards].count(10), 2)
+        self.assertEqual(len(managers[0].shards), 3)
+        self.assertEqual(results["lg_person"]["resources"], 25)
+        self.assertEqual(results["lg_person"]["done"], 3)
+        self.assertEqual(
+            results["lg_person"]["changed"], {str(i) for i in range(25) if i % 2}
+        )
+        self.assertEqual(results["heritage_site"]["changed"], {"1", "3"})
+        self.assertEqual(len(progress), 4)
+
+    def test_missing_graphs_are_skipped(self, mock_graph):
+        mock_graph.return_value = None
+
+        self.assertEqual(
+            reset_permissions_in_parallel([_ShardManager("lg_person", ["1"])]), {}
+        )
+
+    def test_failed_shards_keep_the_changes_of_the_others(self, _graph):
+        manager = _ShardManager(
+            "lg_person", [str(i) for i in range(25)], failing_resource_id="12"
+        )
+
+        results = reset_permissions_in_parallel([manager], workers=3, shard_size=10)
+
+        self.assertEqual(len(manager.shards), 3)
+        self.assertEqual(results["lg_person"]["failed"], 1)
+        self.assertEqual(results["lg_person"]["done"], 2)
+        self.assertEqual(
+            results["lg_person"]["changed"],
+            {str(i) for i in range(25) if i % 2 and not 10 <= i < 20},
+        )
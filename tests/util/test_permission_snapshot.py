@@ -0,0 +1,72 @@
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from django.test import SimpleTestCase, override_settings
+
+from bcap.util import permission_snapshot
+from bcap.util.permission_snapshot import (
+    get_permission_cache,
+    get_permission_snapshot,
+    invalidate_permission_snapshots,
+    user_groups_changed,
+)
+from tests.util.caches import LOCMEM_CACHES
+
+ANONYMOUS = SimpleNamespace(pk=2)
+EDITOR = SimpleNamespace(pk=5)
+
+
+@override_settings(
+    CACHES=LOCMEM_CACHES,
+    PERMISSION_SNAPSHOT_CACHE_ALIAS="default",
+    PERMISSION_SNAPSHOT_TIMEOUT=60,
+)
+@patch.object(
+    permission_snapshot,
+    "_create_snapshot",
+    side_effect=lambda user: {"permitted_nodegroups": ["ng-%s" % user.pk]},
+)
+class PermissionSnapshotTests(SimpleTestCase):
+    def setUp(self):
+        get_permission_cache().clear()
+
+    def test_snapshots_are_computed_once(self, mock_create):
+        self.assertEqual(
+            get_permission_snapshot(ANONYMOUS)["permitted_nodegroups"], ["ng-2"]
+        )
+        get_permission_snapshot(ANONYMOUS)
+
+        self.assertEqual(mock_create.call_count, 1)
+
+    def test_user_changes_only_invalidate_their_snapshot(self, mock_create):
+        get_permission_snapshot(ANONYMOUS)
+        get_permission_snapshot(EDITOR)
+
+        invalidate_permission_snapshots([EDITOR.pk])
+        get_permission_snapshot(ANONYMOUS)
+        get_permission_snapshot(EDITOR)
+
+        self.assertEqual(
+            [call.args[0] for call in mock_create.call_args_list],
+            [ANONYMOUS, EDITOR, EDITOR],
+        )
+
+    def test_global_changes_invalidate_every_snapshot(self, mock_create):
+        get_permission_snapshot(ANONYMOUS)
+        get_permission_snapshot(EDITOR)
+
+        invalidate_permission_snapshots()
+        get_permission_snapshot(ANONYMOUS)
+        get_permission_snapshot(EDITOR)
+
+        self.assertEqual(mock_create.call_count, 4)
+
+    def test_group_membership_invalidates_the_members(self, mock_create):
+        get_permission_snapshot(ANONYMOUS)
+        get_permission_snapshot(EDITOR)
+
+        user_groups_changed(SimpleNamespace(pk=9), reverse=True, pk_set={EDITOR.pk})
+        get_permission_snapshot(ANONYMOUS)
+        get_permission_snapshot(EDITOR)
+
+        self.assertEqual(mock_create.call_count, 3)
@@ -0,0 +1,88 @@
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from django.test import SimpleTestCase
+
+from bcap.util import site_reindex
+
+SITE_GRAPH = "site-graph"
+VISIT_GRAPH = "visit-graph"
+
+
+@patch("bcap.util.site_reindex.custom_search_values_enabled", return_value=True)
+@patch(
+    "bcap.util.site_reindex._get_dependent_graphs",
+    return_value={
+        "site": SITE_GRAPH,
+        "dependent": {VISIT_GRAPH},
+        "nodegroups": {"visit-ng"},
+    },
+)
+@patch("bcap.util.site_reindex.SiteReindexQueue")
+class SiteReindexQueueTests(SimpleTestCase):
+    @patch("arches.app.models.models.ResourceXResource.objects.filter")
+    def test_site_visit_tile_queues_related_sites(
+        self, mock_filter, mock_queue, _graphs, _enabled
+    ):
+        mock_filter.return_value.values_list.return_value = ["site-1", "site-2"]
+
+        site_reindex.queue_sites_for_tile(
+            SimpleNamespace(resourceinstance_id="visit-1", nodegroup_id="visit-ng")
+        )
+
+        mock_filter.assert_called_once_with(
+            from_resource_id="visit-1", to_resource_graph_id=SITE_GRAPH
+        )
+        mock_queue.enqueue.assert_called_once_with(["site-1", "site-2"])
+
+    @patch("arches.app.models.models.ResourceXResource.objects.filter")
+    def test_unrelated_tile_is_ignored_without_queries(
+        self, mock_filter, mock_queue, _graphs, _enabled
+    ):
+        site_reindex.queue_sites_for_tile(
+            SimpleNamespace(resourceinstance_id="site-1", nodegroup_id="site-ng")
+        )
+
+        mock_filter.assert_not_called()
+        mock_queue.enqueue.assert_not_called()
+
+    def test_relationship_from_site_visit_queues_site(
+        self, mock_queue, _graphs, _enabled
+    ):
+        site_reindex.queue_site_for_relationship(
+            SimpleNamespace(
+                from_resource_graph_id=VISIT_GRAPH,
+                to_resource_graph_id=SITE_GRAPH,
+                to_resource_id="site-1",
+            )
+        )
+        site_reindex.queue_site_for_relationship(
+            SimpleNamespace(
+                from_resource_graph_id="other-graph",
+                to_resource_graph_id=SITE_GRAPH,
+                to_resource_id="site-2",
+            )
+        )
+
+        mock_queue.enqueue.assert_called_once_with(["site-1"])
+
+
+@patch("bcap.search.arch_site_es_values.CustomSearchValue")
+@patch(
+    "bcap.util.site_reindex.index_resources_using_singleprocessing",
+    side_effect=RuntimeError("Elasticsearch is unavailable"),
+)
+@patch("bcap.util.site_reindex.Resource")
+@patch("bcap.util.site_reindex.SiteReindexQueue")
+@patch("bcap.util.site_reindex.transaction", MagicMock())
+class ReindexQueuedSitesTests(SimpleTestCase):
+    def test_prefetched_values_are_cleared_when_indexing_fails(
+        self, mock_queue, _resource, _index, mock_values
+    ):
+        mock_queue.pop_ready.return_value = ["site-1"]
+
+        with self.assertRaises(RuntimeError):
+            site_reindex.reindex_queued_sites(debounce_seconds=0, batch_size=10)
+
+        mock_values.prefetch.assert_called_once_with(["site-1"])
+        mock_values.clear_prefetched.assert_called_once_with()
@@ -69,3 +69,92 @@ class BordenNumberExternalViewTests(TestCase):
 
         self.assertEqual(resp.status_code, 200)
         post_impl_patch.assert_called_once()
+
+    @override_settings(BORDEN_NUMBER_MAX_RESERVE_COUNT=10)
+    @patch("bcap.views.api.BordenNumberBase.api.get_next_borden_number")
+    def test_post_rejects_invalid_count(self, get_next_patch):
+        for count in ("abc", "0", "-2", "11"):
+            resp = self.client.post(
+                self.url,
+                data={
+                    **self.post_data,
+                    "reserve_borden_number": "true",
+                    "count": count,
+                },
+                HTTP_AUTHORIZATION=f"Bearer {self.access_token.token}",
+            )
+
+            self.assertEqual(resp.status_code, 400, count)
+        get_next_patch.assert_not_called()
+
+
+@override_settings(ROOT_URLCONF="bcap.tests.test_urls")
+class BordenNumberBatchExternalViewTests(TestCase):
+    def setUp(self):
+        self.url = reverse("borden-number-batch-external")
+
+        User = get_user_model()
+        self.user = User.objects.create_user(
+            username="tokenuser",
+            password="pass",
+            email="tokenuser@example.com",
+        )
+
+        Application = get_application_model()
+        self.application = Application.objects.create(
+            user=self.user,
+            name="test-app",
+            client_type=Application.CLIENT_CONFIDENTIAL,
+            authorization_grant_type=Application.GRANT_PASSWORD,
+        )
+
+        self.access_token = AccessToken.objects.create(
+            user=self.user,
+            application=self.application,
+            token="test-access-token",
+            scope="read write",
+            expires=timezone.now() + timedelta(hours=1),
+        )
+
+    def _post(self, body, **kwargs):
+        return self.client.post(
+            self.url,
+            data=json.dumps(body),
+            content_type="application/json",
+            **kwargs,
+        )
+
+    def test_post_requires_bearer_token(self):
+        resp = self._post({"site_boundaries": []})
+
+        self.assertEqual(resp.status_code, 403)
+
+    @patch(
+        "bcap.views.api.BordenNumberBase.api.get_borden_numbers_for_geometries",
+        return_value=[{"borden_number": "EhRa-1"}, {"borden_number": "EhRa-2"}],
+    )
+    def test_post_returns_number_per_boundary(self, get_numbers_patch):
+        boundaries = [
+            {"type": "Point", "coordinates": [-123.2, 49.2]},
+            {"type": "Point", "coordinates": [-123.21, 49.21]},
+        ]
+
+        resp = self._post(
+            {"site_boundaries": boundaries, "reserve_borden_number": True},
+            HTTP_AUTHORIZATION=f"Bearer {self.access_token.token}",
+        )
+
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(
+            json.loads(resp.content)["results"],
+            [{"borden_number": "EhRa-1"}, {"borden_number": "EhRa-2"}],
+        )
+        get_numbers_patch.assert_called_once_with(boundaries, reserve=True)
+
+    def test_post_rejects_oversized_batch(self):
+        resp = self._post(
+            {"site_boundaries": [{}] * 501},
+            HTTP_AUTHORIZATION=f"Bearer {self.access_token.token}",
+        )
+
+        self.assertEqual(resp.status_code, 400)